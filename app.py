@@ -2,19 +2,21 @@ import streamlit as st
 import tempfile
 import os
 import json
-from PIL import Image
 
 from src.ingestion.pdf_loader import extract_text_from_pdf
 from src.ingestion.image_loader import extract_text_from_image
 from src.ingestion.audio_loader import extract_text_from_audio
 from src.ingestion.video_loader import extract_audio_text_from_video
-from src.ingestion.frame_extractor import extract_key_frames
-from src.vision.llava_captioner import generate_caption
-from src.extraction.entity_extractor import extract_entities
-from src.graph.relation_inferencer import infer_relationships
+from src.ingestion.frame_extractor import sample_key_frames
+from src.vision.llava_captioner import generate_captions
+from src.extraction.chunked_extractor import extract_entities_chunked, extraction_complete
+from src.graph.batch_relation_inferencer import infer_relationships_batched
+from src.graph.candidate_pairs import candidate_pairs
 from src.graph.graph_writer import KnowledgeGraph
-from src.rag.vector_indexer import index_documents, retrieve_similar
+from src.rag.vector_indexer import index_documents, page_documents
+from src.rag.hybrid_retriever import hybrid_search
 from src.rag.graph_qa import answer_question
+from src.cache.stage_cache import get_default_cache, bytes_sha256, pipeline_version
 
 st.set_page_config(page_title="Multimodal RAG Graph App", layout="centered")
 st.title("Multimodal Knowledge Graph + RAG Explorer")
@@ -24,74 +26,99 @@ rag_texts = []
 rag_metas = []
 
 if uploaded_file:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=uploaded_file.name) as tmp:
-        tmp.write(uploaded_file.getbuffer())
-        file_path = tmp.name
+    # Content-addressed cache: an unchanged upload only costs hashing its bytes on each rerun
+    cache = get_default_cache()
+    file_hash = bytes_sha256(uploaded_file.getbuffer())
+    doc_name = uploaded_file.name
+    doc_key = f"{file_hash}:{doc_name}"
+
+    # Write the upload to disk only when a stage actually needs to read it
+    temp_paths = []
+    def upload_path():
+        if not temp_paths:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=uploaded_file.name) as tmp:
+                tmp.write(uploaded_file.getbuffer())
+                temp_paths.append(tmp.name)
+        return temp_paths[0]
+
+    # Writer backed by the process-wide Neo4j driver, shared across reruns
+    kg = KnowledgeGraph()
 
     ext = uploaded_file.name.split(".")[-1].lower()
     text = ""
     modality = ""
-    doc_name = uploaded_file.name
 
     if ext == "pdf":
-        text = extract_text_from_pdf(file_path)[:3000]
+        text = cache.cached("pdf_text", file_hash, lambda: extract_text_from_pdf(upload_path()))
         modality = "PDF"
 
     elif ext in ["jpg", "jpeg", "png"]:
-        text = extract_text_from_image(file_path)[:3000]
+        text = cache.cached("image_text", file_hash, lambda: extract_text_from_image(upload_path()))
         modality = "Image"
 
     elif ext == "mp3":
-        text = extract_text_from_audio(file_path)[:3000]
+        text = cache.cached("audio_text", file_hash, lambda: extract_text_from_audio(upload_path()))
         modality = "Audio"
 
     elif ext == "mp4":
-        text = extract_audio_text_from_video(file_path)[:3000]
+        text = cache.cached("video_text", file_hash, lambda: extract_audio_text_from_video(upload_path()))
         modality = "Video"
 
-        # Frame extraction + LLaVA
-        frame_folder = os.path.join("data", "video_frames")
-        os.makedirs(frame_folder, exist_ok=True)
-        frames = extract_key_frames(file_path, frame_folder)
+        # Frame extraction + LLaVA, with frames stored per video so cached paths stay valid
+        frame_folder = os.path.join("data", "video_frames", file_hash[:16])
+
+        def caption_frames():
+            # Frames stay in memory for captioning and are also written to disk for display
+            frames, _ = sample_key_frames(upload_path(), output_folder=frame_folder)
+            frames = [frame for frame in frames if frame.image.any()]
+            captions = generate_captions([frame.image for frame in frames])
+            return [(frame.path, caption) for frame, caption in zip(frames, captions)]
 
         st.markdown("**Video key frame captions (LLaVA):**")
         captions = []
-        for path in frames:
-            try:
-                img = Image.open(path).convert("RGB")
-                if img.getbbox():
-                    caption = generate_caption(path)
-                    st.image(path, caption=caption, width=300)
-                    captions.append({"name": caption, "type": "Concept"})
-            except:
-                continue
+        for path, caption in cache.cached("video_captions", file_hash, caption_frames):
+            if os.path.exists(path):
+                st.image(path, caption=caption, width=300)
+            captions.append({"name": caption, "type": "Concept"})
 
         if captions:
-            kg = KnowledgeGraph()
-            kg.add_entities(captions, doc_name)
-            rels = infer_relationships(captions)
-            kg.add_relationships(rels)
-            kg.close()
+            rels = cache.cached("relationships", f"{file_hash}:captions", lambda: infer_relationships_batched(captions))
+
+            # Writes only what changed since this video's captions were last synced
+            kg.sync_document(doc_name, captions, rels, file_hash, pipeline_version("captions"), "captions")
 
     if text:
         st.markdown(f"**Extracted Text from {modality}:**")
         st.text_area("Text", text, height=200)
 
-        entities_json = extract_entities(text)
+        entities_json = cache.cached("entities", file_hash, lambda: extract_entities_chunked(text),
+                                     keep=extraction_complete)
         entities = json.loads(entities_json)["entities"]
 
         st.markdown("**Extracted Entities:**")
         for ent in entities:
             st.markdown(f"- `{ent['type']}`: {ent['name']}")
 
-        kg = KnowledgeGraph()
-        kg.add_entities(entities, doc_name)
-        relationships = infer_relationships(entities)
-        kg.add_relationships(relationships)
-        kg.close()
+        def infer_text_relationships():
+            pairs, pruning = candidate_pairs(entities, text)
+            st.caption(f"Relation candidates: {pruning.kept_pairs}/{pruning.total_pairs} pairs ({pruning.pruned_pairs} pruned)")
+            return infer_relationships_batched(entities, pairs=pairs)
+        relationships = cache.cached("relationships", file_hash, infer_text_relationships)
+
+        # A no-op when the graph already holds this version of the document
+        kg.sync_document(doc_name, entities, relationships, file_hash, pipeline_version(modality.lower()))
+
+        # PDF chunks carry their page number
+        texts, metas = page_documents(text, doc_name) if ext == "pdf" else ([text], [{"source": doc_name}])
+        rag_texts.extend(texts)
+        rag_metas.extend(metas)
+
+    # Remove the temporary upload copy, if one was needed
+    for path in temp_paths:
+        os.remove(path)
 
-        rag_texts.append(text)
-        rag_metas.append({"source": doc_name})
+    with st.sidebar.expander("Ingestion cache"):
+        st.json(cache.stats())
 
 query = st.text_input("Ask a question (Graph QA or RAG):")
 
@@ -101,7 +128,12 @@ if query:
         st.markdown("### Graph QA Answer")
         try:
             graph_answer = answer_question(query)
-            st.success(graph_answer)
+            if graph_answer.error:
+                st.error(graph_answer.error)
+            else:
+                st.caption(f"Answered via {graph_answer.source}")
+                st.code(graph_answer.cypher.strip(), language="cypher")
+                st.success(graph_answer.rows or "No matching results in the graph.")
         except Exception as e:
             st.error(f"Graph QA failed: {e}")
 
@@ -109,10 +141,16 @@ if query:
         st.markdown("### RAG Semantic Answer")
         try:
             if rag_texts:
-                index_documents(rag_texts, rag_metas)
-            results = retrieve_similar(query)
-            for r in results:
-                st.markdown(f"**Source**: {r.metadata['source']}")
+                # Index each uploaded document once rather than on every query
+                cache.cached("rag_index", doc_key, lambda: index_documents(rag_texts, rag_metas) or True)
+            # Keyword, vector and graph-neighbourhood search, fused; slow sources are dropped
+            hybrid = hybrid_search(query, k=3)
+            st.caption(" | ".join(
+                f"{name}: {stats.latency * 1000:.0f} ms ({stats.status})" for name, stats in hybrid.sources.items()
+            ))
+            for r in hybrid.documents:
+                page = f", page {r.metadata['page']}" if r.metadata.get("page") else ""
+                st.markdown(f"**Source**: {r.metadata['source']}{page}")
                 st.write(r.page_content[:300])
         except Exception as e:
             st.error(f"RAG failed: {e}")
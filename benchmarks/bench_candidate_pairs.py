@@ -0,0 +1,71 @@
+# Benchmark: candidate-pair pruning vs exhaustive relation inference on a synthetic fixture corpus
+# Run from the repository root with: python -m benchmarks.bench_candidate_pairs
+
+import argparse
+import random
+
+from benchmarks.fakes import FakeChatModel, make_entities
+from src.extraction.entity_extractor import attach_spans
+from src.graph.batch_relation_inferencer import infer_relationships_batched
+from src.graph.candidate_pairs import CANDIDATE_TOP_K, candidate_pairs
+
+
+def build_fixture_corpus(num_entities: int, num_sentences: int, seed: int = 7):
+    """
+    Deterministic corpus where related entities mostly share a sentence:
+    - Each sentence mentions 2-4 entities; 60% of those pairs are gold relations
+    - A further 1% of all pairs are related without ever co-occurring
+    """
+    rng = random.Random(seed)
+    entities = make_entities(num_entities)
+    names = [ent["name"] for ent in entities]
+
+    sentences, gold = [], set()
+    for idx in range(num_sentences):
+        mentioned = rng.sample(names, rng.randint(2, 4))
+        sentences.append(f"In section {idx}, " + " works with ".join(mentioned) + ".")
+        for i, a in enumerate(mentioned):
+            for b in mentioned[i + 1:]:
+                if rng.random() < 0.6:
+                    gold.add(frozenset((a, b)))
+        # Form feeds split the corpus into pages of 20 sentences
+        if idx % 20 == 19:
+            sentences.append("\f")
+
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            if rng.random() < 0.01:
+                gold.add(frozenset((a, b)))
+
+    return entities, " ".join(sentences), gold
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate-pair pruning benchmark")
+    parser.add_argument("--entities", type=int, default=120)
+    parser.add_argument("--sentences", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=CANDIDATE_TOP_K)
+    args = parser.parse_args()
+
+    entities, text, gold = build_fixture_corpus(args.entities, args.sentences)
+    entities = attach_spans(text, entities)
+    relation_fn = lambda a, b: "RELATED_TO" if frozenset((a, b)) in gold else None
+
+    # Exhaustive reference: every pair goes to the (fake) LLM
+    llm = FakeChatModel(latency=0.0, relation_fn=relation_fn)
+    exhaustive = set(infer_relationships_batched(entities, llm=llm))
+    exhaustive_calls = llm.calls
+
+    print(f"{'unit':>8} {'pairs':>7} {'kept':>7} {'pruned':>7} {'pruned%':>8} {'calls':>6} {'recall':>7}")
+    for unit in ("sentence", "window", "page", "chunk"):
+        pairs, stats = candidate_pairs(entities, text, unit=unit, top_k=args.top_k)
+        llm = FakeChatModel(latency=0.0, relation_fn=relation_fn)
+        pruned = set(infer_relationships_batched(entities, llm=llm, pairs=pairs))
+        recall = len(pruned & exhaustive) / len(exhaustive) if exhaustive else 1.0
+        print(f"{unit:>8} {stats.total_pairs:>7} {stats.kept_pairs:>7} {stats.pruned_pairs:>7} "
+              f"{stats.pruned_ratio:>8.1%} {llm.calls:>6} {recall:>7.3f}")
+    print(f"exhaustive: {len(exhaustive)} relations from {exhaustive_calls} calls")
+
+
+if __name__ == "__main__":
+    main()
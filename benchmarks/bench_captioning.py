@@ -0,0 +1,73 @@
+# Benchmark: LLaVA start-up time, resident memory and captions/sec per batch size and precision
+# Each precision runs in its own subprocess so RSS figures do not mix
+# Run from the repository root with: python -m benchmarks.bench_captioning
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def run_precision(precision: str, batch_sizes: list, frames_per_size: int, video: str) -> dict:
+    import psutil
+
+    process = psutil.Process()
+    start = time.perf_counter()
+    os.environ["LLAVA_PRECISION"] = precision
+    from src.vision import llava_captioner
+    import_seconds = time.perf_counter() - start
+    import_rss = process.memory_info().rss
+
+    start = time.perf_counter()
+    llava_captioner.load_model(precision)
+    load_seconds = time.perf_counter() - start
+
+    # Real frames from the bundled video, repeated to fill the largest batch
+    from src.ingestion.frame_extractor import sample_key_frames
+    frames, _ = sample_key_frames(video, mode="grab", every_n_seconds=5, dedupe_distance=-1)
+    images = [frames[i % len(frames)].image for i in range(frames_per_size)]
+
+    throughput = {}
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        llava_captioner.generate_captions(images, batch_size=batch_size, max_new_tokens=48)
+        throughput[batch_size] = round(len(images) / (time.perf_counter() - start), 3)
+
+    return {
+        "precision": precision,
+        "import_seconds": round(import_seconds, 3),
+        "import_rss_mb": round(import_rss / 1e6, 1),
+        "load_seconds": round(load_seconds, 1),
+        "rss_mb": round(process.memory_info().rss / 1e6, 1),
+        "captions_per_second": throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLaVA captioning benchmark")
+    parser.add_argument("--file", default=os.path.join("data", "sdg.mp4"))
+    parser.add_argument("--precisions", nargs="+", default=["float32", "bf16", "int8"])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--frames", type=int, default=8, help="Frames captioned at each batch size")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_precision(args.child, args.batch_sizes, args.frames, args.file)))
+        return
+
+    for precision in args.precisions:
+        cmd = [sys.executable, "-m", "benchmarks.bench_captioning", "--child", precision, "--file", args.file,
+               "--frames", str(args.frames), "--batch-sizes", *map(str, args.batch_sizes)]
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['precision']}: import {r['import_seconds']}s ({r['import_rss_mb']} MB), "
+              f"load {r['load_seconds']}s, RSS {r['rss_mb']} MB")
+        for batch_size, rate in r["captions_per_second"].items():
+            print(f"  batch {batch_size:>2}: {rate} captions/s")
+
+
+if __name__ == "__main__":
+    main()
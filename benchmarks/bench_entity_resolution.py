@@ -0,0 +1,117 @@
+# Benchmark: entity resolution throughput and duplicate rate against merging on the exact (name, type) pair
+# Generates canonical entities and a stream of noisy mentions (case, spacing, articles, acronyms,
+# spelling variants and typos) with known ground truth, so the run needs no Neo4j or LLM
+# Run from the repository root with: python -m benchmarks.bench_entity_resolution
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from src.graph.entity_resolver import EntityResolver
+
+WORDS = ("global health education water energy climate ocean forest peace justice labour industry innovation "
+         "council agency fund programme network alliance institute foundation partnership initiative "
+         "development sustainable national regional urban rural digital food security").split()
+
+# Made-up place and family names widen the vocabulary, so names and acronyms collide about as often as in real text
+SYLLABLES = ["ka", "lo", "mer", "ta", "vin", "dor", "sa", "bel", "ri", "ston", "wa", "ghe", "lun", "pa", "tor", "ve"]
+TYPES = ["Organization", "Concept", "Location", "Person"]
+
+
+def make_entities(count: int, rng: random.Random) -> list:
+    # Multi-word names, a third of them numbered ("Global Health Fund 3")
+    # One name per word set, so no two entities differ only in word order
+    entities, seen = [], set()
+    while len(entities) < count:
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        words.insert(0, "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))))
+        words = [w.capitalize() for w in words]
+        if rng.random() < 0.33:
+            words.append(str(rng.randint(1, 40)))
+        name, ent_type = " ".join(words), rng.choice(TYPES)
+        if frozenset(name.lower().split()) not in seen:
+            seen.add(frozenset(name.lower().split()))
+            entities.append({"name": name, "type": ent_type})
+    return entities
+
+
+def variant(name: str, rng: random.Random) -> str:
+    # A surface form a document or the extractor might produce for the same entity
+    words = name.split()
+    roll = rng.random()
+    if roll < 0.35:
+        return name
+    if roll < 0.5:
+        return name.upper() if rng.random() < 0.5 else name.lower()
+    if roll < 0.6:
+        return "The " + name
+    if roll < 0.7 and words[-1].isdigit():
+        return " ".join(words[:-1]) + "-" + words[-1]
+    if roll < 0.8:
+        # Acronyms only for names long enough to have one
+        letters = [w for w in words if not w.isdigit()]
+        numbers = [w for w in words if w.isdigit()]
+        if len(letters) < 3:
+            return name
+        return "".join(w[0].upper() for w in letters) + (" " + numbers[0] if numbers else "")
+    if roll < 0.9:
+        return name.replace("Programme", "Program").replace("Labour", "Labor").replace("Urban", "Urbane")
+    # One dropped or doubled letter in the longest word
+    i = max(range(len(words)), key=lambda j: len(words[j]))
+    word, pos = words[i], rng.randrange(1, len(words[i]))
+    words[i] = word[:pos] + word[pos + 1:] if rng.random() < 0.5 else word[:pos] + word[pos] + word[pos:]
+    return " ".join(words)
+
+
+def duplicate_stats(assignments: dict) -> tuple:
+    # assignments: node key -> set of true entity indices it received
+    nodes_per_truth = defaultdict(int)
+    for truths in assignments.values():
+        for truth in truths:
+            nodes_per_truth[truth] += 1
+    # Every node beyond the first for an entity is a duplicate; nodes holding several entities are false merges
+    duplicates = sum(count - 1 for count in nodes_per_truth.values())
+    false_merges = sum(len(truths) > 1 for truths in assignments.values())
+    return len(assignments), duplicates / max(len(assignments), 1), false_merges
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity resolution throughput and duplicate-rate benchmark")
+    parser.add_argument("--entities", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--mentions-per-entity", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=200, help="Mentions per resolve_many call (one document)")
+    args = parser.parse_args()
+
+    print(f"{'entities':>8} {'mentions':>8} {'exact-pair nodes':>16} {'dup rate':>8} "
+          f"{'resolved nodes':>14} {'dup rate':>8} {'false merges':>12} {'mentions/s':>10}")
+    for count in args.entities:
+        rng = random.Random(count)
+        entities = make_entities(count, rng)
+        mentions = [(i, variant(ent["name"], rng), ent["type"])
+                    for i, ent in enumerate(entities) for _ in range(args.mentions_per_entity)]
+        rng.shuffle(mentions)
+
+        # Previous behaviour: one node per exact (name, type) pair
+        exact = defaultdict(set)
+        for truth, name, ent_type in mentions:
+            exact[(name, ent_type)].add(truth)
+
+        resolver = EntityResolver(":memory:")
+        resolved = defaultdict(set)
+        start = time.perf_counter()
+        for i in range(0, len(mentions), args.batch):
+            batch = mentions[i:i + args.batch]
+            results = resolver.resolve_many([{"name": name, "type": ent_type} for _, name, ent_type in batch])
+            for (truth, _, _), result in zip(batch, results):
+                resolved[result["id"]].add(truth)
+        elapsed = time.perf_counter() - start
+
+        before, after = duplicate_stats(exact), duplicate_stats(resolved)
+        print(f"{count:>8} {len(mentions):>8} {before[0]:>16} {before[1]:>8.1%} "
+              f"{after[0]:>14} {after[1]:>8.1%} {after[2]:>12} {len(mentions) / elapsed:>10.0f}")
+        print(f"{'':>8} matched by: {dict(resolver.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Benchmark: frames decoded (grab() decodes too; seeks decode from the preceding key frame) and seconds per video-minute per sampling mode
+# The "read-all" row reproduces the previous loop that decoded every frame
+# Run from the repository root with: python -m benchmarks.bench_frame_sampling
+
+import argparse
+import os
+import time
+
+import cv2
+
+from src.ingestion.frame_extractor import MODES, sample_key_frames
+
+
+def read_all(video_path: str, every_n_seconds: float):
+    # Previous behaviour: read() every frame, keep one per interval
+    vidcap = cv2.VideoCapture(video_path)
+    interval = int(vidcap.get(cv2.CAP_PROP_FPS) * every_n_seconds)
+    decoded, kept = 0, 0
+    while True:
+        success, _ = vidcap.read()
+        if not success:
+            break
+        kept += decoded % interval == 0
+        decoded += 1
+    vidcap.release()
+    return decoded, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key-frame sampling benchmark")
+    parser.add_argument("--file", default=os.path.join("data", "sdg.mp4"))
+    parser.add_argument("--every", type=float, default=20)
+    args = parser.parse_args()
+
+    vidcap = cv2.VideoCapture(args.file)
+    minutes = vidcap.get(cv2.CAP_PROP_FRAME_COUNT) / (vidcap.get(cv2.CAP_PROP_FPS) or 25.0) / 60
+    vidcap.release()
+
+    print(f"{'mode':>9} {'grabbed':>8} {'decoded':>8} {'kept':>5} {'dupes':>6} {'s/video-min':>12}")
+    start = time.perf_counter()
+    decoded, kept = read_all(args.file, args.every)
+    wall = time.perf_counter() - start
+    print(f"{'read-all':>9} {decoded:>8} {decoded:>8} {kept:>5} {0:>6} {wall / minutes:>12.3f}")
+
+    for mode in MODES:
+        _, stats = sample_key_frames(args.file, mode=mode, every_n_seconds=args.every)
+        print(f"{mode:>9} {stats.frames_grabbed:>8} {stats.frames_decoded:>8} {stats.frames_kept:>5} "
+              f"{stats.duplicates_dropped:>6} {stats.seconds / minutes:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
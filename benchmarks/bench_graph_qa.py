@@ -0,0 +1,93 @@
+# Benchmark: graph QA with and without query templates and the question-to-Cypher cache
+# Uses the fake chat model, fake embeddings and a recorded-session graph, so the run is offline
+# Run from the repository root with: python -m benchmarks.bench_graph_qa
+
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import time
+
+from benchmarks.fakes import FakeChatModel, FakeDriver, FakeEmbeddings
+from src.llm.client import LLMClient
+from src.rag.cypher_cache import SCHEMA_QUERY, CypherCache
+from src.rag.graph_qa import is_read_only, question_to_cypher, run_cypher_query, answer_question
+
+# Free-form questions that no template covers; users repeat them with small variations
+FREE_FORM = [
+    "What is the purpose of the SDGs for humanity?",
+    "Which goals focus on climate action?",
+    "How do the goals address poverty and hunger?",
+    "What role do partnerships play in the agenda?",
+    "Which organizations advocate for clean water?",
+]
+
+
+def responder(query, params):
+    # Every read returns one row; the schema never changes during the run
+    if query == SCHEMA_QUERY:
+        return [{"labels": ["Entity", "Document"], "types": ["MENTIONS", "ADVOCATES"], "keys": ["name", "type", "filename"]}]
+    return [{"name": params.get("name", "Entity 1")}]
+
+
+def make_workload(count: int, seed: int = 0) -> list:
+    # 30% template-shaped, 50% repeats or near-repeats of free-form questions, 20% novel
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.3:
+            questions.append(rng.choice(["Who is Entity {}?", "Tell me about Entity {}", "Which documents mention Entity {}?"])
+                             .format(rng.randrange(50)))
+        elif roll < 0.8:
+            question = rng.choice(FREE_FORM)
+            questions.append(rng.choice([question, question.lower(), question.rstrip("?"), "  " + question.upper()]))
+        else:
+            questions.append(f"Summarise finding number {i} of the report?")
+    return questions
+
+
+def report(label: str, latencies: list, llm_calls: int):
+    ordered = sorted(latencies)
+    print(f"{label:<26} LLM calls={llm_calls:<4} p50={statistics.median(ordered) * 1000:7.1f} ms  "
+          f"p99={ordered[int(0.99 * (len(ordered) - 1))] * 1000:7.1f} ms  total={sum(ordered):6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph QA cache and template benchmark")
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Simulated seconds per text-to-Cypher call")
+    args = parser.parse_args()
+
+    questions = make_workload(args.questions)
+    driver = FakeDriver(round_trip=0.003, responder=responder)
+
+    # Previous behaviour: one LLM call per question, then execution
+    model = FakeChatModel(latency=args.llm_latency)
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        cypher = question_to_cypher(question, LLMClient(model=model, cache_size=0))
+        if is_read_only(cypher):
+            run_cypher_query(cypher, driver=driver)
+        latencies.append(time.perf_counter() - start)
+    report("LLM every question", latencies, model.calls)
+
+    # Templates first, then the normalised/embedding Cypher cache, then the LLM
+    model = FakeChatModel(latency=args.llm_latency)
+    client = LLMClient(model=model, cache_size=0)
+    cache = CypherCache(embed_fn=FakeEmbeddings(latency=0.02).embed_query)
+    latencies, sources = [], {}
+    for question in questions:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            answer = answer_question(question, cache=cache, driver=driver, llm=client)
+        latencies.append(time.perf_counter() - start)
+        sources[answer.source] = sources.get(answer.source, 0) + 1
+    report("templates + Cypher cache", latencies, model.calls)
+    print(f"answered via: {sources}  cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Benchmark: write latency as the graph grows, with and without the schema bootstrap
+# Requires the Neo4j instance configured in .env; bench data uses names prefixed "bench-"
+# Run from the repository root with: python -m benchmarks.bench_graph_schema [--no-schema]
+
+import argparse
+import statistics
+import time
+
+from src.graph.entity_resolver import EntityResolver
+from src.graph.graph_writer import SCHEMA_CONSTRAINTS, SCHEMA_INDEXES, KnowledgeGraph, get_driver
+
+
+def drop_schema(driver):
+    # Remove the bootstrap constraints and indexes to measure the unindexed baseline
+    with driver.session() as session:
+        for name in SCHEMA_CONSTRAINTS:
+            session.run(f"DROP CONSTRAINT {name} IF EXISTS").consume()
+        for name in SCHEMA_INDEXES:
+            session.run(f"DROP INDEX {name} IF EXISTS").consume()
+
+
+def delete_bench_data(driver):
+    # Delete benchmark nodes in small transactions so large graphs do not exhaust memory
+    with driver.session() as session:
+        session.run(
+            """
+            MATCH (n) WHERE (n:Entity AND n.name STARTS WITH 'bench-') OR (n:Document AND n.filename STARTS WITH 'bench-')
+            CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+            """
+        ).consume()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema bootstrap write-latency benchmark")
+    parser.add_argument("--target-nodes", type=int, default=300_000)
+    parser.add_argument("--step", type=int, default=50_000, help="Nodes added between latency probes")
+    parser.add_argument("--probe-size", type=int, default=200, help="Entities and relationships per probe write")
+    parser.add_argument("--probes", type=int, default=5)
+    parser.add_argument("--no-schema", action="store_true", help="Drop the constraints and indexes first")
+    parser.add_argument("--keep-data", action="store_true")
+    args = parser.parse_args()
+
+    driver = get_driver()
+    delete_bench_data(driver)
+    if args.no_schema:
+        drop_schema(driver)
+    # Bench entities go to a throwaway alias index, not the persistent one
+    kg = KnowledgeGraph(driver=driver, batch_size=5000, ensure_schema=not args.no_schema, resolver=EntityResolver(":memory:"))
+
+    mode = "no schema" if args.no_schema else "schema"
+    print(f"{'nodes':>8} {'mode':>10} {'entity_ms_p50':>14} {'rel_ms_p50':>11}")
+    nodes, probe_id = 0, 0
+    while nodes < args.target_nodes:
+        # Grow the graph by one step of filler entities
+        filler = [{"name": f"bench-{nodes + i}", "type": "Concept"} for i in range(args.step)]
+        kg.add_entities(filler, f"bench-filler-{nodes}.pdf")
+        nodes += args.step
+
+        # Probe: a typical document-sized write of new entities plus relationships between them
+        entity_ms, rel_ms = [], []
+        for _ in range(args.probes):
+            probe = [{"name": f"bench-probe-{probe_id}-{i}", "type": "Concept"} for i in range(args.probe_size)]
+            rels = [(probe[i]["name"], "RELATED_TO", probe[(i + 1) % len(probe)]["name"]) for i in range(len(probe))]
+            probe_id += 1
+
+            start = time.perf_counter()
+            kg.add_entities(probe, f"bench-probe-{probe_id}.pdf")
+            entity_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            kg.add_relationships(rels)
+            rel_ms.append((time.perf_counter() - start) * 1000)
+
+        print(f"{nodes:>8} {mode:>10} {statistics.median(entity_ms):>14.1f} {statistics.median(rel_ms):>11.1f}")
+
+    if not args.keep_data:
+        delete_bench_data(driver)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# Benchmark: KnowledgeGraph write throughput (rows/sec) versus UNWIND batch size
+# Runs against the recorded-session stand-in by default, or a local Neo4j with --neo4j
+# Run from the repository root with: python -m benchmarks.bench_graph_writes
+
+import argparse
+import time
+
+from benchmarks.fakes import FakeDriver, make_entities
+from src.graph.entity_resolver import EntityResolver
+from src.graph.graph_writer import KnowledgeGraph, get_driver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Graph write throughput benchmark")
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--relationships", type=int, default=4000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 500, 1000, 5000])
+    parser.add_argument("--neo4j", action="store_true", help="Write to the Neo4j instance configured in .env")
+    args = parser.parse_args()
+
+    entities = make_entities(args.entities)
+    labels = ["SUPPORTS", "PART_OF", "LOCATED_IN", "FUNDS"]
+    relationships = [
+        (entities[i % args.entities]["name"], labels[i % len(labels)], entities[(i * 7 + 1) % args.entities]["name"])
+        for i in range(args.relationships)
+    ]
+
+    print(f"{'batch':>6} {'statements':>10} {'entity_rows/s':>14} {'rel_rows/s':>11}")
+    for batch_size in args.batch_sizes:
+        driver = get_driver() if args.neo4j else FakeDriver()
+        kg = KnowledgeGraph(driver=driver, batch_size=batch_size, resolver=EntityResolver(":memory:"))
+
+        start = time.perf_counter()
+        kg.add_entities(entities, f"bench_batch_{batch_size}.pdf")
+        entity_wall = time.perf_counter() - start
+
+        start = time.perf_counter()
+        kg.add_relationships(relationships)
+        rel_wall = time.perf_counter() - start
+
+        statements = len(driver.statements) if not args.neo4j else "-"
+        print(f"{batch_size:>6} {statements:>10} {len(entities) / entity_wall:>14.0f} {len(relationships) / rel_wall:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
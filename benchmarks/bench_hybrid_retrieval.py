@@ -0,0 +1,105 @@
+# Benchmark: BM25-only, vector-only and hybrid (BM25 + vector + graph, RRF-fused) retrieval
+# Uses the local vector store with fake embeddings and a recorded-session graph, so the run is offline
+# Run from the repository root with: python -m benchmarks.bench_hybrid_retrieval
+
+import argparse
+import re
+import statistics
+import tempfile
+
+from benchmarks.fakes import FakeDriver, FakeEmbeddings
+from src.rag.hybrid_retriever import HybridRetriever
+from src.rag.local_index import LocalVectorStore
+from src.rag.vector_indexer import index_documents
+
+VOCABULARY = ["poverty", "hunger", "health", "education", "equality", "water", "energy", "growth",
+              "industry", "cities", "climate", "oceans", "forests", "peace", "partnership"]
+
+
+def make_corpus(documents: int, paragraphs: int, entities: int) -> tuple:
+    # Paragraph p of document d is about one entity and one topic word
+    texts, metas, mentions = [], [], {}
+    for d in range(documents):
+        parts = []
+        for p in range(paragraphs):
+            entity = (d * paragraphs + p) % entities
+            topic = VOCABULARY[(d + p) % len(VOCABULARY)]
+            parts.append(f"Entity {entity} leads the {topic} programme. " + "It reports progress every year. " * 8)
+            mentions.setdefault(f"doc_{d}.txt", set()).add(f"Entity {entity}")
+        texts.append("\n\n".join(parts))
+        metas.append({"source": f"doc_{d}.txt"})
+    return texts, metas, mentions
+
+
+def graph_responder(mentions: dict, entities: int):
+    # Answer the neighbourhood query: entity i is related to i - 1 and i + 1
+    documents_of = {}
+    for filename, names in mentions.items():
+        for name in names:
+            documents_of.setdefault(name, []).append(filename)
+
+    def respond(query, params):
+        rows = []
+        for name in params.get("names", []):
+            match = re.fullmatch(r"Entity (\d+)", name)
+            if not match:
+                continue
+            i = int(match.group(1))
+            for other, seed in ((i, True), ((i - 1) % entities, False), ((i + 1) % entities, False)):
+                for filename in documents_of.get(f"Entity {other}", []):
+                    rows.append({"filename": filename, "name": f"Entity {other}", "seed": seed})
+        return rows
+
+    return respond
+
+
+def evaluate(label: str, retriever: HybridRetriever, queries: list, k: int):
+    hits, latencies, per_source = 0, [], {}
+    for entity, query in queries:
+        result = retriever.search(query, k)
+        latencies.append(result.latency)
+        pattern = re.compile(rf"\bEntity {entity}\b")
+        hits += any(pattern.search(doc.page_content) for doc in result.documents)
+        for name, stats in result.sources.items():
+            per_source.setdefault(name, []).append(stats)
+
+    summary = "  ".join(
+        f"{name}={statistics.median(s.latency for s in stats) * 1000:.0f}ms"
+        + (f" ({sum(s.status == 'late' for s in stats)} late)" if any(s.status == "late" for s in stats) else "")
+        for name, stats in sorted(per_source.items()) if stats[0].status != "skipped"
+    )
+    print(f"{label:<32} hit@{k}={hits / len(queries):.2f}  p50={statistics.median(latencies) * 1000:6.1f} ms  "
+          f"max={max(latencies) * 1000:6.1f} ms  [{summary}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid retrieval benchmark")
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--entities", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=0.5)
+    args = parser.parse_args()
+
+    texts, metas, mentions = make_corpus(args.documents, args.paragraphs, args.entities)
+    queries = [(e, f"Which programme does Entity {e} lead?") for e in range(0, args.entities, args.entities // args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp, FakeEmbeddings(latency=0.0, per_text=0.0))
+        index_documents(texts, metas, vectorstore=store)
+        # Query embeddings cost a remote round trip
+        store.embedding_function.latency = 0.08
+
+        responder = graph_responder(mentions, args.entities)
+        fast_graph = FakeDriver(round_trip=0.03, responder=responder)
+        slow_graph = FakeDriver(round_trip=1.0, responder=responder)
+
+        evaluate("bm25 only", HybridRetriever(store, fast_graph, args.budget, sources=("bm25",)), queries, args.k)
+        evaluate("vector only", HybridRetriever(store, fast_graph, args.budget, sources=("vector",)), queries, args.k)
+        evaluate("hybrid", HybridRetriever(store, fast_graph, args.budget), queries, args.k)
+        evaluate("hybrid, graph over budget", HybridRetriever(store, slow_graph, args.budget), queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
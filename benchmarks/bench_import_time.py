@@ -0,0 +1,125 @@
+# Benchmark: cold-start cost of every entry point, from `python -X importtime` and resident memory
+# Each entry point is imported in a fresh interpreter; heavy libraries loaded at import time are listed
+# Run from the repository root with: python -m benchmarks.bench_import_time
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Entry points and the module each one imports first
+ENTRY_POINTS = {
+    "serve.py": "serve",
+    "ingest.py": "ingest",
+    "main.py": "main",
+    "api": "src.service.api",
+    "worker": "src.service.worker",
+    "parallel_ingest": "src.pipeline.parallel_ingest",
+    "graph_qa": "src.rag.graph_qa",
+    "hybrid_retriever": "src.rag.hybrid_retriever",
+    "vector_indexer": "src.rag.vector_indexer",
+    "entity_extraction": "src.extraction.chunked_extractor",
+    "relation_inference": "src.graph.batch_relation_inferencer",
+}
+
+# Libraries that only the stage that needs them should import
+HEAVY_MODULES = ("torch", "transformers", "whisper", "faster_whisper", "langchain_openai", "openai",
+                 "chromadb", "langchain_community", "neo4j", "av", "streamlit")
+
+# Marks where the entry point's own imports begin, after the interpreter start-up and the child's helpers
+MARKER = "import time: -- entry point --"
+
+# Run in the child: resident memory and the heavy libraries it pulled in are printed after the import
+CHILD = """
+import importlib, json, sys, time
+try:
+    import psutil
+except ImportError:
+    psutil = None
+    import resource
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+start = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - start
+rss = psutil.Process().memory_info().rss if psutil else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+print(json.dumps({{"seconds": seconds, "rss": rss, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def parse_importtime(stderr: str) -> tuple:
+    # Lines look like "import time:  self [us] | cumulative | imported package"; nesting is indentation
+    total_us, top = 0, []
+    lines = stderr.splitlines()
+    if MARKER in lines:
+        lines = lines[lines.index(MARKER) + 1:]
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        if not name.startswith("  "):
+            top.append((name.strip(), int(cumulative_us)))
+    return total_us, sorted(top, key=lambda item: -item[1])
+
+
+def measure(module: str, top: int) -> dict:
+    code = CHILD.format(marker=MARKER, module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                         env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+    total_us, modules = parse_importtime(out.stderr)
+    if out.returncode != 0:
+        error = out.stderr.strip().splitlines()[-1]
+        return {"module": module, "error": error, "importtime_ms": round(total_us / 1000, 1)}
+    child = json.loads(out.stdout.strip().splitlines()[-1])
+    return {
+        "module": module,
+        "importtime_ms": round(total_us / 1000, 1),
+        "wall_ms": round(child["seconds"] * 1000, 1),
+        "rss_mb": round(child["rss"] / 1e6, 1),
+        "heavy": child["heavy"],
+        "slowest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in modules[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time and memory budget for every entry point")
+    parser.add_argument("--only", nargs="+", choices=sorted(ENTRY_POINTS), help="Entry points to measure")
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="Maximum -X importtime total per entry point")
+    parser.add_argument("--budget-mb", type=float, default=250.0, help="Maximum resident memory after the import")
+    parser.add_argument("--allow-heavy", action="store_true", help="Do not fail on heavy libraries imported eagerly")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports listed per entry point")
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results, failures = {}, []
+    for name in args.only or ENTRY_POINTS:
+        r = results[name] = measure(ENTRY_POINTS[name], args.top)
+        if "error" in r:
+            # Usually an optional native dependency that is missing from this environment
+            print(f"{name:20s} import failed after {r['importtime_ms']} ms: {r['error']}")
+            continue
+        print(f"{name:20s} {r['importtime_ms']:8.1f} ms importtime  {r['wall_ms']:8.1f} ms wall  "
+              f"{r['rss_mb']:7.1f} MB RSS  heavy: {', '.join(r['heavy']) or '-'}")
+        print("  slowest: " + ", ".join(f"{m['module']} {m['ms']} ms" for m in r["slowest"]))
+        if r["importtime_ms"] > args.budget_ms:
+            failures.append(f"{name}: {r['importtime_ms']} ms over the {args.budget_ms} ms budget")
+        if r["rss_mb"] > args.budget_mb:
+            failures.append(f"{name}: {r['rss_mb']} MB over the {args.budget_mb} MB budget")
+        if r["heavy"] and not args.allow_heavy:
+            failures.append(f"{name}: imports {', '.join(r['heavy'])} at start-up")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"budget_ms": args.budget_ms, "budget_mb": args.budget_mb, "results": results}, f, indent=2)
+
+    if failures:
+        print("\nOver budget:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
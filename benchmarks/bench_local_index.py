@@ -0,0 +1,96 @@
+# Benchmark: recall@k and queries/sec of the local vector store's index kinds against exact search
+# Vectors are synthetic (clustered, unit length) so the run is offline and sizes can reach 1M chunks
+# Run from the repository root with: python -m benchmarks.bench_local_index
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.rag.local_index import INDEX_KINDS, LocalVectorStore, normalise
+
+# Chunks written per add_texts call while filling a store
+FILL_BATCH = 50000
+
+
+class MatrixEmbeddings:
+    """
+    Embedding stand-in for synthetic corpora: the text "chunk <i>" embeds to row i of a fixed matrix.
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: list) -> np.ndarray:
+        return self.vectors[[int(text.split()[1]) for text in texts]]
+
+
+def clustered_vectors(count: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    # Gaussian blobs around random centres, which is closer to real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, FILL_BATCH):
+        end = min(start + FILL_BATCH, count)
+        labels = rng.integers(0, clusters, end - start)
+        vectors[start:end] = normalise(centres[labels] + 0.6 * rng.standard_normal((end - start, dim)).astype(np.float32))
+    return vectors
+
+
+def fill(store: LocalVectorStore, count: int):
+    for start in range(0, count, FILL_BATCH):
+        end = min(start + FILL_BATCH, count)
+        texts = [f"chunk {i}" for i in range(start, end)]
+        store.add_texts(texts, metadatas=[{"source": "synthetic"}] * len(texts), ids=texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local vector index recall/QPS benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--kinds", default=",".join(INDEX_KINDS))
+    parser.add_argument("--dtypes", default="float32,float16")
+    args = parser.parse_args()
+
+    print(f"{'chunks':>8} {'kind':<5} {'dtype':<8} {'file MB':>8} {'build s':>8} {'QPS':>9} {'recall@' + str(args.k):>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        vectors = clustered_vectors(size, args.dim, clusters=max(size // 500, 10))
+        # Queries are perturbed copies of corpus vectors, like questions close to indexed chunks
+        rng = np.random.default_rng(1)
+        queries = normalise(vectors[rng.integers(0, size, args.queries)]
+                            + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+        embeddings = MatrixEmbeddings(vectors)
+        exact = None
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for dtype in args.dtypes.split(","):
+                directory = os.path.join(tmp, dtype)
+                fill(LocalVectorStore(directory, embeddings, dtype=dtype), size)
+
+                # Exact float32 flat search is the ground truth, so it always runs first
+                for kind in ["flat"] + [k for k in args.kinds.split(",") if k != "flat"]:
+                    store = LocalVectorStore(directory, embeddings, kind=kind, dtype=dtype)
+                    start = time.perf_counter()
+                    store.search_vectors(queries[:1], args.k)
+                    build = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    _, rows = store.search_vectors(queries, args.k)
+                    qps = len(queries) / (time.perf_counter() - start)
+
+                    if exact is None:
+                        exact = rows
+                    recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(rows, exact)])
+                    size_mb = os.path.getsize(store.vector_path) / 1e6
+                    if kind in args.kinds.split(","):
+                        print(f"{size:>8} {kind:<5} {dtype:<8} {size_mb:>8.1f} {build:>8.2f} {qps:>9.0f} {recall:>10.3f}")
+                    store.close()
+        del vectors
+
+
+if __name__ == "__main__":
+    main()
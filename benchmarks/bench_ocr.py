@@ -0,0 +1,117 @@
+# Benchmark: batch OCR with preprocessing, tiling and blank skipping against one plain Tesseract call per image
+# Renders a fixture set with known text (clean, skewed, high-DPI, low-DPI, poster-sized and blank images)
+# and reports images/sec and word accuracy. Without a Tesseract binary only preprocessing is timed.
+# Run from the repository root with: python -m benchmarks.bench_ocr
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageDraw, ImageFont
+
+from src.ingestion.image_loader import looks_blank, ocr_images, preprocess
+
+WORDS = ("sustainable development goals poverty hunger health education equality water energy work "
+         "industry innovation cities consumption climate oceans land peace partnerships").split()
+
+# name: (canvas size at 300 DPI, stored DPI, rotation in degrees)
+VARIANTS = {
+    "clean": ((2480, 1200), 300, 0.0),
+    "skewed": ((2480, 1200), 300, 3.0),
+    "600dpi": ((2480, 1200), 600, 0.0),
+    "150dpi": ((2480, 1200), 150, 0.0),
+    "poster": ((7000, 5000), 300, 0.0),
+}
+
+
+def render(size: tuple, dpi: int, angle: float, rng: random.Random):
+    # Lines of random words at a 12pt-equivalent size, stored at `dpi`
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=48)
+    words = []
+    for y in range(100, size[1] - 100, 90):
+        line = [rng.choice(WORDS) for _ in range(size[0] // 260)]
+        draw.text((100, y), " ".join(line), font=font, fill=0)
+        words.extend(line)
+    if angle:
+        image = image.rotate(angle, fillcolor=255, resample=Image.BICUBIC)
+    if dpi != 300:
+        image = image.resize((size[0] * dpi // 300, size[1] * dpi // 300), Image.LANCZOS)
+    return image, words
+
+
+def make_fixtures(folder: str, copies: int, blanks: int, seed: int = 0):
+    rng = random.Random(seed)
+    fixtures = []
+    for name, (size, dpi, angle) in VARIANTS.items():
+        for i in range(copies if name != "poster" else 1):
+            image, words = render(size, dpi, angle, rng)
+            path = os.path.join(folder, f"{name}-{i}.png")
+            image.save(path, dpi=(dpi, dpi))
+            fixtures.append((path, words))
+    for i in range(blanks):
+        path = os.path.join(folder, f"blank-{i}.png")
+        noise = np.clip(np.random.default_rng(i).normal(245, 2, (1200, 1700)), 0, 255).astype(np.uint8)
+        Image.fromarray(noise).save(path, dpi=(300, 300))
+        fixtures.append((path, []))
+    return fixtures
+
+
+def word_accuracy(fixtures: list, texts: list) -> float:
+    # Share of expected words recovered, counting repeats
+    found = expected = 0
+    for (_, words), text in zip(fixtures, texts):
+        truth, seen = Counter(words), Counter(text.lower().split())
+        found += sum(min(count, seen[word]) for word, count in truth.items())
+        expected += len(words)
+    return found / max(expected, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch OCR preprocessing and throughput benchmark")
+    parser.add_argument("--copies", type=int, default=4, help="Images per variant (one poster)")
+    parser.add_argument("--blanks", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = make_fixtures(tmp, args.copies, args.blanks)
+        paths = [path for path, _ in fixtures]
+        print(f"{len(paths)} fixture images ({args.blanks} blank)")
+
+        start = time.perf_counter()
+        blank = 0
+        for path in paths:
+            gray, _ = preprocess(Image.open(path))
+            blank += looks_blank(gray)
+        elapsed = time.perf_counter() - start
+        print(f"{'preprocess + blank':<22} {len(paths) / elapsed:6.1f} images/s  {blank} skipped as blank")
+
+        if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+            print("tesseract not found: OCR throughput and accuracy not measured")
+            return
+
+        start = time.perf_counter()
+        texts = [pytesseract.image_to_string(Image.open(path)) for path in paths]
+        elapsed = time.perf_counter() - start
+        print(f"{'image_to_string':<22} {len(paths) / elapsed:6.1f} images/s  accuracy={word_accuracy(fixtures, texts):.3f}")
+
+        start = time.perf_counter()
+        results = ocr_images(paths, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        texts = [result.text for result in results]
+        words = sum(len(result.words) for result in results)
+        print(f"{f'ocr_images, {args.workers} workers':<22} {len(paths) / elapsed:6.1f} images/s  "
+              f"accuracy={word_accuracy(fixtures, texts):.3f}  {words} word boxes  "
+              f"{sum(r.skipped == 'blank' for r in results)} skipped")
+
+
+if __name__ == "__main__":
+    main()
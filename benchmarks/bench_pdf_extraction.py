@@ -0,0 +1,82 @@
+# Benchmark: page-parallel PDF extraction against the previous single-process string concatenation
+# Builds a synthetic 1,000-page PDF (with a few image-only "scanned" pages), so the run needs no data files
+# Run from the repository root with: python -m benchmarks.bench_pdf_extraction
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import fitz
+
+from src.ingestion.pdf_loader import iter_pdf_pages
+
+WORDS = ("sustainable development goals poverty hunger health education equality water energy work "
+         "industry innovation cities consumption climate oceans land peace partnerships").split()
+
+
+def make_pdf(path: str, pages: int, scanned_every: int, seed: int = 0):
+    # Text pages carry a heading and several paragraphs; every `scanned_every`-th page is only an image
+    rng = random.Random(seed)
+    doc = fitz.open()
+    image = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 200, 100), False)
+    image.clear_with(200)
+    for number in range(pages):
+        page = doc.new_page()
+        if scanned_every and number % scanned_every == scanned_every - 1:
+            page.insert_image(fitz.Rect(72, 72, 472, 272), pixmap=image)
+            continue
+        page.insert_text((72, 72), f"Section {number + 1}", fontsize=16)
+        y = 110
+        for _ in range(8):
+            paragraph = " ".join(rng.choice(WORDS) for _ in range(70))
+            page.insert_textbox(fitz.Rect(72, y, 540, y + 80), paragraph, fontsize=9)
+            y += 85
+    doc.save(path)
+
+
+def legacy_extract(path: str) -> str:
+    # Previous loader: one process, one growing string, page boundaries lost
+    doc = fitz.open(path)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    return text.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page-parallel PDF extraction benchmark")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--scanned-every", type=int, default=100, help="Every Nth page is an image-only scan")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    # OCR runs only where Tesseract is installed; otherwise scanned pages are just detected and counted
+    ocr = shutil.which("tesseract") is not None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        make_pdf(path, args.pages, args.scanned_every)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB, OCR {'on' if ocr else 'off (no tesseract)'}")
+
+        start = time.perf_counter()
+        text = legacy_extract(path)
+        print(f"{'legacy +=':<22} {time.perf_counter() - start:6.2f}s  {len(text):>9} chars")
+
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            first, chars, blocks, scanned = None, 0, 0, 0
+            for page in iter_pdf_pages(path, workers=workers, ocr=ocr):
+                first = first or time.perf_counter() - start
+                chars += len(page.text)
+                blocks += len(page.blocks)
+                scanned += page.scanned
+            elapsed = time.perf_counter() - start
+            print(f"{f'pages, {workers} workers':<22} {elapsed:6.2f}s  {chars:>9} chars  {blocks} blocks  "
+                  f"{scanned} scanned  first page after {first * 1000:.0f} ms  {args.pages / elapsed:.0f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Benchmark: retrieve_similar latency with and without the shared store handle and embedding caches
+# Uses a real, temporary Chroma store; embeddings are faked with per-request latency so the run is offline
+# Run from the repository root with: python -m benchmarks.bench_query_latency
+
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_community.vectorstores import Chroma
+
+from benchmarks.bench_vector_index import make_corpus
+from benchmarks.fakes import FakeEmbeddings
+from src.cache.embedding_cache import CachedEmbeddings, EmbeddingCache
+from src.rag.vector_indexer import index_documents, retrieve_similar
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def measure(label: str, queries: list, search) -> None:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    print(f"{label:<38} p50={percentile(latencies, 0.5) * 1000:8.2f} ms  "
+          f"p99={percentile(latencies, 0.99) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency benchmark for retrieve_similar")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.08, help="Simulated seconds per embedding request")
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    texts, metas = make_corpus(20, 20)
+    queries = [f"What does goal {i} say about sustainable development?" for i in range(args.queries)]
+    fake = FakeEmbeddings(latency=args.latency, per_text=0.0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, "chroma")
+        cache = EmbeddingCache(path=os.path.join(tmp, "embeddings.sqlite"))
+        index_documents(texts, metas, vectorstore=Chroma(persist_directory=store_dir,
+                                                         embedding_function=CachedEmbeddings(fake, cache)))
+
+        # Previous behaviour: a new Chroma client and a remote query embedding on every call
+        measure("new client + uncached embedding", queries, lambda q: Chroma(
+            persist_directory=store_dir, embedding_function=fake).similarity_search(q, k=args.k))
+
+        # Shared handle: the first call of each query embeds it, repeats hit the in-memory TTL cache
+        store = Chroma(persist_directory=store_dir, embedding_function=CachedEmbeddings(fake, cache, model="bench"))
+        measure("shared handle, cold queries", queries, lambda q: retrieve_similar(q, args.k, vectorstore=store))
+        measure("shared handle, warm queries", queries, lambda q: retrieve_similar(q, args.k, vectorstore=store))
+
+        # A fresh process: the in-memory cache is empty but the on-disk cache still has every query
+        store = Chroma(persist_directory=store_dir, embedding_function=CachedEmbeddings(fake, cache, model="bench"))
+        measure("new process, on-disk cache warm", queries, lambda q: retrieve_similar(q, args.k, vectorstore=store))
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
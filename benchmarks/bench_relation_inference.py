@@ -0,0 +1,66 @@
+# Benchmark: sequential per-pair relation inference vs the batched async engine
+# Run from the repository root with: python -m benchmarks.bench_relation_inference
+
+import argparse
+import time
+from itertools import combinations
+
+from benchmarks.fakes import FakeChatModel, make_entities
+from src.graph.batch_relation_inferencer import infer_relationships_batched
+
+
+def run_sequential(entities, llm):
+    # Mirrors relation_inferencer.infer_relationships: one blocking call per pair
+    relations = []
+    for a, b in combinations(entities, 2):
+        prompt = f'A: "{a["name"]}" [{a["type"]}]\nB: "{b["name"]}" [{b["type"]}]'
+        result = llm.invoke(prompt).content.strip()
+        if result != "NONE":
+            relations.append((a["name"], result, b["name"]))
+    return relations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relation inference benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake per-call latency in seconds")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--sequential-budget", type=float, default=30.0,
+                        help="Only run the sequential baseline when its projected time is below this")
+    args = parser.parse_args()
+
+    print(f"{'entities':>8} {'pairs':>7} {'mode':>10} {'calls':>7} {'wall_s':>9} {'pairs/s':>10}")
+    for n in args.sizes:
+        entities = make_entities(n)
+        pairs = n * (n - 1) // 2
+
+        # Sequential baseline, projected instead of run when it would take too long
+        projected = pairs * args.latency
+        if projected <= args.sequential_budget:
+            llm = FakeChatModel(latency=args.latency)
+            start = time.perf_counter()
+            expected = run_sequential(entities, llm)
+            wall = time.perf_counter() - start
+            print(f"{n:>8} {pairs:>7} {'sequential':>10} {llm.calls:>7} {wall:>9.2f} {pairs / wall:>10.1f}")
+        else:
+            expected = None
+            print(f"{n:>8} {pairs:>7} {'sequential':>10} {pairs:>7} {projected:>8.2f}* {1 / args.latency:>10.1f}")
+
+        llm = FakeChatModel(latency=args.latency)
+        start = time.perf_counter()
+        relations = infer_relationships_batched(
+            entities, llm=llm, batch_size=args.batch_size, max_concurrency=args.max_concurrency
+        )
+        wall = time.perf_counter() - start
+        print(f"{n:>8} {pairs:>7} {'batched':>10} {llm.calls:>7} {wall:>9.2f} {pairs / wall:>10.1f}")
+
+        # The batched engine must return exactly what the per-pair path returns
+        if expected is not None and relations != expected:
+            raise SystemExit(f"Batched output differs from sequential output for {n} entities")
+
+    print("* projected from the fake latency, not measured")
+
+
+if __name__ == "__main__":
+    main()
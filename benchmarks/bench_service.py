@@ -0,0 +1,126 @@
+# Benchmark: concurrent load on the HTTP service
+# QA endpoints and ingestion jobs are served by stubs that sleep for a realistic time,
+# so the run measures the service itself (event loop, thread pool, job queue, workers), offline
+# Run from the repository root with: python -m benchmarks.bench_service
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from src.service.api import create_app
+
+# Simulated seconds per call, read by the stubs in both the server and the worker processes
+QA_SECONDS = float(os.getenv("BENCH_QA_SECONDS", "0.05"))
+INGEST_SECONDS = float(os.getenv("BENCH_INGEST_SECONDS", "0.2"))
+
+
+def stub_ingest_job(payload: dict) -> dict:
+    time.sleep(INGEST_SECONDS)
+    return {"document": payload["filename"], "bytes": os.path.getsize(payload["path"])}
+
+
+def stub_graph_qa(question: str) -> dict:
+    time.sleep(QA_SECONDS)
+    return {"question": question, "answer": "stub"}
+
+
+def stub_rag(question: str, k: int, hybrid: bool) -> dict:
+    time.sleep(QA_SECONDS)
+    return {"documents": [{"source": "stub.pdf", "content": question}] * k}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def load(client, method: str, url: str, requests: int, concurrency: int, **kwargs):
+    # Keep `concurrency` requests in flight until `requests` have completed
+    latencies, responses = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            responses.append(response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - start, latencies, responses
+
+
+def report(label: str, elapsed: float, latencies: list):
+    ordered = sorted(latencies)
+    print(f"{label:<18} {len(ordered) / elapsed:8.1f} req/s  p50={statistics.median(ordered) * 1000:7.1f} ms  "
+          f"p99={ordered[int(0.99 * (len(ordered) - 1))] * 1000:7.1f} ms")
+
+
+async def run(base_url: str, args):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        elapsed, latencies, _ = await load(client, "GET", "/health", args.requests, args.concurrency)
+        report("GET /health", elapsed, latencies)
+        for path in ("/qa/graph", "/qa/rag"):
+            elapsed, latencies, _ = await load(client, "POST", path, args.requests, args.concurrency,
+                                               json={"question": "Who advocates for clean water?"})
+            report(f"POST {path}", elapsed, latencies)
+
+        # Uploads return as soon as the file is on disk; jobs then drain through the worker pool
+        body = os.urandom(args.upload_kb * 1024)
+        start = time.perf_counter()
+        elapsed, latencies, responses = await load(client, "POST", "/documents", args.uploads, args.concurrency,
+                                                   params={"filename": "report.pdf"}, content=body)
+        report("POST /documents", elapsed, latencies)
+        pending = {r.json()["job_id"] for r in responses}
+        while pending:
+            await asyncio.sleep(0.05)
+            statuses = await asyncio.gather(*(client.get(f"/jobs/{job_id}") for job_id in pending))
+            pending = {s.json()["id"] for s in statuses if s.json()["status"] not in ("done", "failed")}
+        elapsed = time.perf_counter() - start
+        counts = (await client.get("/health")).json()["jobs"]
+        print(f"ingestion jobs     {args.uploads / elapsed:8.1f} jobs/s with {args.workers} workers  {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP service load benchmark with stubbed QA and ingestion")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per QA/health endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--uploads", type=int, default=100)
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4, help="Ingestion worker processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(
+            db_path=os.path.join(tmp, "jobs.sqlite"),
+            workers=args.workers,
+            handler="benchmarks.bench_service:stub_ingest_job",
+            graph_qa=stub_graph_qa,
+            rag=stub_rag,
+            upload_dir=os.path.join(tmp, "uploads"),
+        )
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        try:
+            asyncio.run(run(f"http://127.0.0.1:{port}", args))
+        finally:
+            server.should_exit = True
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Benchmark: real-time factor and resident memory of each transcription backend
+# Each backend runs in its own subprocess so RSS figures do not mix
+# Run from the repository root with: python -m benchmarks.bench_transcription
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def media_duration(path: str) -> float:
+    # Duration of the media file in seconds, read from the container header
+    import av
+    with av.open(path) as container:
+        return container.duration / av.time_base
+
+
+def run_backend(backend: str, model_size: str, path: str) -> dict:
+    import psutil
+    from src.ingestion.transcriber import Transcriber
+
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    transcriber = Transcriber(backend=backend, model_size=model_size)
+    start = time.perf_counter()
+    transcriber.backend  # Force the lazy model load
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = transcriber.transcribe(path)
+    transcribe_seconds = time.perf_counter() - start
+
+    duration = media_duration(path)
+    return {
+        "backend": backend,
+        "model_size": model_size,
+        "load_seconds": round(load_seconds, 2),
+        "transcribe_seconds": round(transcribe_seconds, 2),
+        "audio_seconds": round(duration, 2),
+        "real_time_factor": round(transcribe_seconds / duration, 3),
+        "rss_mb": round(process.memory_info().rss / 1e6, 1),
+        "model_rss_mb": round((process.memory_info().rss - rss_before) / 1e6, 1),
+        "characters": len(text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcription backend benchmark")
+    parser.add_argument("--file", default=os.path.join("data", "sdg.mp4"))
+    parser.add_argument("--backends", nargs="+", default=["whisper", "faster-whisper"])
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, args.model_size, args.file)))
+        return
+
+    print(f"{'backend':>15} {'load_s':>7} {'RTF':>7} {'rss_mb':>8} {'model_mb':>9}")
+    for backend in args.backends:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_transcription", "--child", backend,
+             "--model-size", args.model_size, "--file", args.file],
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['backend']:>15} {r['load_seconds']:>7} {r['real_time_factor']:>7} {r['rss_mb']:>8} {r['model_rss_mb']:>9}")
+
+
+if __name__ == "__main__":
+    main()
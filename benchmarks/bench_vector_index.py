@@ -0,0 +1,63 @@
+# Benchmark: full vs incremental vector indexing against a real, temporary Chroma store
+# Embeddings are faked with per-request latency so the run is offline
+# Run from the repository root with: python -m benchmarks.bench_vector_index
+
+import argparse
+import tempfile
+import time
+
+from langchain_community.vectorstores import Chroma
+
+from benchmarks.fakes import FakeEmbeddings
+from src.rag.vector_indexer import BatchedEmbeddings, index_documents
+
+
+def make_corpus(documents: int, paragraphs: int) -> tuple:
+    # Each document is a run of distinct paragraphs, so every chunk is unique
+    texts = [
+        "\n\n".join(f"Document {d} paragraph {p}: " + "sustainable development goal " * 12 for p in range(paragraphs))
+        for d in range(documents)
+    ]
+    return texts, [{"source": f"doc_{d}.txt"} for d in range(documents)]
+
+
+def timed_index(label: str, texts: list, metas: list, store, fake: FakeEmbeddings, **kwargs) -> float:
+    calls, embedded = fake.calls, fake.texts
+    start = time.perf_counter()
+    stats = index_documents(texts, metas, vectorstore=store, **kwargs)
+    seconds = time.perf_counter() - start
+    print(f"{label:<28} {seconds:8.2f}s  embed calls={fake.calls - calls:<4} "
+          f"texts embedded={fake.texts - embedded:<6} {stats}")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental vector indexing benchmark")
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per embedding request")
+    args = parser.parse_args()
+
+    texts, metas = make_corpus(args.documents, args.paragraphs)
+    fake = FakeEmbeddings(latency=args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Chroma(
+            persist_directory=tmp,
+            embedding_function=BatchedEmbeddings(fake, args.batch_size, args.concurrency),
+        )
+
+        first = timed_index("initial index", texts, metas, store, fake)
+        again = timed_index("re-index, unchanged corpus", texts, metas, store, fake)
+
+        # Change one document: its old chunks become stale and its new chunks are embedded
+        texts[0] = texts[0].replace("paragraph", "section")
+        timed_index("re-index, one doc changed", texts, metas, store, fake)
+
+    print(f"\nUnchanged re-index took {again / first:.1%} of the initial index time")
+
+
+if __name__ == "__main__":
+    main()
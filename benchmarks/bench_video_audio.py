@@ -0,0 +1,69 @@
+# Benchmark: peak memory and wall time of video audio extraction
+# Compares the previous moviepy temp-WAV path with streaming PyAV decoding
+# Each mode runs in its own subprocess so peak RSS is measured in isolation
+# Run from the repository root with: python -m benchmarks.bench_video_audio [--transcribe]
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def moviepy_wav(path: str, transcribe: bool):
+    # Previous path: write the whole soundtrack to a WAV file, then load it in full
+    import moviepy.editor as mp
+    import whisper
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = os.path.join(tmp, "temp_audio.wav")
+        mp.VideoFileClip(path).audio.write_audiofile(wav_path, logger=None)
+        if transcribe:
+            from src.ingestion.transcriber import get_transcriber
+            return len(get_transcriber().transcribe(wav_path))
+        return len(whisper.load_audio(wav_path))
+
+
+def pyav_stream(path: str, transcribe: bool):
+    # Current path: decode straight into 16 kHz float32 chunks
+    if transcribe:
+        from src.ingestion.video_loader import extract_audio_text_from_video
+        return len(extract_audio_text_from_video(path))
+    from src.ingestion.video_loader import iter_audio_chunks
+    return sum(len(chunk) for chunk in iter_audio_chunks(path))
+
+
+MODES = {"moviepy-wav": moviepy_wav, "pyav-stream": pyav_stream}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video audio extraction benchmark")
+    parser.add_argument("--file", default=os.path.join("data", "sdg.mp4"))
+    parser.add_argument("--transcribe", action="store_true", help="Include transcription in the measurement")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        start = time.perf_counter()
+        size = MODES[args.child](args.file, args.transcribe)
+        wall = time.perf_counter() - start
+        # ru_maxrss is reported in kilobytes on Linux
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(json.dumps({"mode": args.child, "wall_seconds": round(wall, 2), "peak_rss_mb": round(peak_mb, 1), "output": size}))
+        return
+
+    print(f"{'mode':>12} {'wall_s':>8} {'peak_rss_mb':>12}")
+    for mode in MODES:
+        cmd = [sys.executable, "-m", "benchmarks.bench_video_audio", "--child", mode, "--file", args.file]
+        if args.transcribe:
+            cmd.append("--transcribe")
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['mode']:>12} {r['wall_seconds']:>8} {r['peak_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+# Deterministic local stand-ins for the external models used by the pipeline
+# They expose the same call shapes as the real clients so benchmarks run offline
+
+# Asyncio sleep to simulate network latency without blocking the event loop
+import asyncio
+
+# Stable hashing for deterministic fake answers
+import hashlib
+
+# Serialise fake structured answers
+import json
+
+# Parse entity pairs back out of the rendered prompts
+import re
+
+# Blocking sleep for the synchronous call path
+import time
+
+# Synthetic corpora and audio durations
+import random
+import wave
+
+# Lightweight response object mirroring LangChain's AIMessage.content
+from dataclasses import dataclass
+
+# In-memory graph state keyed by document, entity and relationship
+from collections import defaultdict
+
+# The writer's Cypher statements, matched by the in-memory graph
+from src.graph import graph_writer as gw
+
+# Patterns matching the single-pair and batched relation prompts
+SINGLE_PAIR = re.compile(r'A: "(?P<a>[^"]*)" \[[^\]]*\]\s*B: "(?P<b>[^"]*)"')
+BATCH_PAIR = re.compile(r'^(?P<idx>\d+)\. A: "(?P<a>[^"]*)" \[[^\]]*\] \| B: "(?P<b>[^"]*)"', re.MULTILINE)
+
+# Pattern matching the graph QA text-to-Cypher prompt
+CYPHER_QUESTION = re.compile(r'Question: "(?P<question>.*)"')
+
+# Pattern matching the entity extraction prompt, and the names the fake model "recognises" in its text
+ENTITY_TEXT = re.compile(r"Extract all named entities.*?\nText:\n(?P<text>.*)", re.DOTALL)
+ENTITY_NAME = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)+\b")
+ENTITY_TYPES = ["Person", "Organization", "Location", "Date", "Concept"]
+
+# Words the synthetic corpora are built from; every generated name is two capitalised words
+FIRST_WORDS = ["Aurora", "Boreal", "Cedar", "Delta", "Ember", "Falcon", "Granite", "Harbor", "Iris", "Juniper",
+               "Kestrel", "Linden", "Meridian", "Nova", "Orchid", "Pioneer", "Quartz", "Raven", "Summit", "Tundra"]
+SECOND_WORDS = ["Labs", "Group", "Institute", "Partners", "Council", "Foundation", "Systems", "Works", "Agency",
+                "Academy", "Studio", "Network", "Alliance", "Ventures", "Collective", "Bureau", "Trust", "Forum"]
+SENTENCES = [
+    "{a} partnered with {b} on a new programme.",
+    "{a} published a report about {b} and {c}.",
+    "{a} hired staff from {b}.",
+    "{a} and {b} met to review the budget of {c}.",
+    "{a} is funded by {b}.",
+]
+
+
+@dataclass
+class FakeMessage:
+    content: str
+
+
+def hashed_relation(a: str, b: str, rate: float = 0.2):
+    """
+    Default fake knowledge: a stable pseudo-random subset of pairs is related.
+    """
+    digest = hashlib.sha256(f"{a}|{b}".encode()).digest()
+    return "RELATED_TO" if digest[0] / 255 < rate else None
+
+
+class FakeChatModel:
+    """
+    Chat model stand-in with configurable per-call latency:
+    - Answers single-pair relation prompts with one label or NONE
+    - Answers batched relation prompts with the JSON structure they request
+    - Answers entity extraction prompts with every capitalised multi-word name in the text
+    - Answers text-to-Cypher prompts with a fenced read query
+    - Counts calls so benchmarks can report round trips
+    """
+
+    def __init__(self, latency: float = 0.05, relation_fn=hashed_relation):
+        self.latency = latency
+        self.relation_fn = relation_fn
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        self.calls += 1
+        batch = list(BATCH_PAIR.finditer(prompt))
+        if batch:
+            relations = [
+                {"pair": int(m["idx"]), "label": self.relation_fn(m["a"], m["b"]) or "NONE"}
+                for m in batch
+            ]
+            return json.dumps({"relations": relations})
+        single = SINGLE_PAIR.search(prompt)
+        if single:
+            return self.relation_fn(single["a"], single["b"]) or "NONE"
+        text = ENTITY_TEXT.search(prompt)
+        if text:
+            names = dict.fromkeys(ENTITY_NAME.findall(text["text"]))
+            return json.dumps({"entities": [
+                {"name": name, "type": ENTITY_TYPES[hashlib.sha256(name.encode()).digest()[0] % len(ENTITY_TYPES)]}
+                for name in names
+            ]})
+        question = CYPHER_QUESTION.search(prompt)
+        if question:
+            words = json.dumps(question["question"].lower().split())
+            return f"```cypher\nMATCH (e:Entity) WHERE toLower(e.name) IN {words} RETURN e.name AS name LIMIT 25\n```"
+        return "NONE"
+
+    def invoke(self, prompt: str) -> FakeMessage:
+        time.sleep(self.latency)
+        return FakeMessage(self._answer(prompt))
+
+    async def ainvoke(self, prompt: str) -> FakeMessage:
+        await asyncio.sleep(self.latency)
+        return FakeMessage(self._answer(prompt))
+
+
+def synthetic_names(count: int) -> list:
+    # Distinct two-word names, enough for a few hundred entities
+    names = [f"{first} {second}" for second in SECOND_WORDS for first in FIRST_WORDS]
+    return names[:count]
+
+
+def synthetic_text(seed, sentences: int = 40, vocabulary: int = 300) -> str:
+    """
+    Deterministic prose for synthetic documents: every sentence names two or three entities
+    from a shared vocabulary, and paragraphs are five sentences long.
+    """
+    rng = random.Random(seed)
+    names = synthetic_names(vocabulary)
+    lines = [rng.choice(SENTENCES).format(a=rng.choice(names), b=rng.choice(names), c=rng.choice(names))
+             for _ in range(sentences)]
+    return "\n\n".join(" ".join(lines[i:i + 5]) for i in range(0, len(lines), 5))
+
+
+def content_seed(data) -> int:
+    # Stable seed from file contents or an array's bytes
+    return int.from_bytes(hashlib.sha256(bytes(data)).digest()[:8], "big")
+
+
+def make_entities(count: int) -> list:
+    # Synthetic entities with a spread of types
+    types = ["Person", "Organization", "Location", "Date", "Concept"]
+    return [{"name": f"Entity {i}", "type": types[i % len(types)]} for i in range(count)]
+
+
+class FakeRecord(dict):
+    """
+    Minimal stand-in for a neo4j Record: subscriptable, with data().
+    """
+
+    def data(self):
+        return dict(self)
+
+
+class FakeResult(list):
+    """
+    Minimal stand-in for a neo4j Result: an iterable of records.
+    """
+
+    def data(self):
+        return [record.data() for record in self]
+
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        return None
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query: str, **params):
+        return self.driver.record(query, params)
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, **params):
+        return self.driver.record(query, params)
+
+    def execute_write(self, fn, *args, **kwargs):
+        # Each managed transaction costs one commit round trip on top of its statements
+        self.driver.transactions += 1
+        time.sleep(self.driver.round_trip)
+        return fn(FakeTransaction(self.driver), *args, **kwargs)
+
+    execute_read = execute_write
+
+
+class FakeDriver:
+    """
+    Recorded-session stand-in for the Neo4j driver:
+    - Every statement costs one network round trip plus a per-row server cost
+    - Statements and parameters are recorded so benchmarks can count rows and calls
+    - An optional `responder(query, params)` returns rows (dicts) for read queries
+    """
+
+    def __init__(self, round_trip: float = 0.002, per_row: float = 0.00002, responder=None):
+        self.round_trip = round_trip
+        self.per_row = per_row
+        self.responder = responder
+        self.statements = []
+        self.transactions = 0
+        self.schema = {}
+
+    def record(self, query: str, params: dict):
+        rows = len(params.get("rows", [])) or 1
+        time.sleep(self.round_trip + self.per_row * rows)
+        self.statements.append((query, params))
+
+        # Track schema objects so KnowledgeGraph.ensure_schema can verify them
+        created = re.match(r"\s*CREATE (CONSTRAINT|INDEX) (\w+)", query)
+        if created:
+            self.schema[created.group(2)] = created.group(1)
+        if query.startswith("SHOW CONSTRAINTS"):
+            return FakeResult(FakeRecord(name=n) for n, kind in self.schema.items() if kind == "CONSTRAINT")
+        if query.startswith("SHOW INDEXES"):
+            return FakeResult(FakeRecord(name=n, state="ONLINE") for n in self.schema)
+        if self.responder:
+            return FakeResult(FakeRecord(row) for row in self.responder(query, params) or [])
+        return FakeResult()
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+
+class FakeEmbeddings:
+    """
+    Embedding model stand-in:
+    - Every text maps to a stable unit vector derived from its hash
+    - Each embed_documents/embed_query call costs `latency` plus `per_text` per text
+    - Counts calls and embedded texts so benchmarks can report embedding work
+    """
+
+    def __init__(self, dim: int = 64, latency: float = 0.05, per_text: float = 0.0005):
+        self.dim = dim
+        self.latency = latency
+        self.per_text = per_text
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> list:
+        digest = hashlib.shake_256(text.encode()).digest(self.dim)
+        vector = [b / 255 - 0.5 for b in digest]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: list) -> list:
+        time.sleep(self.latency + self.per_text * len(texts))
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list) -> list:
+        await asyncio.sleep(self.latency + self.per_text * len(texts))
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list:
+        return (await self.aembed_documents([text]))[0]
+
+
+class InMemoryGraph:
+    """
+    Applies the writer's statements to Python sets: documents, tagged MENTIONS and tagged relationships.
+    """
+
+    def __init__(self):
+        self.documents = defaultdict(dict)
+        self.mentions = defaultdict(set)     # (filename, entity id) -> source tags
+        self.edges = defaultdict(set)        # (type, a, b) -> source tags
+        self.entities = set()
+
+    def __call__(self, query: str, params: dict):
+        rel = re.search(r"\[r:(\w+)\]", query)
+        if query == gw.DOCUMENT_STATE:
+            props = self.documents.get(params["filename"])
+            return [{"content_hash": props.get(params["hash_key"]), "pipeline_version": props.get(params["version_key"])}] if props else []
+        if query == gw.CURRENT_MENTIONS:
+            return [{"id": e} for (f, e), tags in self.mentions.items() if f == params["filename"] and params["tag"] in tags]
+        if query == gw.CURRENT_EDGES:
+            mentioned = {e for (f, e) in self.mentions if f == params["filename"]}
+            return [{"type": t, "a": a, "b": b} for (t, a, b), tags in self.edges.items()
+                    if a in mentioned and params["tag"] in tags]
+        if query == gw.SET_DOCUMENT_STATE:
+            self.documents[params["filename"]].update(params["props"])
+        elif query == gw.MERGE_ENTITIES:
+            self.documents.setdefault(params["filename"], {})
+            for row in params["rows"]:
+                self.entities.add(row["id"])
+                self.mentions[(params["filename"], row["id"])].add(params["tag"])
+        elif query == gw.RETRACT_MENTIONS:
+            for ent_id in params["ids"]:
+                key = (params["filename"], ent_id)
+                self.mentions[key].discard(params["tag"])
+                if not self.mentions[key]:
+                    del self.mentions[key]
+        elif query == gw.DELETE_ORPHANS:
+            mentioned = {e for (_, e) in self.mentions}
+            for ent_id in params["ids"]:
+                if ent_id not in mentioned:
+                    self.entities.discard(ent_id)
+                    for key in [k for k in self.edges if ent_id in k[1:]]:
+                        del self.edges[key]
+        elif rel and "MERGE (a)" in query:
+            for row in params["rows"]:
+                tags = self.edges[(rel.group(1), row["a"], row["b"])]
+                if params.get("tag"):
+                    tags.add(params["tag"])
+        elif rel:
+            for row in params["rows"]:
+                key = (rel.group(1), row["a"], row["b"])
+                self.edges[key].discard(params["tag"])
+                if not self.edges[key]:
+                    del self.edges[key]
+        return []
+
+    def snapshot(self) -> tuple:
+        return set(self.mentions), set(self.edges)
+
+
+# Tokens for the offline tokenizer: a word or punctuation mark with the whitespace before it
+FAKE_TOKEN = re.compile(r"\s*(?:\w+|[^\w\s])|\s+")
+
+
+class FakeEncoding:
+    """
+    Tokenizer stand-in used when tiktoken's BPE files cannot be downloaded:
+    - One token per word or punctuation mark, so chunks hold somewhat fewer characters than with BPE
+    - The same encode/decode_with_offsets calls that chunk_text makes on a tiktoken Encoding
+    """
+
+    def encode(self, text: str) -> list:
+        return FAKE_TOKEN.findall(text)
+
+    def decode_with_offsets(self, tokens: list) -> tuple:
+        offsets, position = [], 0
+        for token in tokens:
+            offsets.append(position)
+            position += len(token)
+        return "".join(tokens), offsets
+
+
+class FakeTranscriberBackend:
+    """
+    Whisper stand-in registered as the "fake" transcription backend:
+    - Costs `realtime_factor` seconds per second of audio, read from the WAV header or the array length
+    - Returns synthetic prose seeded by the audio, so the same recording always gives the same transcript
+    """
+
+    name = "fake"
+    realtime_factor = 0.01
+
+    def __init__(self, model_size: str, **_):
+        self.model_size = model_size
+
+    def transcribe(self, audio) -> str:
+        if isinstance(audio, str):
+            with wave.open(audio) as f:
+                seconds = f.getnframes() / f.getframerate()
+                seed = content_seed(f.readframes(16000))
+        else:
+            seconds = len(audio) / 16000
+            seed = content_seed(audio[:16000].tobytes())
+        time.sleep(seconds * self.realtime_factor)
+        return synthetic_text(seed, sentences=max(1, int(seconds / 5)))
+
+    def transcribe_batch(self, audios: list, batch_size: int = 8) -> list:
+        return [self.transcribe(audio) for audio in audios]
+
+
+class FakeOcr:
+    """
+    Stand-in for image_loader.ocr_image when Tesseract is not installed:
+    - Runs the real preprocessing and blank-page check, so their CPU cost stays in the measurement
+    - Then costs `seconds_per_megapixel` and returns synthetic prose seeded by the image
+    """
+
+    def __init__(self, seconds_per_megapixel: float = 0.05):
+        self.seconds_per_megapixel = seconds_per_megapixel
+
+    def __call__(self, image, source: str = "", dpi: float = None):
+        from PIL import Image
+        from src.ingestion.image_loader import OcrResult, looks_blank, preprocess
+
+        start = time.perf_counter()
+        if isinstance(image, str):
+            source = source or image
+            image = Image.open(image)
+        result = OcrResult(source)
+        gray, _ = preprocess(image, dpi)
+        if looks_blank(gray):
+            result.skipped = "blank"
+        else:
+            time.sleep(gray.size / 1e6 * self.seconds_per_megapixel)
+            result.text = synthetic_text(content_seed(gray[::16, ::16].tobytes()), sentences=10)
+        result.seconds = time.perf_counter() - start
+        return result
+
+
+class FakeCaptioner:
+    """
+    Stand-in for llava_captioner.generate_captions: `latency` seconds per batch of frames,
+    and one stable caption per frame derived from its pixels.
+    """
+
+    def __init__(self, latency: float = 0.5):
+        self.latency = latency
+        self.batches = 0
+
+    def __call__(self, images: list, batch_size: int = 4, max_new_tokens: int = 100) -> list:
+        import numpy as np
+
+        captions = []
+        names = synthetic_names(100)
+        for i in range(0, len(images), batch_size):
+            batch = images[i:i + batch_size]
+            time.sleep(self.latency)
+            self.batches += 1
+            for image in batch:
+                seed = content_seed(np.asarray(image)[::32, ::32].tobytes())
+                captions.append(f"A slide presenting {names[seed % len(names)]}")
+        return captions
+
+
+# Simulated costs used by install_fakes unless overridden
+DEFAULT_LATENCIES = {
+    "llm": 0.05,
+    "embedding": 0.02,
+    "transcribe_realtime": 0.01,
+    "ocr_megapixel": 0.05,
+    "caption_batch": 0.5,
+}
+
+
+def install_fakes(latencies: dict = None) -> dict:
+    """
+    Replace every external model in this process with the fakes above:
+    - The shared LLM client (entity extraction, relation inference, Cypher generation)
+    - The shared embedding model, the transcription backend, Tesseract OCR and the LLaVA captioner
+    - tiktoken's GPT-4 encoding, only when its BPE files cannot be loaded
+    Also usable as a process-pool initializer, so worker processes run on the same fakes.
+    Returns the settings in effect, for recording alongside results.
+    """
+    from src.extraction import chunked_extractor
+    from src.ingestion import image_loader, transcriber
+    from src.llm import client
+    from src.models.registry import get_model_registry
+    from src.vision import llava_captioner
+
+    latencies = {**DEFAULT_LATENCIES, **(latencies or {})}
+
+    # No response cache, so repeated runs measure the same number of model calls
+    models = get_model_registry()
+    models.put(f"llm:{client.OPENAI_MODEL}", client.LLMClient(model=FakeChatModel(latencies["llm"]), cache_size=0))
+    models.put("embeddings", FakeEmbeddings(latency=latencies["embedding"]))
+
+    FakeTranscriberBackend.realtime_factor = latencies["transcribe_realtime"]
+    transcriber.BACKENDS[FakeTranscriberBackend.name] = FakeTranscriberBackend
+    transcriber.WHISPER_BACKEND = FakeTranscriberBackend.name
+    transcriber._transcribers.clear()
+
+    image_loader.ocr_image = FakeOcr(latencies["ocr_megapixel"])
+    llava_captioner.generate_captions = FakeCaptioner(latencies["caption_batch"])
+
+    try:
+        chunked_extractor.get_encoding()
+        tokenizer = "tiktoken"
+    except Exception:
+        chunked_extractor._encoding = FakeEncoding()
+        tokenizer = "fake"
+    return {**latencies, "tokenizer": tokenizer}
@@ -0,0 +1,504 @@
+# Benchmark suite: one microbenchmark per pipeline stage plus a full-pipeline macro benchmark over
+# synthetic corpora of several sizes. Every external model and service is replaced by the deterministic
+# fakes in benchmarks.fakes, so the suite runs offline, and results are written as JSON so that runs
+# on different commits can be compared.
+# Run from the repository root with: python -m benchmarks.suite --output results.json
+# and compare a later run against it with: python -m benchmarks.suite --compare results.json
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime, timezone
+
+import cv2
+import fitz
+import numpy as np
+
+from benchmarks.fakes import (
+    DEFAULT_LATENCIES, FakeDriver, FakeEmbeddings, InMemoryGraph, install_fakes, synthetic_names, synthetic_text,
+)
+
+# Bumped when benchmarks are added, removed or change what they measure
+SUITE_VERSION = 1
+
+# Registered microbenchmarks by "<package>.<stage>" name
+MICROBENCHMARKS = {}
+
+
+def microbenchmark(name: str):
+    """
+    Register a microbenchmark. It receives (workdir, scale), does its setup, and returns
+    (items, run) where run() is the timed call processing `items` items.
+    """
+    def register(fn):
+        MICROBENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+# ---------- synthetic inputs ----------
+
+def make_pdf(path: str, pages: int, seed: int = 0):
+    # One paragraph block per few sentences of synthetic prose on every page
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 770), synthetic_text(f"{seed}:{number}", sentences=15), fontsize=9)
+    doc.save(path)
+
+
+def make_image(path: str, seed: int = 0, size: tuple = (1700, 2200)):
+    # A letter-sized page at 200 DPI with lines of text, slightly rotated like a scan
+    rng = random.Random(seed)
+    image = np.full((size[1], size[0]), 255, np.uint8)
+    for y in range(150, size[1] - 150, 60):
+        words = " ".join(rng.choice(synthetic_names(60)) for _ in range(4))
+        cv2.putText(image, words, (120, y), cv2.FONT_HERSHEY_SIMPLEX, 1.1, 0, 2)
+    matrix = cv2.getRotationMatrix2D((size[0] / 2, size[1] / 2), rng.uniform(-2, 2), 1.0)
+    cv2.imwrite(path, cv2.warpAffine(image, matrix, size, borderValue=255))
+
+
+def make_wav(path: str, seconds: float, seed: int = 0):
+    # 16 kHz mono noise; the fake transcriber only reads its length and first second
+    rng = np.random.default_rng(seed)
+    samples = (rng.standard_normal(int(seconds * 16000)) * 3000).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(samples.tobytes())
+
+
+def make_video(path: str, seconds: int, slide_seconds: int = 10, fps: int = 10, seed: int = 0):
+    # A slide deck: each slide is a flat colour with a caption, held for `slide_seconds`
+    rng = random.Random(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (640, 360))
+    for slide in range(0, seconds, slide_seconds):
+        frame = np.full((360, 640, 3), [rng.randrange(256) for _ in range(3)], np.uint8)
+        cv2.putText(frame, rng.choice(synthetic_names(60)), (40, 180), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+        for _ in range(slide_seconds * fps):
+            writer.write(frame)
+    writer.release()
+
+
+def document_entities(text: str) -> list:
+    # Entities with spans, as the extraction stage would produce them for `text`
+    from benchmarks.fakes import ENTITY_NAME
+    from src.extraction.entity_extractor import attach_spans
+
+    names = dict.fromkeys(ENTITY_NAME.findall(text))
+    return attach_spans(text, [{"name": name, "type": "Concept"} for name in names])
+
+
+# ---------- ingestion ----------
+
+@microbenchmark("ingestion.pdf_pages")
+def pdf_pages(workdir: str, scale: float):
+    from src.ingestion.pdf_loader import iter_pdf_pages
+
+    pages = max(1, int(200 * scale))
+    path = os.path.join(workdir, "micro.pdf")
+    make_pdf(path, pages)
+    return pages, lambda: sum(1 for _ in iter_pdf_pages(path, workers=1))
+
+
+@microbenchmark("ingestion.image_ocr")
+def image_ocr(workdir: str, scale: float):
+    from src.ingestion.image_loader import ocr_images
+
+    count = max(1, int(8 * scale))
+    paths = []
+    for i in range(count):
+        paths.append(os.path.join(workdir, f"micro-{i}.png"))
+        make_image(paths[-1], seed=i)
+    return count, lambda: ocr_images(paths, workers=1)
+
+
+@microbenchmark("ingestion.transcription")
+def transcription(workdir: str, scale: float):
+    from src.ingestion.audio_loader import extract_text_from_audio
+
+    count = max(1, int(10 * scale))
+    paths = []
+    for i in range(count):
+        paths.append(os.path.join(workdir, f"micro-{i}.wav"))
+        make_wav(paths[-1], seconds=30, seed=i)
+    return count, lambda: [extract_text_from_audio(path) for path in paths]
+
+
+@microbenchmark("ingestion.frame_sampling")
+def frame_sampling(workdir: str, scale: float):
+    from src.ingestion.frame_extractor import sample_key_frames
+
+    seconds = max(10, int(300 * scale))
+    path = os.path.join(workdir, "micro.mp4")
+    make_video(path, seconds)
+    return seconds, lambda: sample_key_frames(path, mode="seek", every_n_seconds=5)
+
+
+# ---------- extraction ----------
+
+@microbenchmark("extraction.chunk_text")
+def chunk_text(workdir: str, scale: float):
+    from src.extraction.chunked_extractor import chunk_text
+
+    text = synthetic_text(0, sentences=max(1, int(5000 * scale)))
+    return len(text) // 1000, lambda: chunk_text(text)
+
+
+@microbenchmark("extraction.entities_chunked")
+def entities_chunked(workdir: str, scale: float):
+    from src.extraction.chunked_extractor import aextract_entities_chunked, chunk_text
+
+    text = synthetic_text(0, sentences=max(1, int(1000 * scale)))
+    return len(chunk_text(text)), lambda: asyncio.run(aextract_entities_chunked(text))
+
+
+# ---------- graph ----------
+
+@microbenchmark("graph.candidate_pairs")
+def candidate_pairs(workdir: str, scale: float):
+    from src.graph.candidate_pairs import candidate_pairs
+
+    text = synthetic_text(0, sentences=max(1, int(600 * scale)))
+    entities = document_entities(text)
+    return len(entities), lambda: candidate_pairs(entities, text)
+
+
+@microbenchmark("graph.relation_inference")
+def relation_inference(workdir: str, scale: float):
+    from src.graph.batch_relation_inferencer import ainfer_relationships_batched
+    from src.graph.candidate_pairs import candidate_pairs
+
+    text = synthetic_text(0, sentences=max(1, int(300 * scale)))
+    entities = document_entities(text)
+    pairs, _ = candidate_pairs(entities, text)
+    return len(pairs), lambda: asyncio.run(ainfer_relationships_batched(entities, pairs=pairs))
+
+
+@microbenchmark("graph.entity_resolution")
+def entity_resolution(workdir: str, scale: float):
+    from src.graph.entity_resolver import EntityResolver
+
+    rng = random.Random(0)
+    names = synthetic_names(360)
+    # Mentions repeat names with the spelling and case variations extraction produces
+    variants = [str.lower, str.upper, lambda n: n, lambda n: n + "s", lambda n: n.replace(" ", "  ")]
+    mentions = [{"name": rng.choice(variants)(rng.choice(names)), "type": "Concept"}
+                for _ in range(max(1, int(5000 * scale)))]
+
+    def run():
+        resolver = EntityResolver(":memory:")
+        resolver.resolve_many(mentions)
+        resolver.close()
+
+    return len(mentions), run
+
+
+@microbenchmark("graph.sync_document")
+def sync_document(workdir: str, scale: float):
+    from src.graph.entity_resolver import EntityResolver
+    from src.graph.graph_writer import KnowledgeGraph
+
+    documents = []
+    for i in range(max(1, int(50 * scale))):
+        text = synthetic_text(i, sentences=40)
+        entities = document_entities(text)
+        rels = [(a["name"], "RELATED_TO", b["name"]) for a, b in zip(entities, entities[1:])]
+        documents.append((f"doc-{i}.pdf", entities, rels))
+
+    def run():
+        graph = KnowledgeGraph(driver=FakeDriver(round_trip=0.001, responder=InMemoryGraph()),
+                               resolver=EntityResolver(":memory:"))
+        for name, entities, rels in documents:
+            graph.sync_document(name, entities, rels, f"hash-{name}", "bench")
+
+    return len(documents), run
+
+
+# ---------- rag ----------
+
+def chunk_corpus(count: int) -> tuple:
+    texts = [synthetic_text(i, sentences=8) for i in range(count)]
+    return texts, [{"source": f"doc-{i // 10}.pdf"} for i in range(count)]
+
+
+@microbenchmark("rag.bm25")
+def bm25(workdir: str, scale: float):
+    from src.rag.hybrid_retriever import BM25Index
+
+    texts, metadata = chunk_corpus(max(1, int(2000 * scale)))
+    questions = [f"Who works with {name}?" for name in synthetic_names(100)]
+
+    def run():
+        index = BM25Index()
+        for i, (text, meta) in enumerate(zip(texts, metadata)):
+            index.add(str(i), text, meta)
+        for question in questions:
+            index.search(question, 10)
+
+    return len(texts) + len(questions), run
+
+
+@microbenchmark("rag.local_index")
+def local_index(workdir: str, scale: float):
+    from src.rag.local_index import LocalVectorStore
+
+    texts, metadata = chunk_corpus(max(1, int(2000 * scale)))
+    questions = [f"Who works with {name}?" for name in synthetic_names(100)]
+    embeddings = FakeEmbeddings(dim=384, latency=0.0, per_text=0.0)
+    runs = iter(range(1_000_000))
+
+    def run():
+        store = LocalVectorStore(os.path.join(workdir, f"store-{next(runs)}"), embeddings)
+        store.add_texts(texts, metadata)
+        store.similarity_search_batch(questions, k=5)
+        store.close()
+
+    return len(texts) + len(questions), run
+
+
+@microbenchmark("rag.graph_qa")
+def graph_qa(workdir: str, scale: float):
+    from src.rag.cypher_cache import CypherCache
+    from src.rag.graph_qa import answer_question
+
+    names = synthetic_names(50)
+    # Template questions skip the LLM; the rest go through text-to-Cypher and then the Cypher cache
+    questions = [f"Tell me about {name}" for name in names] + [f"Who funds {name}?" for name in names] * 2
+    questions = questions * max(1, int(scale))
+    driver = FakeDriver(round_trip=0.001, responder=lambda query, params: [{"name": "Aurora Labs"}])
+
+    def run():
+        cache = CypherCache()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for question in questions:
+                answer_question(question, cache=cache, driver=driver)
+
+    return len(questions), run
+
+
+@microbenchmark("rag.hybrid_search")
+def hybrid_search(workdir: str, scale: float):
+    from src.rag.hybrid_retriever import HybridRetriever
+    from src.rag.local_index import LocalVectorStore
+
+    texts, metadata = chunk_corpus(max(1, int(1000 * scale)))
+    store = LocalVectorStore(os.path.join(workdir, "hybrid-store"), FakeEmbeddings(dim=384, latency=0.0))
+    store.add_texts(texts, metadata)
+    neighbourhood = [{"filename": f"doc-{i}.pdf", "name": name, "seed": i == 0}
+                     for i, name in enumerate(synthetic_names(5))]
+    driver = FakeDriver(round_trip=0.002, responder=lambda query, params: neighbourhood)
+    questions = [f"How is {a} related to {b}?" for a, b in zip(synthetic_names(50), synthetic_names(51)[1:])]
+    retriever = HybridRetriever(vectorstore=store, driver=driver)
+
+    return len(questions), lambda: [retriever.search(question, k=5) for question in questions]
+
+
+# ---------- vision ----------
+
+@microbenchmark("vision.to_pil")
+def to_pil(workdir: str, scale: float):
+    from src.vision.llava_captioner import to_pil
+
+    frames = [np.full((720, 1280, 3), i, np.uint8) for i in range(max(1, int(100 * scale)))]
+    return len(frames), lambda: [to_pil(frame) for frame in frames]
+
+
+@microbenchmark("vision.caption_video")
+def caption_video(workdir: str, scale: float):
+    from src.pipeline.parallel_ingest import caption_video
+
+    seconds = max(10, int(300 * scale))
+    path = os.path.join(workdir, "captions.mp4")
+    make_video(path, seconds)
+    return seconds, lambda: caption_video(path, os.path.join(workdir, "frames"))
+
+
+# ---------- full pipeline ----------
+
+def make_corpus(folder: str, files: int, seed: int = 0) -> dict:
+    """
+    Synthetic mixed corpus: half PDFs, a quarter scanned images, a quarter audio,
+    plus videos when PyAV (needed to decode their soundtrack) is installed.
+    Returns {modality: count} for the files written.
+    """
+    try:
+        import av  # noqa: F401
+        mix = ["pdf", "pdf", "image", "audio", "pdf", "pdf", "image", "video"]
+    except ImportError:
+        mix = ["pdf", "pdf", "image", "audio"]
+    os.makedirs(folder, exist_ok=True)
+    counts = {}
+    for i in range(files):
+        modality = mix[i % len(mix)]
+        counts[modality] = counts.get(modality, 0) + 1
+        if modality == "pdf":
+            make_pdf(os.path.join(folder, f"doc-{i}.pdf"), pages=10, seed=seed + i)
+        elif modality == "image":
+            make_image(os.path.join(folder, f"scan-{i}.png"), seed=seed + i)
+        elif modality == "audio":
+            make_wav(os.path.join(folder, f"talk-{i}.wav"), seconds=120, seed=seed + i)
+        else:
+            make_video(os.path.join(folder, f"video-{i}.mp4"), seconds=60, seed=seed + i)
+    return counts
+
+
+def run_pipeline(folder: str, latencies: dict, captions: bool) -> dict:
+    from src.graph.entity_resolver import EntityResolver
+    from src.graph.graph_writer import KnowledgeGraph
+    from src.llm.client import get_llm_client
+    from src.pipeline.parallel_ingest import ParallelIngestor, discover_files
+
+    files = discover_files([folder])
+    store = InMemoryGraph()
+    graph = KnowledgeGraph(driver=FakeDriver(responder=store), resolver=EntityResolver(":memory:"))
+    ingestor = ParallelIngestor(use_cache=False, graph=graph, captions=captions,
+                                worker_initializer=install_fakes, initargs=(latencies,))
+    llm = get_llm_client().model
+    calls = llm.calls
+    report = asyncio.run(ingestor.run(files))
+    # Per-file trace summaries are too long for the results file; keep the slowest one
+    summaries = report.pop("file_summaries")
+    return {
+        "slowest_file": max(summaries, key=lambda summary: summary["seconds"], default=None),
+        **report,
+        "llm_calls": llm.calls - calls,
+        "graph": {"entities": len(store.entities), "mentions": len(store.mentions), "edges": len(store.edges)},
+    }
+
+
+# ---------- running and comparing ----------
+
+def timed(run, repeat: int) -> float:
+    # Best of `repeat` runs: the least disturbed by other load on the machine
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def environment(settings: dict, scale: float) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        "suite_version": SUITE_VERSION,
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "fakes": settings,
+        "scale": scale,
+    }
+
+
+def run_suite(args) -> dict:
+    latencies = {**DEFAULT_LATENCIES, "llm": args.llm_latency}
+    settings = install_fakes(latencies)
+    selected = [name for name in MICROBENCHMARKS if not args.only or any(name.startswith(p) for p in args.only)]
+    results = {"environment": environment(settings, args.scale), "micro": {}, "macro": {}}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in selected:
+            stage_dir = os.path.join(workdir, name)
+            os.makedirs(stage_dir)
+            try:
+                items, run = MICROBENCHMARKS[name](stage_dir, args.scale)
+                seconds = timed(run, args.repeat)
+            except ImportError as e:
+                # A stage whose own dependencies are missing is reported, not failed
+                results["micro"][name] = {"skipped": str(e)}
+                print(f"{name:<30} skipped: {e}")
+                continue
+            results["micro"][name] = {"items": items, "seconds": round(seconds, 4),
+                                      "items_per_second": round(items / seconds, 2) if seconds else None}
+            print(f"{name:<30} {items:>7} items  {seconds:>8.3f}s  {items / seconds:>10.1f} items/s")
+
+        if not args.no_macro:
+            for size in args.sizes:
+                folder = os.path.join(workdir, f"corpus-{size}")
+                counts = make_corpus(folder, size)
+                report = run_pipeline(folder, latencies, captions=args.captions)
+                report["modalities"] = counts
+                report["seconds"] = report["wall_seconds"]
+                results["macro"][f"pipeline.files_{size}"] = report
+                print(f"pipeline.files_{size:<15} {size:>7} files  {report['wall_seconds']:>8.3f}s  "
+                      f"{report['files_per_minute']:>10.1f} files/min  ({report['failed']} failed)")
+    return results
+
+
+def compare(previous: dict, current: dict, threshold: float) -> list:
+    """
+    Print the change in seconds for every benchmark present in both runs.
+    Returns the names of benchmarks that got slower by more than `threshold` (a fraction).
+    """
+    if previous["environment"].get("fakes") != current["environment"].get("fakes"):
+        print("Warning: the runs used different fake settings; timings are not directly comparable")
+    regressions = []
+    print(f"\n{'benchmark':<30} {'before':>9} {'after':>9} {'change':>8}")
+    for section in ("micro", "macro"):
+        for name, now in current[section].items():
+            before = previous.get(section, {}).get(name, {})
+            # Only runs over the same input size are comparable
+            if "seconds" not in now or "seconds" not in before or now.get("items", now.get("files")) != \
+                    before.get("items", before.get("files")):
+                continue
+            change = now["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+            flag = "  REGRESSION" if change > threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"{name:<30} {before['seconds']:>8.3f}s {now['seconds']:>8.3f}s {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline per-stage and full-pipeline benchmark suite with JSON results")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against the JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Slowdown (fraction) above which a benchmark counts as a regression")
+    parser.add_argument("--only", nargs="*", help="Run only microbenchmarks whose name starts with these prefixes")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every microbenchmark's input size")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per microbenchmark; the best is kept")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[8, 32], help="Corpus sizes for the pipeline run")
+    parser.add_argument("--captions", action="store_true", help="Caption video key frames in the pipeline run")
+    parser.add_argument("--no-macro", action="store_true", help="Skip the full-pipeline runs")
+    parser.add_argument("--llm-latency", type=float, default=DEFAULT_LATENCIES["llm"],
+                        help="Simulated seconds per LLM call")
+    args = parser.parse_args()
+
+    results = run_suite(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare(previous, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,45 @@
+from dotenv import load_dotenv  # Load environment variables from .env
+
+load_dotenv()  # Before the src imports, which read their settings from the environment at import time
+
 from src.ingestion.pdf_loader import extract_text_from_pdf  # Extract raw text content from PDF files
-from src.graph.relation_inferencer import infer_relationships  # Infer semantic relationships between extracted entities
+from src.graph.batch_relation_inferencer import infer_relationships_batched  # Infer relationships between entities with batched, concurrent LLM calls
+from src.graph.candidate_pairs import candidate_pairs  # Prune entity pairs that never co-occur before relation inference
 from src.ingestion.image_loader import extract_text_from_image  # Perform OCR to extract text from image files
-from src.extraction.entity_extractor import extract_entities  # Extract structured entities from text
+from src.extraction.chunked_extractor import extract_entities_chunked  # Extract and merge entities from every chunk of a full document
 from src.graph.graph_writer import KnowledgeGraph  # Handles writing entities and relationships to Neo4j
 from src.rag.graph_qa import answer_question  # Perform question answering using the knowledge graph
-from src.rag.vector_indexer import index_documents, retrieve_similar  # RAG indexing and semantic retrieval functions
+from src.rag.vector_indexer import index_documents, page_documents, retrieve_similar  # RAG indexing, per-page PDF inputs and semantic retrieval
+from src.rag.hybrid_retriever import hybrid_search  # Fused BM25, vector and knowledge-graph retrieval
 from src.ingestion.audio_loader import extract_text_from_audio  # Transcribe speech to text from audio files
 from src.ingestion.video_loader import extract_audio_text_from_video  # Extract and transcribe audio track from video
-from src.ingestion.frame_extractor import extract_key_frames  # Extract representative frames from a video
-from src.vision.llava_captioner import generate_caption  # Generate natural language captions from images (frames)
+from src.ingestion.frame_extractor import sample_key_frames  # Extract representative, de-duplicated frames from a video
+from src.vision.llava_captioner import generate_captions  # Generate natural language captions for batches of images (frames)
 
-from dotenv import load_dotenv  # Load environment variables from .env
-from PIL import Image  # Handle image file operations
 import os  # File and path utilities
 import json  # Parse and format structured JSON
 
-load_dotenv()  # Load environment variables before processing begins
-
 def main():
     # ---------- 1. PDF INGESTION ----------
-    # Load and extract up to 3000 characters from the input PDF document
+    # Load and extract the full text of the input PDF document
     pdf_path = "data/sdg.pdf"
-    text = extract_text_from_pdf(pdf_path)[:3000]  # Truncate for demo or initial prototyping
+    text = extract_text_from_pdf(pdf_path)
     print("Extracted Text:\n", text[:500], "\n---")  # Preview the first 500 characters
 
-    # Use NLP model to extract entities from the PDF text
-    entities_json = extract_entities(text)
+    # Use NLP model to extract entities from every chunk of the PDF text
+    entities_json = extract_entities_chunked(text)
     print("Extracted Entities:\n", entities_json)
     entities = json.loads(entities_json)["entities"]
 
-    # Initialize Neo4j writer, add entities and inferred relationships, then close the session
+    # Initialize one Neo4j writer for the whole run; it reuses the process-wide connection pool
     kg = KnowledgeGraph()
+
+    # Add entities and inferred relationships from the PDF
     kg.add_entities(entities, os.path.basename(pdf_path))
-    relationships = infer_relationships(entities)
+    pairs, pruning = candidate_pairs(entities, text)
+    print(f"Relation candidates: {pruning.kept_pairs}/{pruning.total_pairs} pairs ({pruning.pruned_pairs} pruned)")
+    relationships = infer_relationships_batched(entities, pairs=pairs)
     kg.add_relationships(relationships)
-    kg.close()
     print("Entities and relationships from PDF written to Neo4j")
 
     # ---------- 2. IMAGE INGESTION ----------
@@ -42,21 +47,21 @@ def main():
     image_text = ""
     if os.path.exists(image_path):
         print("\nExtracting text from image...")
-        # Perform OCR on the image and extract up to 3000 characters
-        image_text = extract_text_from_image(image_path)[:3000]
+        # Perform OCR on the image and extract its full text
+        image_text = extract_text_from_image(image_path)
         print("Image Text:\n", image_text[:500], "\n---")
 
         # Extract entities from image-derived text
-        image_entities_json = extract_entities(image_text)
+        image_entities_json = extract_entities_chunked(image_text)
         print("Extracted Image Entities:\n", image_entities_json)
         image_entities = json.loads(image_entities_json)["entities"]
 
         # Write entities and relationships from image to the knowledge graph
-        kg = KnowledgeGraph()
         kg.add_entities(image_entities, os.path.basename(image_path))
-        image_relationships = infer_relationships(image_entities)
+        image_pairs, image_pruning = candidate_pairs(image_entities, image_text)
+        print(f"Relation candidates: {image_pruning.kept_pairs}/{image_pruning.total_pairs} pairs ({image_pruning.pruned_pairs} pruned)")
+        image_relationships = infer_relationships_batched(image_entities, pairs=image_pairs)
         kg.add_relationships(image_relationships)
-        kg.close()
         print("Entities and relationships from image written to Neo4j")
 
     # ---------- 3. AUDIO INGESTION ----------
@@ -65,19 +70,19 @@ def main():
     if os.path.exists(audio_path):
         print("\nExtracting text from audio...")
         # Transcribe audio into text
-        audio_text = extract_text_from_audio(audio_path)[:3000]
+        audio_text = extract_text_from_audio(audio_path)
         print("Audio Text:\n", audio_text[:500], "\n---")
 
         # Extract and link entities from the transcribed audio
-        audio_entities_json = extract_entities(audio_text)
+        audio_entities_json = extract_entities_chunked(audio_text)
         print("Extracted Audio Entities:\n", audio_entities_json)
         audio_entities = json.loads(audio_entities_json)["entities"]
 
-        kg = KnowledgeGraph()
         kg.add_entities(audio_entities, os.path.basename(audio_path))
-        audio_relationships = infer_relationships(audio_entities)
+        audio_pairs, audio_pruning = candidate_pairs(audio_entities, audio_text)
+        print(f"Relation candidates: {audio_pruning.kept_pairs}/{audio_pruning.total_pairs} pairs ({audio_pruning.pruned_pairs} pruned)")
+        audio_relationships = infer_relationships_batched(audio_entities, pairs=audio_pairs)
         kg.add_relationships(audio_relationships)
-        kg.close()
         print("Entities and relationships from audio written to Neo4j")
 
     # ---------- 4. VIDEO INGESTION ----------
@@ -86,60 +91,59 @@ def main():
     if os.path.exists(video_path):
         print("\nExtracting text from video audio...")
         # Extract and transcribe audio track from video
-        video_text = extract_audio_text_from_video(video_path)[:3000]
+        video_text = extract_audio_text_from_video(video_path)
         print("Video Text:\n", video_text[:500], "\n---")
 
         # Extract structured entities from transcribed video content
-        video_entities_json = extract_entities(video_text)
+        video_entities_json = extract_entities_chunked(video_text)
         print("Extracted Video Entities:\n", video_entities_json)
         video_entities = json.loads(video_entities_json)["entities"]
 
         # Write entities and their relationships from video content to graph
-        kg = KnowledgeGraph()
         kg.add_entities(video_entities, os.path.basename(video_path))
-        video_relationships = infer_relationships(video_entities)
+        video_pairs, video_pruning = candidate_pairs(video_entities, video_text)
+        print(f"Relation candidates: {video_pruning.kept_pairs}/{video_pruning.total_pairs} pairs ({video_pruning.pruned_pairs} pruned)")
+        video_relationships = infer_relationships_batched(video_entities, pairs=video_pairs)
         kg.add_relationships(video_relationships)
-        kg.close()
         print("Entities and relationships from video audio written to Neo4j")
 
         # ---------- 4.1 VIDEO FRAME CAPTIONING ----------
         # Extract static visual context from video for multimodal enrichment
         frame_folder = "data/video_frames"
-        frames = extract_key_frames(video_path, frame_folder)
-        print(f"\nExtracted {len(frames)} key frames:")
-        for path in frames:
-            print(f" - {path}")
+        frames, frame_stats = sample_key_frames(video_path, output_folder=frame_folder)
+        print(f"\nExtracted {len(frames)} key frames ({frame_stats.frames_decoded} decoded, {frame_stats.duplicates_dropped} duplicates dropped):")
+        for frame in frames:
+            print(f" - {frame.path}")
+
+        # Ensure images aren't blank before sending them to the captioner
+        non_blank = []
+        for frame in frames:
+            if not frame.image.any():
+                print(f"Skipping empty image: {frame.path}")
+                continue
+            non_blank.append(frame)
 
         print("\nGenerating LLaVA captions for key frames...")
         captions = []
-        for path in frames:
-            try:
-                # Ensure image isn't blank before sending to captioner
-                img = Image.open(path).convert("RGB")
-                if img.getbbox() is None:
-                    print(f"Skipping empty image: {path}")
-                    continue
-
-                # Generate descriptive text from image using a vision-language model
-                caption = generate_caption(path)
-                print(f"Caption for {os.path.basename(path)}: {caption}")
+        try:
+            # Generate descriptive text for all frames in batches using a vision-language model
+            for frame, caption in zip(non_blank, generate_captions([frame.image for frame in non_blank])):
+                print(f"Caption for {os.path.basename(frame.path)}: {caption}")
                 captions.append({
                     "name": caption,
                     "type": "Concept"
                 })
-            except Exception as e:
-                print(f"Error with {path}: {e}")
+        except Exception as e:
+            print(f"Error captioning frames: {e}")
 
         # Enrich graph with visual concepts and inferred semantic relationships
         if captions:
-            kg = KnowledgeGraph()
             kg.add_entities(captions, os.path.basename(video_path))
 
             # Infer connections between visual concepts extracted from frames
-            caption_relationships = infer_relationships(captions)
+            caption_relationships = infer_relationships_batched(captions)
             kg.add_relationships(caption_relationships)
 
-            kg.close()
             print("LLaVA captions and relationships added to Neo4j.")
 
     # ---------- 5. GRAPH QUESTION ANSWERING ----------
@@ -150,9 +154,10 @@ def main():
     # ---------- 6. INDEX DOCUMENTS FOR RAG ----------
     print("\nIndexing documents for RAG...")
     # Combine all text sources (PDF, image OCR, audio, video) into vector index
-    docs = [text, image_text, audio_text, video_text]
-    metas = [
-        {"source": "sdg.pdf"},
+    # The PDF is indexed page by page, so its chunks cite their page
+    docs, metas = page_documents(text, "sdg.pdf")
+    docs += [image_text, audio_text, video_text]
+    metas += [
         {"source": "sdg.jpg"},
         {"source": "sdg.mp3"},
         {"source": "sdg.mp4"}
@@ -169,5 +174,14 @@ def main():
         print(f"\nSource: {r.metadata['source']}")
         print(r.page_content[:300], "\n---")
 
+    # ---------- 8. HYBRID RETRIEVAL ----------
+    print("\nRunning hybrid search (BM25 + vector + graph)...")
+    hybrid = hybrid_search(rag_query, k=3)
+    for name, stats in hybrid.sources.items():
+        print(f"{name}: {stats.latency * 1000:.0f} ms, {stats.hits} hits ({stats.status})")
+    for r in hybrid.documents:
+        print(f"\nSource: {r.metadata['source']}")
+        print(r.page_content[:300], "\n---")
+
 if __name__ == "__main__":
     main()
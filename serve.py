@@ -0,0 +1,27 @@
+from dotenv import load_dotenv  # Load environment variables from .env
+
+load_dotenv()  # Before the src imports: they read SERVICE_WORKERS, SERVICE_PRELOAD, JOB_DB_PATH etc. at import time
+
+from src.service.api import create_app, SERVICE_PRELOAD  # HTTP service with ingestion workers and QA endpoints
+from src.models.registry import COMPONENTS  # Components that can be loaded before the first request
+from src.service.worker import SERVICE_WORKERS  # Default number of ingestion worker processes
+
+import argparse  # Command-line argument parsing
+import uvicorn  # ASGI server
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve document upload, job status and graph/RAG question answering over HTTP"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Ingestion worker processes")
+    parser.add_argument("--preload", nargs="*", choices=sorted(COMPONENTS), default=SERVICE_PRELOAD,
+                        help="QA components to load before serving, e.g. llm neo4j vectorstore")
+    args = parser.parse_args()
+
+    # One server process; ingestion runs in the worker pool, QA calls in its thread pool
+    uvicorn.run(create_app(workers=args.workers, preload=args.preload), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# Hash texts into cache keys
+import hashlib
+
+# Persistent vector storage shared across runs and processes
+import sqlite3
+
+# Guard the shared connection and the query cache across threads
+import threading
+
+# File system paths and environment variables
+import os
+
+# Store vectors as compact float32 blobs
+import numpy as np
+
+# Short-lived in-memory cache for query embeddings
+from cachetools import TTLCache
+
+# Base interface for embedding models, so the cache can wrap any of them
+from langchain_core.embeddings import Embeddings
+
+# Hit and miss counts for the metrics and the current trace
+from src.telemetry.tracing import record_cache
+
+# Default location of the on-disk embedding cache
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite"))
+
+# Number of query embeddings kept in memory and how long (seconds) each stays valid
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def model_name(model) -> str:
+    # Vectors from different models are never interchangeable, so the model is part of every key
+    return getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by model name and text hash:
+    - Vectors are stored as float32 blobs in a single SQLite file
+    - Lookups and inserts are batched so a whole document costs a few statements
+    """
+
+    def __init__(self, path: str = EMBED_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: list[str]) -> dict:
+        # Return {text_hash: vector} for the hashes that are cached
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[i:i + LOOKUP_BATCH_SIZE]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    (model, *batch),
+                ).fetchall()
+                found.update((h, np.frombuffer(blob, dtype=np.float32).tolist()) for h, blob in rows)
+        return found
+
+    def put_many(self, model: str, items: dict):
+        # Store {text_hash: vector} in one transaction
+        rows = [(model, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wrap an embedding model with two cache layers:
+    - Query embeddings are kept in an in-memory LRU cache whose entries expire after `query_ttl` seconds
+    - Document and query embeddings are stored on disk, so indexing and search share vectors across runs
+    Only texts missing from both layers reach the wrapped model.
+    """
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache = None, model: str = None,
+                 query_cache_size: int = QUERY_CACHE_SIZE, query_ttl: float = QUERY_CACHE_TTL):
+        self.base = base
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.model = model or model_name(getattr(base, "base", base))
+        self._queries = TTLCache(maxsize=query_cache_size, ttl=query_ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [text_sha256(text) for text in texts]
+        found = self.cache.get_many(self.model, list(set(hashes)))
+
+        # Embed each missing text once, even if it repeats in the input
+        missing = {h: text for h, text in zip(hashes, texts) if h not in found}
+        hits = len(texts) - sum(1 for h in hashes if h in missing)
+        self.hits += hits
+        self.misses += len(missing)
+        record_cache("embeddings", True, hits)
+        record_cache("embeddings", False, len(missing))
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self.cache.put_many(self.model, computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            vector = self._queries.get(text)
+        if vector is not None:
+            self.hits += 1
+            record_cache("embeddings", True)
+            return vector
+
+        # Fall back to the disk cache before calling the model
+        text_hash = text_sha256(text)
+        vector = self.cache.get_many(self.model, [text_hash]).get(text_hash)
+        hit = vector is not None
+        if not hit:
+            self.misses += 1
+            vector = self.base.embed_query(text)
+            self.cache.put_many(self.model, {text_hash: vector})
+        else:
+            self.hits += 1
+        record_cache("embeddings", hit)
+        with self._lock:
+            self._queries[text] = vector
+        return vector
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "queries_in_memory": len(self._queries)}
+
+
+# Process-wide embedding cache shared by indexing and retrieval
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
@@ -0,0 +1,195 @@
+# Hash file contents and cache keys
+import hashlib
+
+# Serialise arbitrary stage outputs (text, entity lists, relation triples)
+import pickle
+
+# Persistent key-value storage with an index on last access time
+import sqlite3
+
+# Guard the shared connection across Streamlit script threads
+import threading
+
+# Access timestamps for LRU eviction
+import time
+
+# File system paths and environment variables
+import os
+
+# Transcripts depend on the configured speech-to-text backend and model
+from src.ingestion.transcriber import TRANSCRIBER_VERSION
+
+# Captions depend on the LLaVA inference precision
+from src.vision.llava_captioner import LLAVA_PRECISION
+
+# Hits and misses per stage, in the metrics and the current file's trace
+from src.telemetry.tracing import record_cache
+
+# Default location and size budget of the on-disk cache
+CACHE_PATH = os.getenv("INGESTION_CACHE_PATH", os.path.join(".cache", "ingestion.sqlite"))
+CACHE_MAX_BYTES = int(os.getenv("INGESTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Version of each pipeline stage; bump an entry whenever its model, prompt or parsing changes
+# so stale results are never served
+STAGE_VERSIONS = {
+    "pdf_text": "pymupdf-pages-4",
+    "image_text": "tesseract-preprocessed-2",
+    "audio_text": f"{TRANSCRIBER_VERSION}-1",
+    "video_text": f"{TRANSCRIBER_VERSION}-2",
+    "video_captions": f"llava-1.5-7b-{LLAVA_PRECISION}-2",
+    "entities": "gpt-4-entities-chunked-4",
+    "relationships": "gpt-4-relations-batched-2",
+    "graph_write": "neo4j-provenance-3",
+    "rag_index": "chroma-openai-pages-2",
+}
+
+def pipeline_version(modality: str) -> str:
+    """
+    Versions of every stage that shapes what a document contributes to the graph, recorded on its
+    Document node; a document ingested under a different pipeline version is re-synced.
+    `modality` is "pdf", "image", "audio", "video" or "captions".
+    """
+    first = "video_captions" if modality == "captions" else f"{modality}_text"
+    stages = [first] + (["relationships"] if modality == "captions" else ["entities", "relationships"]) + ["graph_write"]
+    return "|".join(STAGE_VERSIONS[stage] for stage in stages)
+
+
+# Read files in 1 MB blocks so hashing large videos uses constant memory
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    # Content hash of a file on disk
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def bytes_sha256(data) -> str:
+    # Content hash of an in-memory buffer (e.g. a Streamlit upload)
+    return hashlib.sha256(data).hexdigest()
+
+
+class StageCache:
+    """
+    Persistent, content-addressed cache for pipeline stage outputs:
+    - Keys combine the input content hash, the stage name and the stage version
+    - Values are pickled into a single SQLite file
+    - Total size is bounded; least recently used entries are evicted first
+    - Hit and miss counters are kept per stage for reporting
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                value BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(stage: str, content_hash: str, version: str = None) -> str:
+        version = version or STAGE_VERSIONS.get(stage, "0")
+        return hashlib.sha256(f"{stage}|{version}|{content_hash}".encode()).hexdigest()
+
+    def get(self, stage: str, content_hash: str, version: str = None):
+        """
+        Return (hit, value) for a stage result and refresh its access time.
+        """
+        key = self.make_key(stage, content_hash, version)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses[stage] = self.misses.get(stage, 0) + 1
+                record_cache(stage, False)
+                return False, None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+        record_cache(stage, True)
+        return True, pickle.loads(row[0])
+
+    def put(self, stage: str, content_hash: str, value, version: str = None):
+        # Store a stage result, then evict old entries if the size budget is exceeded
+        key = self.make_key(stage, content_hash, version)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, stage, size, last_access, value) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, len(blob), time.time(), blob),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def cached(self, stage: str, content_hash: str, compute, version: str = None, keep=None):
+        """
+        Return the cached result of a stage, running `compute()` and storing its result on a miss.
+        A result for which `keep(value)` is False (e.g. a partial extraction) is returned but not stored.
+        """
+        hit, value = self.get(stage, content_hash, version)
+        if hit:
+            return value
+        value = compute()
+        if keep is None or keep(value):
+            self.put(stage, content_hash, value, version)
+        return value
+
+    def _evict(self):
+        # Delete least recently used entries until the total size fits the budget
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        # Per-stage hit/miss counters plus the current on-disk footprint
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        stages = sorted(set(self.hits) | set(self.misses))
+        return {
+            "entries": entries,
+            "bytes": size,
+            "stages": {s: {"hits": self.hits.get(s, 0), "misses": self.misses.get(s, 0)} for s in stages},
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Process-wide cache shared by the app and CLI entry points
+_default_cache = None
+
+
+def get_default_cache() -> StageCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StageCache()
+    return _default_cache
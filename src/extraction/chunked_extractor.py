@@ -0,0 +1,201 @@
+# Asyncio for concurrent per-chunk extraction under a concurrency limit
+import asyncio
+
+# Parse and re-serialise the per-chunk extraction results
+import json
+
+# Normalise entity names before merging
+import re
+import unicodedata
+
+# Count occurrences to pick canonical surface forms and types
+from collections import Counter
+
+# Fuzzy string matching to merge aliases across chunks
+from rapidfuzz import fuzz, process
+
+# Tokenizer used by GPT-4, so chunk sizes match what the model actually sees
+import tiktoken
+
+# Single-chunk extractor; it also attaches chunk-relative spans to every entity
+from src.extraction.entity_extractor import aextract_entities
+
+# The resolver's checks behind a fuzzy match, so "Goal 1" and "Goal 17" are never aliases
+from src.graph.entity_resolver import normalise_words, numbers, same_words
+
+# Spans for chunking, per-chunk extraction and merging
+from src.telemetry.tracing import traced
+
+# Default chunking and concurrency settings
+CHUNK_TOKENS = 1500
+OVERLAP_TOKENS = 100
+MAX_CONCURRENCY = 4
+
+# Two names of the same type scoring at least this (0-100) are treated as aliases
+ALIAS_THRESHOLD = 92
+
+# Tokenizer shared by every call
+_encoding = None
+
+
+def get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model("gpt-4")
+    return _encoding
+
+
+@traced(items=len)
+def chunk_text(text: str, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = OVERLAP_TOKENS) -> list:
+    """
+    Split text into overlapping, token-bounded chunks.
+    Returns a list of (start, end) character offsets into `text`.
+    """
+    if not text:
+        return []
+    if overlap_tokens >= chunk_tokens:
+        raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    # Character offset at which each token starts
+    _, offsets = encoding.decode_with_offsets(tokens)
+
+    chunks = []
+    step = chunk_tokens - overlap_tokens
+    for first in range(0, len(tokens), step):
+        last = first + chunk_tokens
+        start = offsets[first]
+        end = offsets[last] if last < len(tokens) else len(text)
+        chunks.append((start, end))
+        if last >= len(tokens):
+            break
+    return chunks
+
+
+def normalise_name(name: str) -> str:
+    # Case-, accent-, punctuation- and whitespace-insensitive merge key
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    name = re.sub(r"[^\w\s]", " ", name.lower())
+    return re.sub(r"\s+", " ", name).strip()
+
+
+@traced(items=len)
+def merge_entities(chunk_results: list) -> list:
+    """
+    Reduce per-chunk entity lists into one deduplicated list:
+    - Mentions with the same normalised name and type are grouped
+    - Groups of the same type whose names fuzzy-match above ALIAS_THRESHOLD are merged as aliases, provided
+      they carry the same numbers and match word by word (see entity_resolver.same_words)
+    - The most frequent surface form becomes the name; the others are kept as aliases
+    `chunk_results` holds (chunk_index, entities) with spans already in document offsets.
+    """
+    # Group exact normalised matches, keyed by (type, normalised name)
+    groups = {}
+    for chunk_index, entities in chunk_results:
+        for ent in entities:
+            key = normalise_name(ent.get("name", ""))
+            if not key:
+                continue
+            group = groups.setdefault((ent.get("type", "Concept"), key), {
+                "names": Counter(), "spans": set(), "chunks": set()
+            })
+            group["names"][re.sub(r"\s+", " ", ent["name"]).strip()] += 1
+            group["spans"].update(tuple(span) for span in ent.get("spans", []))
+            group["chunks"].add(chunk_index)
+
+    # Fuzzy alias merging, blocked by type so only comparable names are scored
+    canonical = {}
+    for (ent_type, key), group in sorted(groups.items(), key=lambda item: -sum(item[1]["names"].values())):
+        keys = canonical.setdefault(ent_type, {})
+        # Best-scoring candidate that also passes the number and word-by-word checks
+        match = next((
+            candidate for candidate, _, _ in process.extract(key, list(keys), scorer=fuzz.token_sort_ratio,
+                                                               score_cutoff=ALIAS_THRESHOLD, limit=None)
+            if numbers(candidate) == numbers(key) and same_words(normalise_words(candidate), normalise_words(key))
+        ), None)
+        if match is not None:
+            target = keys[match]
+            target["names"].update(group["names"])
+            target["spans"].update(group["spans"])
+            target["chunks"].update(group["chunks"])
+        else:
+            keys[key] = group
+
+    merged = []
+    for ent_type, keys in canonical.items():
+        for group in keys.values():
+            names = [name for name, _ in group["names"].most_common()]
+            merged.append({
+                "name": names[0],
+                "type": ent_type,
+                "aliases": names[1:],
+                "spans": [list(span) for span in sorted(group["spans"])],
+                "chunks": sorted(group["chunks"]),
+            })
+
+    # Order entities by first appearance in the document
+    merged.sort(key=lambda ent: ent["spans"][0][0] if ent["spans"] else float("inf"))
+    return merged
+
+
+@traced(items=lambda result: len(result["entities"]))
+async def aextract_entities_chunked(text: str, chunk_tokens: int = CHUNK_TOKENS,
+                                    overlap_tokens: int = OVERLAP_TOKENS,
+                                    max_concurrency: int = MAX_CONCURRENCY,
+                                    semaphore: asyncio.Semaphore | None = None) -> dict:
+    """
+    Map-reduce entity extraction over the full text:
+    - Map: extract entities from each token-bounded chunk, at most `max_concurrency` at a time;
+      pass `semaphore` instead to share one LLM call budget between documents
+    - A chunk whose extraction raises is logged and left out; the others are still merged
+    - Reduce: shift spans to document offsets, then merge and deduplicate across chunks
+    Returns {"entities": [...], "chunks": [{"index", "start", "end"}, ...], "failed_chunks": [index, ...]}.
+    Raises the first error when every chunk failed.
+    """
+    chunks = chunk_text(text, chunk_tokens, overlap_tokens)
+    semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+    errors = {}
+
+    async def extract_chunk(index: int, start: int, end: int):
+        try:
+            async with semaphore:
+                output = await aextract_entities(text[start:end])
+        except Exception as e:
+            errors[index] = e
+            print(f"[entities] chunk {index} ({start}-{end}) failed: {e}")
+            return index, []
+        try:
+            entities = json.loads(output)["entities"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            entities = []
+        # Spans come back relative to the chunk; shift them into document offsets
+        for ent in entities:
+            ent["spans"] = [[s + start, e + start] for s, e in ent.get("spans", [])]
+        return index, entities
+
+    chunk_results = await asyncio.gather(*(extract_chunk(i, s, e) for i, (s, e) in enumerate(chunks)))
+    if chunks and len(errors) == len(chunks):
+        raise errors[0]
+    return {
+        "entities": merge_entities([result for result in chunk_results if result[0] not in errors]),
+        "chunks": [{"index": i, "start": s, "end": e} for i, (s, e) in enumerate(chunks)],
+        "failed_chunks": sorted(errors),
+    }
+
+
+def extraction_complete(entities_json: str) -> bool:
+    # Whether every chunk of a chunked extraction succeeded; partial results are not worth caching
+    return not json.loads(entities_json).get("failed_chunks")
+
+
+@traced()
+def extract_entities_chunked(text: str, **kwargs) -> str:
+    # Drop-in for extract_entities on full documents: returns the merged result as a JSON string.
+    # It starts its own event loop, so code already running in one must await aextract_entities_chunked instead
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return json.dumps(asyncio.run(aextract_entities_chunked(text, **kwargs)))
+    raise RuntimeError("extract_entities_chunked() cannot run inside an event loop; "
+                       "await aextract_entities_chunked() instead")
@@ -1,18 +1,22 @@
-# Import the OpenAI-powered LLM wrapper from LangChain
-from langchain_openai import ChatOpenAI
+# Shared, pooled LLM client with response caching and structured-output parsing
+from src.llm.client import as_llm_client
 
-# Import tools for defining prompts and LLM chains
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+# Schema the model's JSON answer is validated against
+from pydantic import BaseModel
 
-# Used to access environment variables 
-import os
+# Serialise the validated entities, with their spans, back to JSON
+import json
+
+# Locate every occurrence of an entity name in the source text
+import re
+
+# Span per extraction call, with the number of entities found
+from src.telemetry.tracing import set_attributes, traced
 
 # Define a structured prompt template to instruct the LLM on the extraction task
 # It asks to extract named entities and return them in a specific JSON format
-prompt_template = PromptTemplate(
-    input_variables=["text"],
-    template="""
+# Filled in with str.format, so the braces of the JSON example are doubled
+prompt_template = """
 Extract all named entities (people, organizations, places, dates, and concepts) from the following text and return them in JSON format with this structure:
 
 {{"entities": [
@@ -23,22 +27,47 @@ Extract all named entities (people, organizations, places, dates, and concepts)
 Text:
 {text}
 """
-)
-
-# Define the entity extraction function using the OpenAI model
-def extract_entities(text: str) -> str:
-    # Retrieve OpenAI API key from environment variable 
-    openai_api_key = os.getenv("OPENAI_API_KEY")  
-    
-    # Initialize the ChatOpenAI model (GPT-4) with no randomness (temperature=0)
-    llm = ChatOpenAI(
-        temperature=0,
-        model="gpt-4",
-        openai_api_key=openai_api_key
-    )
-    
-    # Wrap the LLM and prompt template into a callable chain
-    entity_chain = LLMChain(llm=llm, prompt=prompt_template)
-    
-    # Run the chain with the given text and return the output string 
-    return entity_chain.run({"text": text})
\ No newline at end of file
+
+# Structured output expected from the model
+class Entity(BaseModel):
+    name: str
+    type: str
+
+class EntityList(BaseModel):
+    entities: list[Entity]
+
+# Define the entity extraction function using the shared OpenAI client
+@traced()
+def extract_entities(text: str, llm=None) -> str:
+    # Ask the model for entities and validate the JSON answer; fences or trailing prose are tolerated
+    # and only a response that fails to parse is re-requested
+    result = as_llm_client(llm).structured(prompt_template.format(text=text), EntityList)
+
+    # Attach the character spans where each entity occurs
+    entities = attach_spans(text, [entity.model_dump() for entity in result.entities])
+    set_attributes({"items": len(entities)})
+
+    # Return the output as a JSON string, as before
+    return json.dumps({"entities": entities})
+
+# Async variant for concurrent callers: the request goes through the client's async path instead of a thread
+@traced()
+async def aextract_entities(text: str, llm=None) -> str:
+    result = await as_llm_client(llm).astructured(prompt_template.format(text=text), EntityList)
+    entities = attach_spans(text, [entity.model_dump() for entity in result.entities])
+    set_attributes({"items": len(entities)})
+    return json.dumps({"entities": entities})
+
+# Find the (start, end) character offsets of every case-insensitive occurrence of each entity name
+def attach_spans(text: str, entities: list) -> list:
+    for ent in entities:
+        name = ent.get("name", "").strip()
+        if not name:
+            ent["spans"] = []
+            continue
+        # Whitespace inside a name may be any run of whitespace in the source (line breaks in PDFs)
+        pattern = r"\s+".join(re.escape(part) for part in name.split())
+        # Only match whole words so "SDG 1" does not match inside "SDG 10"
+        pattern = (r"\b" if name[0].isalnum() else "") + pattern + (r"\b" if name[-1].isalnum() else "")
+        ent["spans"] = [[m.start(), m.end()] for m in re.finditer(pattern, text, re.IGNORECASE)]
+    return entities
@@ -0,0 +1,145 @@
+# Asyncio primitives for concurrent LLM calls and bounded in-flight requests
+import asyncio
+
+# Monotonic clock used by the rate limiter
+import time
+
+# Used to generate all pairwise combinations of entities
+from itertools import combinations
+
+# Shared, pooled LLM client with response caching and structured-output parsing
+from src.llm.client import as_llm_client
+
+# Schema the model's JSON answer is validated against
+from pydantic import BaseModel
+
+# Span with the number of relationships found
+from src.telemetry.tracing import traced
+
+# Default tuning knobs for the batched engine
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Define a prompt template that asks for labels for many entity pairs at once
+# Pairs are numbered so the answer can be mapped back without relying on names
+batch_prompt = """
+For each numbered pair below, suggest a relationship label (verb, uppercase, no spaces) that could connect A to B.
+If no clear link exists for a pair, use the label NONE.
+
+Respond ONLY with JSON in this structure, with one item per pair:
+
+{{"relations": [
+  {{"pair": 1, "label": "..."}},
+  ...
+]}}
+
+Pairs:
+{pairs}
+"""
+
+# Structured output expected for each batch
+class PairLabel(BaseModel):
+    pair: int
+    label: str
+
+class RelationBatch(BaseModel):
+    relations: list[PairLabel]
+
+
+class AsyncRateLimiter:
+    """
+    Sliding-window rate limiter for asyncio code:
+    - Allows at most `max_calls` acquisitions in any `period` seconds
+    - Callers that exceed the budget sleep until the oldest call leaves the window
+    """
+
+    def __init__(self, max_calls: int, period: float = 60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = []
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                # Drop timestamps that have left the window
+                self._calls = [t for t in self._calls if now - t < self.period]
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                await asyncio.sleep(self.period - (now - self._calls[0]))
+
+
+def make_batches(pairs: list, batch_size: int) -> list:
+    # Split the list of pairs into consecutive batches of at most batch_size
+    return [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+
+
+def format_pairs(batch: list) -> str:
+    # Render a batch of entity pairs as numbered lines for the prompt
+    lines = []
+    for idx, (a, b) in enumerate(batch, start=1):
+        lines.append(f'{idx}. A: "{a["name"]}" [{a["type"]}] | B: "{b["name"]}" [{b["type"]}]')
+    return "\n".join(lines)
+
+
+def batch_relations(result: RelationBatch, batch: list) -> list:
+    """
+    Map a parsed batch answer back to (a, rel, b) triples:
+    - Skips items whose pair number is out of range or whose label is NONE
+    - Keeps pair order, regardless of the order the model answered in
+    """
+    labels = {}
+    for item in result.relations:
+        label = item.label.strip()
+        if 1 <= item.pair <= len(batch) and label and label.upper() != "NONE":
+            labels[item.pair - 1] = label
+    return [(batch[idx][0]["name"], labels[idx], batch[idx][1]["name"]) for idx in sorted(labels)]
+
+
+@traced(items=len)
+async def ainfer_relationships_batched(entities, llm=None, pairs=None,
+                                       batch_size: int = DEFAULT_BATCH_SIZE,
+                                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                                       requests_per_minute: int | None = None,
+                                       semaphore: asyncio.Semaphore | None = None) -> list:
+    """
+    Infer relationships for many entity pairs with few, concurrent LLM calls:
+    - Groups pairs into batches of `batch_size` per prompt
+    - Keeps at most `max_concurrency` prompts in flight, or shares `semaphore` with other callers
+    - Optionally spends no more than `requests_per_minute` calls per minute
+    Returns the same (a, rel, b) triples as infer_relationships, in pair order.
+    """
+    client = as_llm_client(llm)
+
+    # Default to every unordered pair, exactly like the exhaustive path
+    if pairs is None:
+        pairs = list(combinations(entities, 2))
+    batches = make_batches(list(pairs), batch_size)
+
+    semaphore = semaphore or asyncio.Semaphore(max_concurrency)
+    limiter = AsyncRateLimiter(requests_per_minute) if requests_per_minute else None
+
+    async def run_batch(batch):
+        async with semaphore:
+            if limiter:
+                await limiter.acquire()
+            result = await client.astructured(batch_prompt.format(pairs=format_pairs(batch)), RelationBatch)
+            return batch_relations(result, batch)
+
+    # gather preserves batch order, so the output order matches the pair order
+    results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+    return [rel for batch_result in results for rel in batch_result]
+
+
+@traced(items=len)
+def infer_relationships_batched(entities, **kwargs) -> list:
+    # Synchronous entry point for scripts such as main.py and the Streamlit app; it starts its own event loop,
+    # so code already running in one (e.g. a FastAPI handler) must await ainfer_relationships_batched instead
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(ainfer_relationships_batched(entities, **kwargs))
+    raise RuntimeError("infer_relationships_batched() cannot run inside an event loop; "
+                       "await ainfer_relationships_batched() instead")
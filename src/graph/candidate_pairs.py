@@ -0,0 +1,199 @@
+# Binary search to map a character offset to the text unit that contains it
+from bisect import bisect_right
+
+# Used to enumerate pairs inside a unit and the exhaustive pair count
+from itertools import combinations
+
+# Lightweight container for pruning statistics
+from dataclasses import dataclass
+
+# Sentence splitting for the co-occurrence units
+import re
+
+# Read the default neighbour count from the environment
+import os
+
+# Span with the number of pairs kept
+from src.telemetry.tracing import traced
+
+# Supported co-occurrence units
+UNITS = ("sentence", "window", "page", "chunk")
+
+# Sentence boundary: terminal punctuation followed by whitespace, a blank line, or a page break
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n|\s*\f\s*")
+
+# Neighbours kept per entity. On the bench_candidate_pairs fixture (120 entities, 300 sentences), relation recall
+# against exhaustive inference is:
+#   sentence: top_k 10 -> 0.81 (11% of pairs kept), top_k 20 -> 0.89 (12%, every co-occurring pair)
+#   page:     top_k 10 -> 0.80 (12%), top_k 20 -> 0.91 (22%)
+# Relations between entities that never share a sentence are only found by the wider units
+CANDIDATE_TOP_K = int(os.getenv("CANDIDATE_TOP_K", "20"))
+
+
+@dataclass
+class PruningStats:
+    """
+    Summary of how many entity pairs the pre-filter removed before the LLM stage.
+    """
+    total_pairs: int
+    cooccurring_pairs: int
+    similar_pairs: int
+    kept_pairs: int
+
+    @property
+    def pruned_pairs(self) -> int:
+        return self.total_pairs - self.kept_pairs
+
+    @property
+    def pruned_ratio(self) -> float:
+        return self.pruned_pairs / self.total_pairs if self.total_pairs else 0.0
+
+
+def segment_text(text: str, unit: str = "sentence", window: int = 3, chunk_size: int = 1000) -> list:
+    """
+    Split text into co-occurrence units:
+    - sentence: one unit per sentence
+    - window: overlapping windows of `window` consecutive sentences (one unit per start sentence)
+    - page: pages separated by form feeds, as extract_text_from_pdf joins them
+    - chunk: fixed-size character chunks of `chunk_size`
+    Units are returned as sorted (start, end) offsets.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"Unknown co-occurrence unit '{unit}', expected one of {UNITS}")
+
+    if unit == "chunk":
+        return [(i, min(i + chunk_size, len(text))) for i in range(0, len(text), chunk_size)]
+
+    if unit == "page":
+        bounds, start = [], 0
+        for match in re.finditer("\f", text):
+            bounds.append((start, match.start()))
+            start = match.end()
+        bounds.append((start, len(text)))
+        return bounds
+
+    # Sentence units, optionally widened into sliding windows
+    bounds, start = [], 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        bounds.append((start, match.start()))
+        start = match.end()
+    bounds.append((start, len(text)))
+
+    if unit == "window":
+        bounds = [(bounds[i][0], bounds[min(i + window, len(bounds)) - 1][1]) for i in range(len(bounds))]
+    return bounds
+
+
+class CooccurrenceIndex:
+    """
+    Inverted index from text units to the entities mentioned in them:
+    - Built from the character spans attached by extract_entities
+    - Counts how many units each pair of entities shares
+    """
+
+    def __init__(self, entities: list, text: str, unit: str = "sentence", **segment_kwargs):
+        self.units = segment_text(text, unit, **segment_kwargs)
+        self.starts = [u[0] for u in self.units]
+        self.unit_entities = {}
+        self.located = set()
+
+        for idx, ent in enumerate(entities):
+            for start, end in ent.get("spans") or []:
+                self.located.add(idx)
+                for unit_id in self._units_for(start, end):
+                    self.unit_entities.setdefault(unit_id, set()).add(idx)
+
+    def _units_for(self, start: int, end: int) -> list:
+        # Overlapping windows can contain the same span, so collect every unit covering it
+        first = bisect_right(self.starts, start) - 1
+        unit_ids = []
+        for unit_id in range(max(first, 0), -1, -1):
+            u_start, u_end = self.units[unit_id]
+            if u_start <= start and end <= u_end:
+                unit_ids.append(unit_id)
+            elif u_end < start:
+                break
+        return unit_ids or [max(first, 0)]
+
+    def pair_counts(self) -> dict:
+        # Number of shared units for every co-occurring pair (i < j)
+        counts = {}
+        for members in self.unit_entities.values():
+            for i, j in combinations(sorted(members), 2):
+                counts[(i, j)] = counts.get((i, j), 0) + 1
+        return counts
+
+
+def similar_pairs(entities: list, embed_fn, threshold: float) -> dict:
+    # Cosine similarity between entity names, keeping pairs at or above the threshold
+    import numpy as np
+
+    vectors = np.asarray(embed_fn([ent["name"] for ent in entities]), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    sims = vectors @ vectors.T
+    rows, cols = np.nonzero(np.triu(sims >= threshold, k=1))
+    return {(int(i), int(j)): float(sims[i, j]) for i, j in zip(rows, cols)}
+
+
+@traced(items=lambda result: len(result[0]))
+def candidate_pairs(entities: list, text: str = None, unit: str = "sentence", embed_fn=None,
+                    similarity_threshold: float = 0.8, top_k: int = CANDIDATE_TOP_K, **segment_kwargs):
+    """
+    Pre-filter entity pairs before relation inference:
+    - Keeps pairs that co-occur in at least one text unit
+    - Keeps pairs whose name embeddings pass `similarity_threshold` (when `embed_fn` is given)
+    - Caps each entity at its `top_k` strongest neighbours; a pair survives if it is
+      in the top-k of either endpoint
+    - Neighbours are ranked by shared sentences first, so a wider unit (window, page, chunk) only adds
+      candidates beyond the sentence-level ones instead of crowding them out
+    See CANDIDATE_TOP_K for the recall each unit and top_k reach.
+    Entities without spans (e.g. frame captions) cannot be located in the text; without
+    an `embed_fn` they are conservatively paired with every other entity.
+    Returns (pairs, PruningStats) where pairs are (entity_a, entity_b) in input order.
+    """
+    n = len(entities)
+    total = n * (n - 1) // 2
+
+    # Co-occurrence scores from the positional index, plus sentence-level ones for the wider units
+    cooccur, sentences = {}, {}
+    located = set()
+    if text:
+        index = CooccurrenceIndex(entities, text, unit, **segment_kwargs)
+        cooccur = index.pair_counts()
+        located = index.located
+        sentences = cooccur if unit == "sentence" else CooccurrenceIndex(entities, text, "sentence").pair_counts()
+
+    # Embedding similarity scores
+    similar = similar_pairs(entities, embed_fn, similarity_threshold) if embed_fn and n > 1 else {}
+
+    # Score every surviving pair as (shared sentences, shared units + similarity), compared in that order
+    scores = {pair: (sentences.get(pair, 0), float(cooccur.get(pair, 0))) for pair in cooccur.keys() | sentences.keys()}
+    for pair, sim in similar.items():
+        near, count = scores.get(pair, (0, 0.0))
+        scores[pair] = (near, count + sim)
+
+    # Rank each entity's neighbours and keep the union of per-entity top-k lists
+    neighbours = {}
+    for (i, j), score in scores.items():
+        neighbours.setdefault(i, []).append((score, j))
+        neighbours.setdefault(j, []).append((score, i))
+    kept = set()
+    for i, ranked in neighbours.items():
+        ranked.sort(key=lambda item: (-item[0][0], -item[0][1], item[1]))
+        for _, j in ranked[:top_k]:
+            kept.add((min(i, j), max(i, j)))
+
+    # Unlocated entities fall back to the exhaustive path when no embeddings are available
+    if not embed_fn:
+        for i in range(n):
+            if i not in located:
+                kept.update((min(i, j), max(i, j)) for j in range(n) if j != i)
+
+    pairs = [(entities[i], entities[j]) for i, j in sorted(kept)]
+    stats = PruningStats(
+        total_pairs=total,
+        cooccurring_pairs=len(cooccur.keys() | sentences.keys()),
+        similar_pairs=len(similar),
+        kept_pairs=len(pairs),
+    )
+    return pairs, stats
@@ -0,0 +1,326 @@
+# Deterministic canonical IDs
+import hashlib
+
+# Normalise names into match keys
+import re
+import unicodedata
+
+# Persistent alias index
+import sqlite3
+
+# Guard the index across Streamlit script threads and asyncio writer threads
+import threading
+
+# File system paths and environment variables
+import os
+
+# Count how each mention was resolved
+from collections import Counter
+
+# Blocked fuzzy matching of names
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Levenshtein
+
+# Optional embedding neighbours
+import numpy as np
+
+# Span per resolved batch of mentions
+from src.telemetry.tracing import traced
+
+# Default location of the alias index, minimum fuzzy score (0-100) and minimum cosine similarity
+ALIAS_INDEX_PATH = os.getenv("ALIAS_INDEX_PATH", os.path.join(".cache", "aliases.sqlite"))
+RESOLVER_FUZZY_THRESHOLD = int(os.getenv("RESOLVER_FUZZY_THRESHOLD", "92"))
+RESOLVER_EMBED_THRESHOLD = float(os.getenv("RESOLVER_EMBED_THRESHOLD", "0.92"))
+
+# Fuzzy matches checked per mention, and the size above which a block is too unselective to score
+FUZZY_LIMIT = 5
+MAX_BLOCK_SIZE = 2000
+
+# Words skipped when building an acronym ("Sustainable Development Goal 1" -> "sdg1")
+ACRONYM_STOPWORDS = {"a", "an", "and", "for", "in", "of", "on", "the", "to"}
+
+# Names written as an acronym, optionally numbered: "SDG 1", "SDG-1", "UN", "NGOs"
+ACRONYM_SHAPE = re.compile(r"[A-Z]{2,8}s?(?:[\s-]?\d+)?")
+
+MATCH_KINDS = ("exact", "acronym", "fuzzy", "embedding", "new")
+
+# Marks an acronym shared by several entities; it then matches none of them
+AMBIGUOUS = ""
+
+
+def normalise_words(name: str) -> list:
+    # Case-, accent- and punctuation-insensitive words, with a leading article dropped
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    words = re.findall(r"[a-z]+|\d+", name)
+    if len(words) > 1 and words[0] in ("the", "a", "an"):
+        words = words[1:]
+    return words
+
+
+def match_key(name: str) -> str:
+    # Spacing-insensitive key: "SDG 1", "SDG-1" and "sdg1" share "sdg1"
+    return "".join(normalise_words(name))
+
+
+def acronym(name: str):
+    # Initials of the significant words followed by any numbers, or None for names under three words;
+    # two-letter initials collide too often to identify anything
+    words = [w for w in normalise_words(name) if w not in ACRONYM_STOPWORDS]
+    letters = [w for w in words if not w.isdigit()]
+    if len(letters) < 3:
+        return None
+    return "".join(w[0] for w in letters) + "".join(w for w in words if w.isdigit())
+
+
+def is_acronym(name: str) -> bool:
+    return bool(ACRONYM_SHAPE.fullmatch(name.strip()))
+
+
+def acronym_key(name: str) -> str:
+    # Key of an acronym-shaped name without its plural "s": "SDGs" -> "sdg"
+    return match_key(re.sub(r"(?<=[A-Z])s\b", "", name.strip()))
+
+
+def numbers(name: str) -> tuple:
+    return tuple(re.findall(r"\d+", name))
+
+
+def same_words(a: list, b: list) -> bool:
+    # Word-by-word check behind a fuzzy match: spelling variants and typos pass ("Organisation",
+    # "Suustainable"), different names that merely look alike do not ("Vinta" vs "Vintari")
+    if len(a) != len(b):
+        return False
+    return all(Levenshtein.distance(x, y) <= min(len(x), len(y)) // 4 for x, y in zip(a, b))
+
+
+def block_keys(words: list) -> set:
+    # Word prefixes plus the name's numbers: fuzzy matches only need scoring against names sharing both
+    digits = ",".join(w for w in words if w.isdigit())
+    prefixes = {w[:4] for w in words if len(w) >= 3 and not w.isdigit()} or {"".join(words)[:3]}
+    return {f"{prefix}|{digits}" for prefix in prefixes}
+
+
+def canonical_id(ent_type: str, name: str) -> str:
+    # Same type and key in any process gives the same ID, so concurrent workers converge
+    return hashlib.sha256(f"{ent_type}\x00{match_key(name)}".encode()).hexdigest()[:16]
+
+
+class EntityResolver:
+    """
+    Map entity mentions to canonical entity IDs before they are written to the graph:
+    - Exact: same type and spacing/case/punctuation-insensitive key ("SDG1" = "SDG 1")
+    - Acronym: an acronym-shaped mention and a long name with those initials ("SDG 1" = "Sustainable Development Goal 1")
+    - Fuzzy: RapidFuzz ratio above `threshold` against names sharing a word prefix and numbers,
+      confirmed word by word ("SDG 1" != "SDG 11", "Vinta" != "Vintari")
+    - Embedding: optional cosine neighbour above `embed_threshold`, with `embed_fn(texts) -> vectors`
+    - Otherwise a new canonical entity
+    Every alias is persisted in SQLite and indexed in memory, so lookups never scan all entities.
+    """
+
+    def __init__(self, path: str = ALIAS_INDEX_PATH, threshold: int = RESOLVER_FUZZY_THRESHOLD,
+                 embed_fn=None, embed_threshold: float = RESOLVER_EMBED_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.embed_fn = embed_fn
+        self.embed_threshold = embed_threshold
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entities (id TEXT PRIMARY KEY, name TEXT NOT NULL, type TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS aliases (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                type TEXT NOT NULL,
+                id TEXT NOT NULL,
+                UNIQUE (name, type)
+            );
+            """
+        )
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+        # In-memory indexes over the alias table
+        self._seq = 0
+        self._entities = {}     # id -> (canonical name, type)
+        self._exact = {}        # (type, key) -> id
+        self._short = {}        # (type, key of an acronym-shaped alias) -> id
+        self._long = {}         # (type, acronym of a multi-word alias) -> id
+        self._expanded = {}     # id of an acronym-named entity -> key of the one long name it absorbed
+        self._blocks = {}       # (type, word prefix) -> {spaced alias: id}
+        self._by_key = {}       # key -> {ids of any type}
+        self._types = set()
+        self._mentions = Counter()
+        self._vectors = {}      # type -> (ids, matrix)
+        self.refresh()
+
+    def refresh(self):
+        """
+        Load aliases added since the last refresh, including those written by other processes.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.seq, a.name, a.type, a.id, e.name FROM aliases a JOIN entities e ON e.id = a.id "
+                "WHERE a.seq > ? ORDER BY a.seq", (self._seq,)
+            ).fetchall()
+            for seq, name, ent_type, ent_id, canonical in rows:
+                self._entities[ent_id] = (canonical, ent_type)
+                self._index(name, ent_type, ent_id)
+                self._seq = seq
+
+    def _index(self, name: str, ent_type: str, ent_id: str):
+        words = normalise_words(name)
+        key = "".join(words)
+        if not key:
+            return
+        self._exact.setdefault((ent_type, key), ent_id)
+        self._by_key.setdefault(key, set()).add(ent_id)
+        self._types.add(ent_type)
+        if is_acronym(name):
+            self._add_acronym(self._short, (ent_type, acronym_key(name)), ent_id)
+        elif acronym(name):
+            self._add_acronym(self._long, (ent_type, acronym(name)), ent_id)
+            if self._short.get((ent_type, acronym(name))) == ent_id:
+                self._expanded.setdefault(ent_id, key)
+        for block in block_keys(words):
+            self._blocks.setdefault((ent_type, block), {})[" ".join(words)] = ent_id
+        self._vectors.pop(ent_type, None)
+
+    @staticmethod
+    def _add_acronym(index: dict, key: tuple, ent_id: str):
+        if index.setdefault(key, ent_id) != ent_id:
+            index[key] = AMBIGUOUS
+
+    def _match(self, name: str, ent_type: str):
+        # Returns (id, kind) for an existing entity, or (None, None)
+        words = normalise_words(name)
+        key = "".join(words)
+        ent_id = self._exact.get((ent_type, key))
+        if ent_id:
+            return ent_id, "exact"
+
+        if is_acronym(name):
+            ent_id = self._long.get((ent_type, acronym_key(name)))
+        else:
+            ent_id = self._short.get((ent_type, acronym(name)))
+            # An entity first seen as an acronym takes one expansion; a second, different one is ambiguous
+            if ent_id and self._expanded.get(ent_id, key) != key:
+                ent_id = None
+        if ent_id:
+            return ent_id, "acronym"
+
+        # Oversized blocks (very common word prefixes) are only used when no other block exists
+        blocks = sorted((self._blocks.get((ent_type, block), {}) for block in block_keys(words)), key=len)
+        candidates = {}
+        for block in blocks:
+            if candidates and len(block) > MAX_BLOCK_SIZE:
+                break
+            candidates.update(block)
+        if candidates:
+            for alias, _, _ in process.extract(" ".join(words), list(candidates), scorer=fuzz.ratio,
+                                               score_cutoff=self.threshold, limit=FUZZY_LIMIT):
+                if same_words(words, alias.split()):
+                    return candidates[alias], "fuzzy"
+
+        if self.embed_fn is not None:
+            ent_id = self._embedding_match(name, ent_type)
+            if ent_id:
+                return ent_id, "embedding"
+        return None, None
+
+    def _embedding_match(self, name: str, ent_type: str):
+        # Cosine neighbour among canonical names of the same type; the matrix is rebuilt after new entities
+        if ent_type not in self._vectors:
+            ids = [ent_id for ent_id, (_, t) in self._entities.items() if t == ent_type]
+            if not ids:
+                return None
+            matrix = np.asarray(self.embed_fn([self._entities[i][0] for i in ids]), dtype=np.float32)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            self._vectors[ent_type] = (ids, matrix)
+        ids, matrix = self._vectors[ent_type]
+        vector = np.asarray(self.embed_fn([name])[0], dtype=np.float32)
+        scores = matrix @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        best = int(np.argmax(scores))
+        if scores[best] >= self.embed_threshold and numbers(self._entities[ids[best]][0]) == numbers(name):
+            return ids[best]
+        return None
+
+    @traced(items=len)
+    def resolve_many(self, entities: list) -> list:
+        """
+        Resolve extracted entities ({"name", "type", optional "aliases"}) to canonical entities.
+        Returns one {"id", "name" (canonical), "type", "mention"} per input entity; new names and aliases
+        are added to the index in one transaction.
+        """
+        self.refresh()
+        resolved, new_entities, new_aliases = [], [], []
+        with self._lock:
+            for ent in entities:
+                name, ent_type = ent["name"], ent.get("type", "Concept")
+                if not match_key(name):
+                    continue
+                ent_id, kind = self._match(name, ent_type)
+                if ent_id is None:
+                    ent_id, kind = canonical_id(ent_type, name), "new"
+                    if ent_id not in self._entities:
+                        self._entities[ent_id] = (name, ent_type)
+                        new_entities.append((ent_id, name, ent_type))
+                self.stats[kind] += 1
+                self._mentions[ent_id] += 1
+
+                # The mention and any extractor-merged aliases all point at the canonical entity
+                for alias in [name] + list(ent.get("aliases", [])):
+                    if match_key(alias) and (ent_type, match_key(alias)) not in self._exact:
+                        self._index(alias, ent_type, ent_id)
+                        new_aliases.append((alias, ent_type, ent_id))
+                resolved.append({"id": ent_id, "name": self._entities[ent_id][0], "type": ent_type, "mention": name})
+
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO entities (id, name, type) VALUES (?, ?, ?)", new_entities)
+                self._conn.executemany("INSERT OR IGNORE INTO aliases (name, type, id) VALUES (?, ?, ?)", new_aliases)
+        return resolved
+
+    def lookup(self, name: str):
+        """
+        Canonical ID for a bare name of any type (relationship endpoints carry no type), or None.
+        When several types share the name, the most mentioned entity wins.
+        """
+        # resolve_many may add aliases and mentions from another thread meanwhile
+        with self._lock:
+            ids = self._by_key.get(match_key(name))
+            if not ids:
+                return None
+            return max(ids, key=lambda ent_id: (self._mentions[ent_id], ent_id))
+
+    def candidates(self, name: str) -> list:
+        """
+        Canonical IDs a bare name could refer to, for queries rather than writes: exact matches of any type,
+        then acronym and fuzzy matches within each entity type. Nothing is added to the index.
+        """
+        self.refresh()
+        with self._lock:
+            ids = set(self._by_key.get(match_key(name), ()))
+            for ent_type in self._types:
+                ent_id, _ = self._match(name, ent_type)
+                if ent_id:
+                    ids.add(ent_id)
+        return sorted(ids)
+
+    def count(self) -> int:
+        return len(self._entities)
+
+    def close(self):
+        self._conn.close()
+
+
+# Process-wide resolver, created on first use
+_resolver = None
+
+
+def get_resolver() -> EntityResolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = EntityResolver()
+    return _resolver
@@ -1,11 +1,18 @@
-# Import Neo4j driver to connect and run Cypher queries
-from neo4j import GraphDatabase
-
 # Standard modules for loading environment variables and working with strings
 import os
+import hashlib
 from dotenv import load_dotenv
 import re
 
+# Canonical entity IDs for every mention written to the graph
+from src.graph.entity_resolver import get_resolver, match_key
+
+# Spans for every Neo4j write and provenance check
+from src.telemetry.tracing import traced
+
+# The driver is created on first use and closed by the registry when the process exits
+from src.models.registry import get_model_registry
+
 # Load environment variables from .env file 
 load_dotenv()
 
@@ -14,6 +21,156 @@ NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
+# Rows sent per UNWIND statement, connection pool size and retry budget for transient errors
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "500"))
+NEO4J_POOL_SIZE = int(os.getenv("NEO4J_POOL_SIZE", "50"))
+NEO4J_RETRY_SECONDS = float(os.getenv("NEO4J_RETRY_SECONDS", "30"))
+
+# Drivers whose database schema has already been bootstrapped in this process
+_schema_ready = set()
+
+# Constraints and indexes backing every MERGE/MATCH issued by KnowledgeGraph:
+# - Uniqueness on Entity(id) and Document(filename) also creates their lookup indexes;
+#   entities and relationships are merged and matched on the canonical ID alone
+# - The index on Entity(name) serves name lookups from graph QA and hybrid retrieval
+SCHEMA_CONSTRAINTS = {
+    "entity_id": "CREATE CONSTRAINT entity_id IF NOT EXISTS FOR (e:Entity) REQUIRE e.id IS UNIQUE",
+    "document_filename": "CREATE CONSTRAINT document_filename IF NOT EXISTS FOR (d:Document) REQUIRE d.filename IS UNIQUE",
+}
+SCHEMA_INDEXES = {
+    "entity_name": "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+}
+
+# Constraints from earlier schema versions that conflict with canonical IDs and are dropped
+LEGACY_CONSTRAINTS = ["entity_name_type"]
+
+# Migration of Entity nodes written before canonical IDs existed, when they were merged on (name, type) and had no `id`
+LEGACY_ENTITIES = """
+MATCH (e:Entity) WHERE e.id IS NULL
+RETURN elementId(e) AS node, e.name AS name, e.type AS type
+LIMIT $limit
+"""
+# The first node resolved to an ID takes it; returns nothing if another node already holds the ID
+CLAIM_ENTITY_ID = """
+MATCH (e) WHERE elementId(e) = $node
+OPTIONAL MATCH (c:Entity {id: $id})
+WITH e, c WHERE c IS NULL
+SET e.id = $id,
+    e.aliases = CASE WHEN e.name IN coalesce(e.aliases, []) THEN e.aliases ELSE coalesce(e.aliases, []) + e.name END
+RETURN elementId(e) AS node
+"""
+# Later nodes with the same ID are folded into it: their relationships are moved, then the node is deleted
+LEGACY_RELATIONSHIPS = """
+MATCH (e)-[r]-(o) WHERE elementId(e) = $node
+RETURN type(r) AS type, startNode(r) = e AS outgoing,
+       CASE WHEN o = e THEN NULL ELSE elementId(o) END AS other, r.sources AS sources
+"""
+MOVE_RELATIONSHIP = """
+MATCH (c:Entity {{id: $id}})
+MATCH (o) WHERE elementId(o) = coalesce($other, elementId(c))
+MERGE {pattern}
+SET r.sources = CASE WHEN $sources IS NULL THEN r.sources
+                     ELSE coalesce(r.sources, []) + [s IN $sources WHERE NOT s IN coalesce(r.sources, [])] END
+"""
+FOLD_ENTITY = """
+MATCH (e) WHERE elementId(e) = $node
+MATCH (c:Entity {id: $id})
+SET c.aliases = reduce(a = coalesce(c.aliases, []), x IN [e.name] + coalesce(e.aliases, []) |
+                       CASE WHEN x IN a THEN a ELSE a + x END)
+DETACH DELETE e
+"""
+
+# Entity upsert: canonical node, surface form as an alias, and a MENTIONS edge tagged with the contributing source
+MERGE_ENTITIES = """
+MERGE (d:Document {filename: $filename})
+WITH d
+UNWIND $rows AS row
+MERGE (e:Entity {id: row.id})
+ON CREATE SET e.name = row.name, e.type = row.type, e.aliases = []
+SET e.aliases = CASE WHEN row.alias IN e.aliases THEN e.aliases ELSE e.aliases + row.alias END
+MERGE (d)-[m:MENTIONS]->(e)
+SET m.sources = CASE WHEN $tag IN coalesce(m.sources, []) THEN m.sources ELSE coalesce(m.sources, []) + $tag END
+"""
+
+# Relationship upsert; {rel} is a sanitized type. A null $tag leaves the sources untouched
+MERGE_RELATIONSHIPS = """
+UNWIND $rows AS row
+MATCH (a:Entity {{id: row.a}})
+MATCH (b:Entity {{id: row.b}})
+MERGE (a)-[r:{rel}]->(b)
+SET r.sources = CASE WHEN $tag IS NULL OR $tag IN coalesce(r.sources, []) THEN r.sources ELSE coalesce(r.sources, []) + $tag END
+"""
+
+# Provenance reads: what one document part currently contributes.
+# MENTIONS edges written before provenance tags existed count as the document's own.
+DOCUMENT_STATE = """
+MATCH (d:Document {filename: $filename})
+RETURN d[$hash_key] AS content_hash, d[$version_key] AS pipeline_version
+"""
+CURRENT_MENTIONS = """
+MATCH (:Document {filename: $filename})-[m:MENTIONS]->(e:Entity)
+WHERE $tag IN coalesce(m.sources, [$filename])
+RETURN e.id AS id
+"""
+CURRENT_EDGES = """
+MATCH (:Document {filename: $filename})-[:MENTIONS]->(a:Entity)-[r]->(b:Entity)
+WHERE $tag IN coalesce(r.sources, [])
+RETURN type(r) AS type, a.id AS a, b.id AS b
+"""
+
+# Provenance writes used by sync_document
+SET_DOCUMENT_STATE = """
+MERGE (d:Document {filename: $filename})
+SET d += $props
+"""
+RETRACT_MENTIONS = """
+UNWIND $ids AS id
+MATCH (:Document {filename: $filename})-[m:MENTIONS]->(:Entity {id: id})
+SET m.sources = [s IN coalesce(m.sources, [$filename]) WHERE s <> $tag]
+WITH m WHERE size(m.sources) = 0
+DELETE m
+"""
+RETRACT_RELATIONSHIPS = """
+UNWIND $rows AS row
+MATCH (:Entity {{id: row.a}})-[r:{rel}]->(:Entity {{id: row.b}})
+SET r.sources = [s IN coalesce(r.sources, []) WHERE s <> $tag]
+WITH r WHERE size(r.sources) = 0
+DELETE r
+"""
+DELETE_ORPHANS = """
+UNWIND $ids AS id
+MATCH (e:Entity {id: id})
+WHERE NOT ()-[:MENTIONS]->(e)
+DETACH DELETE e
+"""
+
+def get_driver():
+    """
+    Return the process-wide Neo4j driver, creating it on first use; its connection pool is shared by every KnowledgeGraph.
+    Managed write transactions on this driver retry transient errors
+    (deadlocks, leader switches, dropped connections) for up to NEO4J_RETRY_SECONDS.
+    """
+    return get_model_registry().get("neo4j", create_driver, unload=lambda driver: driver.close(), evictable=False)
+
+def create_driver():
+    # Imported on first use, so modules that only build queries do not load the driver package
+    from neo4j import GraphDatabase
+    return GraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USERNAME, NEO4J_PASSWORD),
+        max_connection_pool_size=NEO4J_POOL_SIZE,
+        max_transaction_retry_time=NEO4J_RETRY_SECONDS,
+    )
+
+def close_driver():
+    # Close the shared driver and its pool; the next get_driver() call reconnects
+    get_model_registry().evict("neo4j")
+
+def batched(rows: list, batch_size: int):
+    # Yield consecutive slices of at most batch_size rows
+    for i in range(0, len(rows), batch_size):
+        yield rows[i:i + batch_size]
+
 def sanitize_relationship_type(rel_type: str) -> str:
     """
     Convert raw relationship type strings into a safe, Cypher-compatible format:
@@ -27,53 +184,252 @@ class KnowledgeGraph:
     """
     Class to interact with a Neo4j knowledge graph:
     - Connects to Neo4j database
+    - Resolves entity mentions to canonical IDs, so aliases share one node
     - Adds entities and their relationships
     - Associates entities with their document of origin
     """
 
-    def __init__(self):
-        # Create a Neo4j driver instance using the provided credentials
-        self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
+    def __init__(self, driver=None, batch_size: int = NEO4J_BATCH_SIZE, ensure_schema: bool = True, resolver=None):
+        # Reuse the process-wide driver and alias index unless specific ones are supplied
+        self.driver = driver or get_driver()
+        self.batch_size = batch_size
+        self.resolver = resolver or get_resolver()
+
+        # Canonical IDs of the last add_entities call's mentions, by match key, for the add_relationships that follows;
+        # replaced per document, so a long-lived writer does not accumulate every mention it has seen
+        self._recent = {}
+
+        # Bootstrap constraints and indexes the first time this driver is used
+        if ensure_schema and id(self.driver) not in _schema_ready:
+            self.ensure_schema()
 
     def close(self):
-        # Gracefully close the Neo4j driver session
-        self.driver.close()
+        # The driver is shared across the process and closed at exit, so there is nothing to release here
+        pass
+
+    @traced()
+    def ensure_schema(self):
+        """
+        Create the constraints and indexes the writer relies on, then verify them.
+        - Every statement uses IF NOT EXISTS, so the step is idempotent
+        - Waits for the indexes to come online before returning
+        - Raises RuntimeError if anything is missing or not ONLINE afterwards
+        - Gives Entity nodes from before canonical IDs their `id` (see backfill_entity_ids)
+        """
+        with self.driver.session() as session:
+            for name in LEGACY_CONSTRAINTS:
+                session.run(f"DROP CONSTRAINT {name} IF EXISTS").consume()
+            for statement in list(SCHEMA_CONSTRAINTS.values()) + list(SCHEMA_INDEXES.values()):
+                session.run(statement).consume()
+            session.run("CALL db.awaitIndexes(300)").consume()
+
+            constraints = {record["name"] for record in session.run("SHOW CONSTRAINTS YIELD name")}
+            indexes = {record["name"]: record["state"] for record in session.run("SHOW INDEXES YIELD name, state")}
+
+        missing = [name for name in SCHEMA_CONSTRAINTS if name not in constraints]
+        missing += [name for name in SCHEMA_INDEXES if indexes.get(name) != "ONLINE"]
+        if missing:
+            raise RuntimeError(f"Neo4j schema bootstrap failed; missing or offline: {', '.join(missing)}")
+
+        self.backfill_entity_ids()
+        _schema_ready.add(id(self.driver))
+
+    @traced()
+    def backfill_entity_ids(self) -> int:
+        """
+        One-time migration for graphs written before canonical IDs, whose Entity nodes have no `id`:
+        - Each node's name and type are resolved through the alias index, as a new mention would be
+        - The first node resolved to an ID takes it; later ones (aliases of the same entity, e.g. "SDG1"
+          next to "SDG 1") are folded into it, keeping their relationships, provenance tags and names as aliases
+        Without this, MERGE on `id` would create a second node next to every legacy one.
+        Returns the number of legacy nodes migrated; 0 once the graph is up to date.
+        """
+        def read(tx):
+            return [record.data() for record in tx.run(LEGACY_ENTITIES, limit=self.batch_size)]
+
+        migrated = 0
+        with self.driver.session() as session:
+            while True:
+                rows = session.execute_read(read)
+                if not rows:
+                    return migrated
+                session.execute_write(self._migrate_entities, rows, self._legacy_ids(rows))
+                migrated += len(rows)
+
+    def _legacy_ids(self, rows: list) -> dict:
+        # Node element ID -> canonical ID; names the resolver cannot key (punctuation only) keep a node of their own
+        named = [row for row in rows if row["name"] and match_key(row["name"])]
+        resolved = self.resolver.resolve_many([{"name": row["name"], "type": row["type"] or "Concept"} for row in named])
+        ids = {row["node"]: ent["id"] for row, ent in zip(named, resolved)}
+        for row in rows:
+            ids.setdefault(row["node"], hashlib.sha256(f"{row['type']}\x00{row['name']}\x00{row['node']}".encode()).hexdigest()[:16])
+        return ids
 
+    @staticmethod
+    def _migrate_entities(tx, rows: list, ids: dict):
+        for row in rows:
+            node, ent_id = row["node"], ids[row["node"]]
+            if tx.run(CLAIM_ENTITY_ID, node=node, id=ent_id).single() is not None:
+                continue
+            for rel in list(tx.run(LEGACY_RELATIONSHIPS, node=node)):
+                rel_type = "`" + rel["type"].replace("`", "``") + "`"
+                pattern = f"(c)-[r:{rel_type}]->(o)" if rel["outgoing"] else f"(o)-[r:{rel_type}]->(c)"
+                tx.run(MOVE_RELATIONSHIP.format(pattern=pattern), id=ent_id, other=rel["other"], sources=rel["sources"])
+            tx.run(FOLD_ENTITY, node=node, id=ent_id)
+
+    def _resolve_rows(self, entities: list) -> tuple:
+        # One row per (canonical entity, surface form), plus the document's mentions by match key for its relationships
+        rows, mentions = {}, {}
+        for ent in self.resolver.resolve_many(entities):
+            rows.setdefault((ent["id"], ent["mention"]), {
+                "id": ent["id"], "name": ent["name"], "type": ent["type"], "alias": ent["mention"]
+            })
+            mentions[match_key(ent["mention"])] = ent["id"]
+        return list(rows.values()), mentions
+
+    def _resolve_edges(self, relationships, mentions: dict, allowed: set = None) -> dict:
+        # (source, type, target) name triples -> {sanitized type: [{"a": id, "b": id}]}, without duplicates
+        groups = {}
+        for source, rel_type, target in relationships:
+            safe_rel = sanitize_relationship_type(rel_type)
+            a = mentions.get(match_key(source)) or self.resolver.lookup(source)
+            b = mentions.get(match_key(target)) or self.resolver.lookup(target)
+            # Skip labels that sanitize to nothing; they cannot form a valid relationship type
+            if not (safe_rel and a and b) or allowed is not None and not (a in allowed and b in allowed):
+                continue
+            rows = groups.setdefault(safe_rel, [])
+            if {"a": a, "b": b} not in rows:
+                rows.append({"a": a, "b": b})
+        return groups
+
+    @traced()
     def add_entities(self, entities: list, source_file: str):
         """
         Add extracted entities to the graph and link them to a source document.
-        For each entity:
-        - Ensure the (Entity) node exists (MERGE)
+        Entities are sent in batches of `batch_size` rows through UNWIND, one
+        write transaction per batch. For each entity:
+        - Resolve the mention to its canonical ID through the alias index
+        - Ensure the (Entity) node exists (MERGE on the ID) and record the mention as an alias
         - Ensure the (Document) node exists (MERGE)
-        - Create a :MENTIONS relationship from the document to the entity
+        - Create a :MENTIONS relationship from the document to the entity, tagged with its source
         """
+        rows, self._recent = self._resolve_rows(entities)
         with self.driver.session() as session:
-            for ent in entities:
-                session.run(
-                    """
-                    MERGE (e:Entity {name: $name, type: $type})
-                    MERGE (d:Document {filename: $filename})
-                    MERGE (d)-[:MENTIONS]->(e)
-                    """,
-                    name=ent["name"],
-                    type=ent["type"],
-                    filename=source_file
-                )
-
-    def add_relationships(self, relationships):
+            for batch in batched(rows, self.batch_size):
+                session.execute_write(self._merge_entities, batch, source_file, source_file)
+
+    @staticmethod
+    def _merge_entities(tx, rows: list, filename: str, tag: str):
+        tx.run(MERGE_ENTITIES, rows=rows, filename=filename, tag=tag)
+
+    @traced()
+    def add_relationships(self, relationships, source_file: str = None):
         """
         Add relationships between entities in the graph.
-        For each (source, relationship_type, target) tuple:
+        Relationship types cannot be parameterised in Cypher, so triples are
+        grouped by their sanitized type and each group is written with UNWIND
+        in batches of `batch_size`. For each (source, relationship_type, target) tuple:
         - Sanitize the relationship type
-        - Match existing source and target entities by name
-        - Create or merge a directional relationship between them
+        - Resolve source and target names to canonical IDs (mentions just written first, then the alias index)
+        - Match the two entities by ID and create or merge a directional relationship between them
+        - Record `source_file` in the relationship's sources, when given
+        Triples whose endpoints resolve to no entity are skipped.
+        """
+        with self.driver.session() as session:
+            for safe_rel, rows in self._resolve_edges(relationships, self._recent).items():
+                for batch in batched(rows, self.batch_size):
+                    session.execute_write(self._merge_relationships, safe_rel, batch, source_file)
+
+    @staticmethod
+    def _merge_relationships(tx, safe_rel: str, rows: list, tag: str = None):
+        tx.run(MERGE_RELATIONSHIPS.format(rel=safe_rel), rows=rows, tag=tag)
+
+    def document_state(self, source_file: str, part: str = ""):
+        """
+        (content_hash, pipeline_version) recorded for a document part, or None if it was never synced.
+        """
+        prefix = f"{part}_" if part else ""
+
+        def read(tx):
+            return tx.run(DOCUMENT_STATE, filename=source_file, hash_key=f"{prefix}content_hash",
+                          version_key=f"{prefix}pipeline_version").single()
+
+        with self.driver.session() as session:
+            record = session.execute_read(read)
+        if record is None or record["content_hash"] is None:
+            return None
+        return record["content_hash"], record["pipeline_version"]
+
+    @traced()
+    def is_current(self, source_file: str, content_hash: str, pipeline_version: str, part: str = "") -> bool:
+        # True when the graph already holds this exact content, produced by this pipeline version
+        return self.document_state(source_file, part) == (content_hash, pipeline_version)
+
+    @traced()
+    def sync_document(self, source_file: str, entities: list, relationships, content_hash: str,
+                      pipeline_version: str, part: str = "") -> dict:
+        """
+        Make the graph hold exactly what this version of a document contributes, changing nothing else:
+        - If the Document already records `content_hash` and `pipeline_version`, nothing is written
+        - Otherwise the entities and edges this document previously produced are read back through their
+          provenance tags and diffed with the new ones; only the difference is added or retracted
+        - The diff and the new content hash and pipeline version are written in one transaction,
+          so a failed sync leaves the previous version intact
+        - Retracted edges and mentions lose this document's tag and are deleted once no source remains;
+          entities no document mentions any more are deleted
+        `part` separates independent contributions to one Document, e.g. "captions" for video key frames.
+        Returns counts of added and retracted entities and edges.
         """
+        if self.is_current(source_file, content_hash, pipeline_version, part):
+            return {"status": "unchanged", "entities_added": 0, "entities_retracted": 0,
+                    "edges_added": 0, "edges_retracted": 0}
+
+        prefix = f"{part}_" if part else ""
+        props = {f"{prefix}content_hash": content_hash, f"{prefix}pipeline_version": pipeline_version}
+        tag = f"{source_file}#{part}" if part else source_file
+
+        # Resolution happens outside the transaction; endpoints are limited to this document's entities
+        # The mentions stay local, so concurrent syncs of different documents cannot see each other's
+        rows, mentions = self._resolve_rows(entities)
+        edges = self._resolve_edges(relationships, mentions, allowed={row["id"] for row in rows})
+
         with self.driver.session() as session:
-            for source, rel_type, target in relationships:
-                safe_rel = sanitize_relationship_type(rel_type) 
-                query = f"""
-                MATCH (a:Entity {{name: $a}})
-                MATCH (b:Entity {{name: $b}})
-                MERGE (a)-[r:{safe_rel}]->(b)
-                """
-                session.run(query, a=source, b=target)
+            return session.execute_write(self._apply_diff, source_file, tag, props, rows, edges, self.batch_size)
+
+    @staticmethod
+    def _apply_diff(tx, filename: str, tag: str, props: dict, rows: list, edges: dict, batch_size: int) -> dict:
+        # Current contribution of this document, read inside the write transaction
+        old_ids = {r["id"] for r in tx.run(CURRENT_MENTIONS, filename=filename, tag=tag) if r["id"]}
+        old_edges = {(r["type"], r["a"], r["b"]) for r in tx.run(CURRENT_EDGES, filename=filename, tag=tag)}
+
+        new_ids = {row["id"] for row in rows}
+        new_edges = {(rel, e["a"], e["b"]) for rel, group in edges.items() for e in group}
+        add_rows = [row for row in rows if row["id"] not in old_ids]
+        retract_ids = sorted(old_ids - new_ids)
+
+        tx.run(SET_DOCUMENT_STATE, filename=filename, props=props)
+        for batch in batched(add_rows, batch_size):
+            tx.run(MERGE_ENTITIES, rows=batch, filename=filename, tag=tag)
+        for batch in batched(retract_ids, batch_size):
+            tx.run(RETRACT_MENTIONS, ids=batch, filename=filename, tag=tag)
+
+        for rel in sorted({rel for rel, _, _ in new_edges - old_edges}):
+            added = [{"a": a, "b": b} for r, a, b in sorted(new_edges - old_edges) if r == rel]
+            for batch in batched(added, batch_size):
+                tx.run(MERGE_RELATIONSHIPS.format(rel=rel), rows=batch, tag=tag)
+        for rel in sorted({rel for rel, _, _ in old_edges - new_edges}):
+            retracted = [{"a": a, "b": b} for r, a, b in sorted(old_edges - new_edges) if r == rel]
+            for batch in batched(retracted, batch_size):
+                tx.run(RETRACT_RELATIONSHIPS.format(rel=rel), rows=batch, tag=tag)
+
+        # Entities that lost their last mention go too, with any edges left on them
+        for batch in batched(retract_ids, batch_size):
+            tx.run(DELETE_ORPHANS, ids=batch)
+
+        return {
+            "status": "updated" if old_ids or old_edges else "created",
+            "entities_added": len(new_ids - old_ids),
+            "entities_retracted": len(retract_ids),
+            "edges_added": len(new_edges - old_edges),
+            "edges_retracted": len(old_edges - new_edges),
+        }
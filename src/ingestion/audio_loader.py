@@ -1,14 +1,13 @@
-# Import the Whisper library for automatic speech recognition 
-import whisper
+# Import the shared transcription service; the Whisper model is loaded once, on first use
+# Backend and model size are configured with WHISPER_BACKEND and WHISPER_MODEL_SIZE
+from src.ingestion.transcriber import get_transcriber
 
-# Load the pre-trained Whisper model (using the "base" size variant)
-# You can replace "base" with "small", "medium", or "large" for different tradeoffs
-model = whisper.load_model("base")
+# Span around each transcribed file
+from src.telemetry.tracing import traced
 
 # Define a function to extract transcribed text from an audio file
+@traced()
 def extract_text_from_audio(audio_path: str) -> str:
-    # Use the Whisper model to transcribe the audio at the given path
-    result = model.transcribe(audio_path)
-    
-    # Return only the transcribed text, removing any leading whitespace
-    return result["text"].strip()
+    # Use the shared transcriber to transcribe the audio at the given path
+    # The transcript is returned with leading/trailing whitespace removed
+    return get_transcriber().transcribe(audio_path)
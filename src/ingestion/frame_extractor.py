@@ -4,48 +4,211 @@ import cv2
 # Import os for file and directory operations
 import os
 
-# Define a function to extract key frames from a video file
+# Find the key frame a seek starts decoding from
+from bisect import bisect_right
+
+# Containers for sampled frames and decoding statistics
+from dataclasses import dataclass, field
+
+# Import NumPy for frame buffers
+import numpy as np
+
+# Span per sampled video, with the frames kept
+from src.telemetry.tracing import traced
+
+# Supported sampling modes:
+# - seek: jump to each target timestamp; only the frames from the preceding key frame to the target are decoded
+# - grab: decode every frame with grab() but colour-convert only target frames with retrieve()
+# - scene: visit a target every `sample_seconds` the same way as seek, and keep frames where the content changes
+MODES = ("seek", "grab", "scene")
+
+
+@dataclass
+class KeyFrame:
+    index: int
+    timestamp: float
+    image: np.ndarray
+    path: str = None
+
+
+@dataclass
+class FrameSamplingStats:
+    frames_in_video: int = 0
+    frames_grabbed: int = 0
+    # Every frame the decoder produced: each grab(), and for seeks the frames from the key frame to the target
+    frames_decoded: int = 0
+    frames_kept: int = 0
+    duplicates_dropped: int = 0
+    seconds: float = 0.0
+    skipped: list = field(default_factory=list)
+
+
+# 64-bit difference hash: robust to small changes in exposure and compression
+def dhash(image: np.ndarray) -> int:
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(sum(1 << i for i, bit in enumerate(bits) if bit))
+
+
+# Normalised HSV colour histogram used to measure scene changes
+def hsv_histogram(image: np.ndarray) -> np.ndarray:
+    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, [8, 8, 8], [0, 180, 0, 256, 0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+
+# Target frame indices for fixed-interval sampling
+def interval_targets(frame_count: int, fps: float, every_n_seconds: float) -> list:
+    interval = max(int(fps * every_n_seconds), 1)
+    return list(range(0, frame_count, interval))
+
+
+# Key frame indices and the frame count, from one demux-only pass: with CAP_PROP_FORMAT -1 the FFmpeg
+# backend returns raw packets, so nothing is decoded (about 1/60th of the cost of grab() on every frame)
+# Backends without raw packet access report no key frames
+def keyframe_indices(video_path: str) -> tuple:
+    vidcap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    keyframes, frame_count = [], 0
+    while vidcap.grab():
+        if vidcap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+            keyframes.append(frame_count)
+        frame_count += 1
+    vidcap.release()
+    return keyframes, frame_count
+
+
+# Read each target frame, in increasing order, yielding (frame index, image)
+# A target is reached by decoding forward from the current position when that is no more work than seeking,
+# which decodes from the preceding key frame; decoded frames are counted either way
+def read_targets(vidcap, targets: list, keyframes: list, stats: FrameSamplingStats):
+    position = 0
+    for target in targets:
+        key = keyframes[bisect_right(keyframes, target) - 1] if keyframes and keyframes[0] <= target else target
+        if position <= target and target - position <= target - key:
+            while position < target and vidcap.grab():
+                stats.frames_grabbed += 1
+                stats.frames_decoded += 1
+                position += 1
+        else:
+            vidcap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            stats.frames_decoded += target - key
+        success, frame = vidcap.read()
+        position = target + 1
+        if not success:
+            stats.skipped.append(target)
+            continue
+        stats.frames_decoded += 1
+        yield target, frame
+
+
+# Walk the whole stream with grab(), which decodes every frame; retrieve() (the colour conversion) only runs
+# on every `interval`-th frame, which is yielded as (frame index, image)
+def walk_targets(vidcap, interval: int, stats: FrameSamplingStats):
+    frame_idx = 0
+    while vidcap.grab():
+        stats.frames_grabbed += 1
+        stats.frames_decoded += 1
+        if frame_idx % interval == 0:
+            success, frame = vidcap.retrieve()
+            if success:
+                yield frame_idx, frame
+        frame_idx += 1
+
+
+# Sample key frames from a video and keep them in memory
 # Arguments:
 # - video_path: path to the input video file
-# - output_folder: where the extracted frames will be saved
-# - every_n_seconds: interval (in seconds) at which to extract frames 
-def extract_key_frames(video_path: str, output_folder: str, every_n_seconds: int = 20) -> list[str]:
-    # Ensure the output directory exists; create it if it doesn't
-    os.makedirs(output_folder, exist_ok=True)
+# - mode: one of MODES
+# - every_n_seconds: interval between frames for the seek and grab modes
+# - scene_threshold: Bhattacharyya histogram distance (0-1) that counts as a scene change
+# - sample_seconds: how often the scene mode inspects the video
+# - dedupe_distance: frames whose dHash differs from a kept frame by at most this many bits are dropped
+# - output_folder: when given, kept frames are also written there as JPEGs
+# Returns the kept frames and the decoding statistics
+@traced(items=lambda result: len(result[0]))
+def sample_key_frames(video_path: str, mode: str = "seek", every_n_seconds: float = 20,
+                      scene_threshold: float = 0.4, sample_seconds: float = 1.0,
+                      dedupe_distance: int = 5, output_folder: str = None):
+    if mode not in MODES:
+        raise ValueError(f"Unknown frame sampling mode '{mode}', expected one of {MODES}")
+
+    start_tick = cv2.getTickCount()
+    stats = FrameSamplingStats()
 
-    # Load the video file using OpenCV's VideoCapture
+    # Load the video file and read its frame rate and length
     vidcap = cv2.VideoCapture(video_path)
-    
-    # Get the video's frame rate 
-    fps = vidcap.get(cv2.CAP_PROP_FPS)
-
-    # Calculate the frame interval based on time 
-    interval = int(fps * every_n_seconds)
-    
-    # List to store the paths of saved frame images
-    frame_paths = []
-    
-    # Counters to track frame positions and saved images
-    frame_idx = 0 
-    saved_idx = 0
-    
-    # Loop through all frames in the video
-    while True:
-        success, frame = vidcap.read() 
-        if not success:
-            break  
+    fps = vidcap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_count = int(vidcap.get(cv2.CAP_PROP_FRAME_COUNT))
+    stats.frames_in_video = frame_count
 
-        # Save the frame if it's at the desired interval
-        if frame_idx % interval == 0:
-            frame_filename = os.path.join(output_folder, f"frame_{saved_idx}.jpg")
-            cv2.imwrite(frame_filename, frame)  
-            frame_paths.append(frame_filename)  
-            saved_idx += 1
+    # Key frames tell what each seek costs; the demux pass also counts frames in containers that do not report it
+    keyframes = []
+    if mode != "grab":
+        keyframes, demuxed = keyframe_indices(video_path)
+        if frame_count <= 0:
+            frame_count = stats.frames_in_video = demuxed
+
+    # A stream whose length is still unknown can only be walked, not seeked
+    walk = mode == "grab" or frame_count <= 0
+    step = sample_seconds if mode == "scene" else every_n_seconds
 
-        frame_idx += 1  
+    # Candidate frames as (frame index, image) in playback order
+    candidates = []
+    if walk:
+        sampled = walk_targets(vidcap, max(int(fps * step), 1), stats)
+    else:
+        sampled = read_targets(vidcap, interval_targets(frame_count, fps, step), keyframes, stats)
+
+    last_hist = None
+    for frame_idx, frame in sampled:
+        if mode != "scene":
+            candidates.append((frame_idx, frame))
+            continue
+        # Keep the first frame and every frame that differs enough from the previous sample
+        hist = hsv_histogram(frame)
+        if last_hist is None or cv2.compareHist(last_hist, hist, cv2.HISTCMP_BHATTACHARYYA) >= scene_threshold:
+            candidates.append((frame_idx, frame))
+        last_hist = hist
 
     # Release the video capture object to free resources
     vidcap.release()
 
+    # Drop near-duplicates so repeated shots never reach the captioner
+    frames = []
+    hashes = []
+    for frame_idx, image in candidates:
+        frame_hash = dhash(image)
+        if any(bin(frame_hash ^ h).count("1") <= dedupe_distance for h in hashes):
+            stats.duplicates_dropped += 1
+            continue
+        hashes.append(frame_hash)
+        frames.append(KeyFrame(index=frame_idx, timestamp=frame_idx / fps, image=image))
+
+    # Optionally persist the kept frames to disk
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
+        for saved_idx, key_frame in enumerate(frames):
+            key_frame.path = os.path.join(output_folder, f"frame_{saved_idx}.jpg")
+            cv2.imwrite(key_frame.path, key_frame.image)
+
+    stats.frames_kept = len(frames)
+    stats.seconds = (cv2.getTickCount() - start_tick) / cv2.getTickFrequency()
+    return frames, stats
+
+
+# Define a function to extract key frames from a video file and save them to disk
+# Arguments:
+# - video_path: path to the input video file
+# - output_folder: where the extracted frames will be saved
+# - every_n_seconds: interval (in seconds) at which to extract frames
+# - mode: sampling mode, see MODES
+@traced(items=len)
+def extract_key_frames(video_path: str, output_folder: str, every_n_seconds: int = 20,
+                       mode: str = "seek", **kwargs) -> list[str]:
+    frames, _ = sample_key_frames(
+        video_path, mode=mode, every_n_seconds=every_n_seconds, output_folder=output_folder, **kwargs
+    )
+
     # Return the list of saved frame image paths
-    return frame_paths
+    return [key_frame.path for key_frame in frames]
@@ -1,5 +1,5 @@
 # Import the Python Imaging Library to load and process images
-from PIL import Image
+from PIL import Image, ImageOps
 
 # Import Tesseract OCR engine wrapper for text extraction
 import pytesseract
@@ -7,18 +7,237 @@ import pytesseract
 # Import os for platform detection and path configuration
 import os
 
+# Image preprocessing: grayscale, thresholds, rotation and resizing
+import cv2
+import numpy as np
+
+# Process pool for batch OCR; spawn avoids forking a process that holds threads
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# OCR result containers
+from dataclasses import dataclass, field
+
+# Per-image timing
+import time
+
+# Spans with word and image counts
+from src.telemetry.tracing import traced
+
 # Optional: set the path to the Tesseract executable (required on Windows systems)
 # Adjust this path if Tesseract is installed elsewhere on the user's system
 if os.name == 'nt':  # Check if the OS is Windows
     pytesseract.pytesseract.tesseract_cmd = "your_path"
 
+# Processes for batch OCR
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+
+# Resolution Tesseract is tuned for; images with a known, different DPI are rescaled to it
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+
+# Images above this many pixels are downscaled first, whatever their DPI
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", "40000000"))
+
+# Images wider or taller than this are OCR'd as overlapping tiles
+OCR_TILE_SIZE = int(os.getenv("OCR_TILE_SIZE", "3000"))
+OCR_TILE_OVERLAP = 200
+
+# Images whose share of dark ("ink") pixels is below this are skipped as blank
+OCR_MIN_INK = float(os.getenv("OCR_MIN_INK", "0.002"))
+
+# Largest skew (degrees) corrected by deskewing, and the smallest worth correcting
+MAX_SKEW = 5.0
+MIN_SKEW = 0.3
+
+# LSTM engine, automatic page segmentation
+OCR_CONFIG = os.getenv("OCR_CONFIG", "--oem 1 --psm 3")
+
+
+@dataclass
+class OcrWord:
+    text: str
+    # Tesseract confidence, 0-100
+    conf: float
+    # (left, top, width, height) in the original image's pixels
+    box: tuple
+
+
+@dataclass
+class OcrResult:
+    source: str
+    text: str = ""
+    words: list = field(default_factory=list)
+    # Why OCR was skipped ("blank"), or None when it ran
+    skipped: str = None
+    seconds: float = 0.0
+
+    @property
+    def mean_conf(self) -> float:
+        return sum(w.conf for w in self.words) / len(self.words) if self.words else 0.0
+
+
+def to_gray(image) -> np.ndarray:
+    # PIL image (EXIF orientation applied) or array to one 8-bit channel
+    if isinstance(image, Image.Image):
+        image = np.asarray(ImageOps.exif_transpose(image).convert("L"))
+    elif image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def looks_blank(gray: np.ndarray) -> bool:
+    # Cheap check on a thumbnail: flat images, or almost no dark pixels once binarised
+    scale = 256 / max(gray.shape)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    if small.std() < 8:
+        return True
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return ink.mean() < OCR_MIN_INK
+
+
+def skew_angle(gray: np.ndarray) -> float:
+    # Projection profile: text lines give the sharpest row histogram when they are horizontal
+    scale = min(1.0, 800 / max(gray.shape))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ink = ink.astype(np.float32)
+    h, w = ink.shape
+    best, best_score = 0.0, -1.0
+    for angle in np.arange(-MAX_SKEW, MAX_SKEW + 0.01, 0.25):
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        score = cv2.warpAffine(ink, matrix, (w, h), flags=cv2.INTER_NEAREST).sum(axis=1).var()
+        if score > best_score:
+            best, best_score = float(angle), score
+    return best
+
+
+def preprocess(image, dpi: float = None):
+    """
+    Prepare an image for Tesseract; returns (gray image, 2x3 affine matrix mapping its pixels back to the original's):
+    - Grayscale, with EXIF orientation applied
+    - Rescaled to OCR_TARGET_DPI when its DPI is known, and below OCR_MAX_PIXELS in any case
+    - Deskewed by up to MAX_SKEW degrees
+    """
+    if dpi is None and isinstance(image, Image.Image):
+        dpi = (image.info.get("dpi") or (None,))[0]
+    gray = to_gray(image)
+
+    scale = OCR_TARGET_DPI / dpi if dpi and abs(dpi - OCR_TARGET_DPI) > 25 else 1.0
+    scale = min(scale, 4.0, (OCR_MAX_PIXELS / (gray.shape[0] * gray.shape[1])) ** 0.5)
+    if abs(scale - 1.0) > 0.05:
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+    else:
+        scale = 1.0
+    # Original -> preprocessed pixels, extended by the deskew rotation below
+    forward = np.array([[scale, 0.0, 0.0], [0.0, scale, 0.0]])
+
+    angle = skew_angle(gray)
+    if abs(angle) >= MIN_SKEW:
+        h, w = gray.shape
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        gray = cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_CUBIC, borderValue=255)
+        forward = matrix[:, :2] @ forward + np.hstack([np.zeros((2, 2)), matrix[:, 2:]])
+    return gray, cv2.invertAffineTransform(forward)
+
+
+def original_box(box: tuple, to_original: np.ndarray) -> tuple:
+    # A (left, top, width, height) box in preprocessed pixels -> the original-image box enclosing its four corners
+    left, top, width, height = box
+    corners = np.array([[left, top, 1], [left + width, top, 1], [left, top + height, 1], [left + width, top + height, 1]],
+                       dtype=np.float64)
+    xs, ys = to_original @ corners.T
+    x0, y0 = max(xs.min(), 0.0), max(ys.min(), 0.0)
+    return round(x0), round(y0), round(xs.max() - x0), round(ys.max() - y0)
+
+
+def tiles(shape: tuple, size: int = OCR_TILE_SIZE, overlap: int = OCR_TILE_OVERLAP):
+    """
+    Overlapping tile windows (y0, y1, x0, x1) plus the region each tile owns,
+    so a word cut by one tile edge is kept whole from the neighbouring tile.
+    """
+    def spans(length):
+        if length <= size:
+            return [(0, length, 0, length)]
+        step = size - overlap
+        starts = list(range(0, length - overlap, step))
+        result = []
+        for i, start in enumerate(starts):
+            stop = min(start + size, length)
+            own_start = 0 if i == 0 else start + overlap // 2
+            own_stop = length if i == len(starts) - 1 else start + step + overlap // 2
+            result.append((start, stop, own_start, own_stop))
+        return result
+
+    for y0, y1, oy0, oy1 in spans(shape[0]):
+        for x0, x1, ox0, ox1 in spans(shape[1]):
+            yield (y0, y1, x0, x1), (oy0, oy1, ox0, ox1)
+
+
+@traced(items=lambda result: len(result.words))
+def ocr_image(image, source: str = "", dpi: float = None) -> OcrResult:
+    """
+    OCR one image (path, PIL image or array) into text plus word boxes and confidences.
+    Blank images are skipped before Tesseract runs; very large ones are OCR'd tile by tile.
+    """
+    start = time.perf_counter()
+    if isinstance(image, str):
+        source = source or image
+        image = Image.open(image)
+    result = OcrResult(source)
+
+    gray, to_original = preprocess(image, dpi)
+    if looks_blank(gray):
+        result.skipped = "blank"
+        result.seconds = time.perf_counter() - start
+        return result
+
+    lines = {}
+    for (y0, y1, x0, x1), (oy0, oy1, ox0, ox1) in tiles(gray.shape):
+        data = pytesseract.image_to_data(gray[y0:y1, x0:x1], config=OCR_CONFIG, output_type=pytesseract.Output.DICT)
+        for i, text in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            if conf < 0 or not text.strip():
+                continue
+            left, top = data["left"][i] + x0, data["top"][i] + y0
+            width, height = data["width"][i], data["height"][i]
+            # Words from a tile's overlap margin belong to the neighbouring tile
+            cx, cy = left + width / 2, top + height / 2
+            if not (ox0 <= cx < ox1 and oy0 <= cy < oy1):
+                continue
+            word = OcrWord(text, conf, original_box((left, top, width, height), to_original))
+            result.words.append(word)
+            key = (y0, x0, data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append(word.text)
+
+    # Lines joined by newlines, paragraphs by blank lines, in tile then reading order
+    paragraphs = {}
+    for (y0, x0, block, par, _), words in lines.items():
+        paragraphs.setdefault((y0, x0, block, par), []).append(" ".join(words))
+    result.text = "\n\n".join("\n".join(par_lines) for par_lines in paragraphs.values()).strip()
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _limit_threads():
+    # One Tesseract thread per worker process; the pool supplies the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+@traced(items=len)
+def ocr_images(paths: list, workers: int = OCR_WORKERS) -> list:
+    """
+    Batch OCR: one OcrResult per path, in input order, spread across `workers` processes.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        return [ocr_image(path) for path in paths]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_limit_threads) as pool:
+        return list(pool.map(ocr_image, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
 # Define a function to extract text content from an image file
+@traced()
 def extract_text_from_image(image_path: str) -> str:
-    # Open the image file using PIL
-    image = Image.open(image_path)
-    
-    # Use Tesseract OCR to extract any visible text from the image
-    text = pytesseract.image_to_string(image)
-    
-    # Strip any leading/trailing whitespace and return the result
-    return text.strip()
+    # Preprocess, skip if blank, and OCR the image (tiled when very large)
+    return ocr_image(image_path).text
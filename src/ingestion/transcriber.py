@@ -0,0 +1,126 @@
+# Serialise access to a model instance shared across threads
+import threading
+
+# Read backend and model configuration from the environment
+import os
+
+# Span per transcription request
+from src.telemetry.tracing import traced
+
+# Backend models are loaded once per configuration on first use, and evictable when idle
+from src.models.registry import get_model_registry
+
+# Backend, model size and CTranslate2 compute type, configurable through .env
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "whisper")
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+
+# Version string for caches: transcripts change whenever the backend or model changes
+TRANSCRIBER_VERSION = f"{WHISPER_BACKEND}-{WHISPER_MODEL_SIZE}-{WHISPER_COMPUTE_TYPE}"
+
+
+class WhisperBackend:
+    """
+    Reference openai-whisper backend (PyTorch, float32 on CPU).
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_size: str, **_):
+        import whisper
+        self.model = whisper.load_model(model_size)
+
+    def transcribe(self, audio) -> str:
+        # Accepts a file path or a 16 kHz mono float32 array
+        return self.model.transcribe(audio)["text"].strip()
+
+    def transcribe_batch(self, audios: list, batch_size: int = 8) -> list:
+        # openai-whisper has no batched decoding, so requests run back to back
+        return [self.transcribe(audio) for audio in audios]
+
+
+class FasterWhisperBackend:
+    """
+    faster-whisper backend (CTranslate2), int8-quantized on CPU by default.
+    """
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str, compute_type: str = WHISPER_COMPUTE_TYPE, device: str = "cpu", **_):
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        self.batched = BatchedInferencePipeline(model=self.model)
+
+    def transcribe(self, audio) -> str:
+        # Segments are generated lazily; joining them runs the decoding
+        segments, _ = self.model.transcribe(audio, beam_size=5)
+        return "".join(segment.text for segment in segments).strip()
+
+    def transcribe_batch(self, audios: list, batch_size: int = 8) -> list:
+        # Voice-activity chunks of each request are decoded batch_size at a time
+        texts = []
+        for audio in audios:
+            segments, _ = self.batched.transcribe(audio, batch_size=batch_size)
+            texts.append("".join(segment.text for segment in segments).strip())
+        return texts
+
+
+# Registered transcription backends by name
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+class Transcriber:
+    """
+    Shared speech-to-text service used by the audio and video loaders:
+    - The backend model is loaded through the model registry on the first request, and again after an eviction
+    - Calls are serialised because the underlying models are not thread-safe
+    - Accepts file paths or 16 kHz mono float32 arrays, singly or in batches
+    """
+
+    def __init__(self, backend: str = WHISPER_BACKEND, model_size: str = WHISPER_MODEL_SIZE,
+                 compute_type: str = WHISPER_COMPUTE_TYPE):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown transcription backend '{backend}', expected one of {sorted(BACKENDS)}")
+        self.backend_name = backend
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return load_backend(self.backend_name, self.model_size, self.compute_type)
+
+    @traced()
+    def transcribe(self, audio) -> str:
+        backend = self.backend
+        with self._lock:
+            return backend.transcribe(audio)
+
+    @traced(items=len)
+    def transcribe_batch(self, audios: list, batch_size: int = 8) -> list:
+        backend = self.backend
+        with self._lock:
+            return backend.transcribe_batch(audios, batch_size=batch_size)
+
+
+def load_backend(backend: str = None, model_size: str = None, compute_type: str = None):
+    backend, model_size, compute_type = (backend or WHISPER_BACKEND, model_size or WHISPER_MODEL_SIZE,
+                                         compute_type or WHISPER_COMPUTE_TYPE)
+    return get_model_registry().get(f"whisper:{backend}-{model_size}-{compute_type}",
+                                    lambda: BACKENDS[backend](model_size, compute_type=compute_type))
+
+
+# One transcriber per configuration, shared by every loader in the process
+_transcribers = {}
+_transcribers_lock = threading.Lock()
+
+
+def get_transcriber(backend: str = None, model_size: str = None, compute_type: str = None) -> Transcriber:
+    key = (backend or WHISPER_BACKEND, model_size or WHISPER_MODEL_SIZE, compute_type or WHISPER_COMPUTE_TYPE)
+    with _transcribers_lock:
+        if key not in _transcribers:
+            _transcribers[key] = Transcriber(*key)
+        return _transcribers[key]
@@ -1,25 +1,125 @@
-# Import the Whisper speech recognition library
-import whisper
+# Import the shared transcription service used by the audio loader as well
+from src.ingestion.transcriber import get_transcriber
 
-# Import moviepy for handling video and audio extraction
-import moviepy.editor as mp
+# Import NumPy to hold decoded samples as float32 buffers
+import numpy as np
 
-# Load the Whisper model 
-model = whisper.load_model("base")
+# Compare words across chunk seams regardless of case and punctuation
+import re
 
-# Define a function to extract and transcribe speech from a video file
-def extract_audio_text_from_video(video_path: str) -> str:
-    # Load the video file using moviepy
-    video = mp.VideoFileClip(video_path)
+# Spans for decoding and transcription
+from src.telemetry.tracing import traced
+
+# Whisper models expect 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+
+# Whisper decodes 30-second windows, so chunks of that length lose no context
+CHUNK_SECONDS = 30
+
+# Each chunk ends at the quietest 20 ms frame in its last few seconds, so cuts fall between words where possible
+SILENCE_SEARCH_SECONDS = 5
+SILENCE_FRAME = SAMPLE_RATE // 50
+
+# Audio repeated from the end of the previous chunk, so a word cut at a seam is heard whole by one chunk;
+# merge_transcripts drops the words the overlap transcribes twice
+OVERLAP_SECONDS = 1.0
+
+# Longest run of repeated words looked for at a seam
+SEAM_WORDS = 8
+
+
+def quietest_cut(buffer: np.ndarray, chunk_samples: int) -> int:
+    # Sample offset, at most chunk_samples, in the middle of the lowest-energy frame near the end of the chunk
+    search = min(SAMPLE_RATE * SILENCE_SEARCH_SECONDS, chunk_samples // 2)
+    region = buffer[chunk_samples - search:chunk_samples]
+    frames = len(region) // SILENCE_FRAME
+    if not frames:
+        return chunk_samples
+    energy = np.square(region[:frames * SILENCE_FRAME]).reshape(frames, SILENCE_FRAME).mean(axis=1)
+    return chunk_samples - search + int(np.argmin(energy)) * SILENCE_FRAME + SILENCE_FRAME // 2
+
+
+def _seam_key(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def merge_transcripts(texts: list, seam_words: int = SEAM_WORDS) -> str:
+    """
+    Join chunk transcripts, dropping the words at the start of each chunk that repeat the end of the previous one:
+    - The longest run of up to `seam_words` words is removed, compared without case or punctuation
+    - Chunks with no repeated words are joined unchanged
+    """
+    words = []
+    for text in texts:
+        new = (text or "").split()
+        repeated = 0
+        for n in range(min(seam_words, len(words), len(new)), 0, -1):
+            if [_seam_key(w) for w in words[-n:]] == [_seam_key(w) for w in new[:n]]:
+                repeated = n
+                break
+        words.extend(new[repeated:])
+    return " ".join(words)
 
-    # Define a temporary path for storing the extracted audio
-    audio_path = "temp_audio.wav"
 
-    # Extract the audio track from the video and save it as a WAV file
-    video.audio.write_audiofile(audio_path, logger=None)  
+# Decode the first audio track of a video into 16 kHz mono float32 chunks of at most `chunk_seconds`
+# Chunks are cut at the quietest point near their end and overlap by `overlap_seconds`
+# Chunks are yielded while decoding continues, so memory stays bounded by one chunk
+@traced()
+def iter_audio_chunks(video_path: str, chunk_seconds: int = CHUNK_SECONDS, overlap_seconds: float = OVERLAP_SECONDS):
+    # PyAV decodes the audio track straight from the container, without temp files; imported on first use
+    import av
+
+    chunk_samples = SAMPLE_RATE * chunk_seconds
+    overlap_samples = int(SAMPLE_RATE * overlap_seconds)
+
+    with av.open(video_path) as container:
+        # Videos without a soundtrack produce no chunks
+        if not container.streams.audio:
+            return
+        stream = container.streams.audio[0]
+
+        # Resample whatever the source format is into packed mono float32 at 16 kHz
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+
+        pending = []
+        pending_samples = 0
+        emitted = False
+
+        def resampled(frame):
+            for out in resampler.resample(frame):
+                yield out.to_ndarray().reshape(-1)
+
+        # Passing None at the end flushes the samples buffered inside the resampler
+        for frame in _with_flush(container.decode(stream)):
+            for samples in resampled(frame):
+                pending.append(samples)
+                pending_samples += len(samples)
+
+                # Emit full chunks as soon as enough samples are buffered; the next one starts overlap_samples early
+                while pending_samples >= chunk_samples:
+                    buffer = np.concatenate(pending)
+                    cut = quietest_cut(buffer, chunk_samples)
+                    yield buffer[:cut]
+                    emitted = True
+                    pending = [buffer[max(cut - overlap_samples, 0):]]
+                    pending_samples = len(pending[0])
+
+        # Emit whatever is left after the last full chunk, unless it is only the overlap already emitted
+        if pending_samples > (overlap_samples if emitted else 0):
+            yield np.concatenate(pending)
+
+# Yield every decoded frame followed by None, the resampler's flush marker
+def _with_flush(frames):
+    yield from frames
+    yield None
+
+# Define a function to extract and transcribe speech from a video file
+@traced()
+def extract_audio_text_from_video(video_path: str) -> str:
+    transcriber = get_transcriber()
 
-    # Transcribe the extracted audio using Whisper
-    result = model.transcribe(audio_path)
+    # Transcribe each chunk as soon as it is decoded, then join the pieces without the words repeated at the seams
+    texts = [transcriber.transcribe(chunk) for chunk in iter_audio_chunks(video_path)]
 
     # Return the transcribed text with trailing whitespace removed
-    return result["text"].strip()
+    return merge_transcripts(texts).strip()
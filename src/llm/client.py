@@ -0,0 +1,282 @@
+# Hash prompts into cache keys
+import hashlib
+
+# Locate JSON payloads in model responses
+import re
+
+# Guard the shared client registry and the response cache
+import threading
+
+# Per-call latency measurement
+import time
+
+# Read model configuration from the environment
+import os
+
+# Per-call statistics, with only the most recent calls kept
+from collections import Counter, deque
+from dataclasses import dataclass
+
+# Bounded in-memory response cache
+from cachetools import LRUCache
+
+# Structured output validation
+from pydantic import BaseModel, ValidationError
+
+# Load environment variables from .env file
+from dotenv import load_dotenv
+
+# Spans, token usage and cache hits for every call
+from src.telemetry.tracing import record_cache, record_llm_usage, traced
+
+# One client per model name, shared by every module in the process
+from src.models.registry import get_model_registry
+
+# Load environment variables into runtime
+load_dotenv()
+
+# Model settings shared by entity extraction, relation inference and graph QA
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+
+# Ask the API for a JSON object response; only newer models (gpt-4-turbo, gpt-4o) support it
+OPENAI_JSON_MODE = os.getenv("OPENAI_JSON_MODE", "0") == "1"
+
+# Maximum cached responses and how many times a response that fails to parse is re-requested
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "4096"))
+LLM_PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "2"))
+
+# Recent calls kept for latency percentiles; totals are running counters, so a long-lived client stays bounded
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "1024"))
+
+# Matches a fenced code block, with or without a language tag
+FENCE = re.compile(r"```(?:\w+)?\s*(.*?)```", re.DOTALL)
+
+# Prompt sent when a structured response fails validation; only this call is retried
+REPAIR_TEMPLATE = """
+Your previous response could not be parsed:
+
+{error}
+
+Previous response:
+{response}
+
+Respond again with ONLY valid JSON matching the requested structure, and no other text.
+"""
+
+
+@dataclass
+class CallStats:
+    latency: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = False
+    parse_retries: int = 0
+
+
+def strip_fences(content: str) -> str:
+    # Return the inside of the first fenced block, or the content unchanged
+    match = FENCE.search(content)
+    return match.group(1).strip() if match else content.strip()
+
+
+def extract_json(content: str) -> str:
+    # Drop fences and any prose around the outermost JSON object or array
+    content = strip_fences(content)
+    starts = [i for i in (content.find("{"), content.find("[")) if i != -1]
+    if not starts:
+        return content
+    start = min(starts)
+    end = max(content.rfind("}"), content.rfind("]"))
+    return content[start:end + 1] if end > start else content[start:]
+
+
+class LLMClient:
+    """
+    Shared wrapper around one chat model instance:
+    - Reuses the model's HTTP connection pool across every call in the process
+    - Caches responses by a hash of the model name and prompt
+    - Parses structured responses with pydantic, re-requesting only responses that fail to parse
+    - Records latency and token counts for every call: running totals, plus the last `stats_window` calls
+    """
+
+    def __init__(self, model=None, model_name: str = OPENAI_MODEL, json_mode: bool = OPENAI_JSON_MODE,
+                 cache_size: int = LLM_CACHE_SIZE, parse_retries: int = LLM_PARSE_RETRIES,
+                 stats_window: int = LLM_STATS_WINDOW):
+        self.model_name = model_name
+        self.json_mode = json_mode
+        self.parse_retries = parse_retries
+        self._model = model
+        self._json_model = None
+        self._cache = LRUCache(maxsize=cache_size) if cache_size else None
+        self._lock = threading.Lock()
+        self.calls = deque(maxlen=stats_window)
+        self._totals = Counter()
+
+    @property
+    def model(self):
+        # Build the OpenAI client lazily; tests and benchmarks can inject their own model
+        if self._model is None:
+            from langchain_openai import ChatOpenAI
+            self._model = ChatOpenAI(model=self.model_name, temperature=0)
+        return self._model
+
+    def _structured_model(self):
+        if not self.json_mode:
+            return self.model
+        if self._json_model is None:
+            self._json_model = self.model.bind(response_format={"type": "json_object"})
+        return self._json_model
+
+    def _key(self, prompt: str, structured: bool) -> str:
+        return hashlib.sha256(f"{self.model_name}|{structured}|{prompt}".encode()).hexdigest()
+
+    def _lookup(self, key: str):
+        if self._cache is None:
+            return None
+        with self._lock:
+            return self._cache.get(key)
+
+    def _store(self, key: str, content: str):
+        if self._cache is not None:
+            with self._lock:
+                self._cache[key] = content
+
+    def _record(self, response, start: float, parse_retries: int = 0) -> str:
+        usage = getattr(response, "usage_metadata", None) or {}
+        stats = CallStats(
+            latency=time.perf_counter() - start,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0),
+            parse_retries=parse_retries,
+        )
+        self._count(stats)
+        record_llm_usage(stats.prompt_tokens, stats.completion_tokens)
+        return response.content
+
+    def _count(self, stats: CallStats):
+        with self._lock:
+            self.calls.append(stats)
+            self._totals["calls"] += 1
+            if stats.cached:
+                self._totals["cache_hits"] += 1
+            else:
+                self._totals["parse_retries"] += stats.parse_retries
+                self._totals["prompt_tokens"] += stats.prompt_tokens
+                self._totals["completion_tokens"] += stats.completion_tokens
+
+    @traced()
+    def invoke(self, prompt: str, structured: bool = False, store: bool = True) -> str:
+        """
+        Return the model's text response to `prompt`, from the cache when possible.
+        """
+        key = self._key(prompt, structured)
+        content = self._lookup(key)
+        if self._cache is not None:
+            record_cache("llm", content is not None)
+        if content is not None:
+            self._count(CallStats(latency=0.0, cached=True))
+            return content
+
+        model = self._structured_model() if structured else self.model
+        start = time.perf_counter()
+        content = self._record(model.invoke(prompt), start)
+        if store:
+            self._store(key, content)
+        return content
+
+    @traced()
+    async def ainvoke(self, prompt: str, structured: bool = False, store: bool = True) -> str:
+        key = self._key(prompt, structured)
+        content = self._lookup(key)
+        if self._cache is not None:
+            record_cache("llm", content is not None)
+        if content is not None:
+            self._count(CallStats(latency=0.0, cached=True))
+            return content
+
+        model = self._structured_model() if structured else self.model
+        start = time.perf_counter()
+        content = self._record(await model.ainvoke(prompt), start)
+        if store:
+            self._store(key, content)
+        return content
+
+    @traced()
+    def structured(self, prompt: str, schema: type[BaseModel]) -> BaseModel:
+        """
+        Return the response to `prompt` parsed into `schema`.
+        If parsing fails, only the failed response is re-requested, with the parse error attached.
+        """
+        content = self.invoke(prompt, structured=True, store=False)
+        for attempt in range(self.parse_retries + 1):
+            try:
+                result = schema.model_validate_json(extract_json(content))
+            except (ValidationError, ValueError) as e:
+                if attempt == self.parse_retries:
+                    raise
+                content = self._repair(prompt, content, e)
+                continue
+            # Only responses that parsed are kept for later lookups
+            self._store(self._key(prompt, True), content)
+            return result
+
+    @traced()
+    async def astructured(self, prompt: str, schema: type[BaseModel]) -> BaseModel:
+        content = await self.ainvoke(prompt, structured=True, store=False)
+        for attempt in range(self.parse_retries + 1):
+            try:
+                result = schema.model_validate_json(extract_json(content))
+            except (ValidationError, ValueError) as e:
+                if attempt == self.parse_retries:
+                    raise
+                content = await self._arepair(prompt, content, e)
+                continue
+            self._store(self._key(prompt, True), content)
+            return result
+
+    def _repair_prompt(self, prompt: str, content: str, error: Exception) -> str:
+        return prompt + REPAIR_TEMPLATE.format(error=error, response=content)
+
+    def _repair(self, prompt: str, content: str, error: Exception) -> str:
+        # Bypass the cache: the repair prompt is only meaningful for this failed response
+        start = time.perf_counter()
+        response = self._structured_model().invoke(self._repair_prompt(prompt, content, error))
+        return self._record(response, start, parse_retries=1)
+
+    async def _arepair(self, prompt: str, content: str, error: Exception) -> str:
+        start = time.perf_counter()
+        response = await self._structured_model().ainvoke(self._repair_prompt(prompt, content, error))
+        return self._record(response, start, parse_retries=1)
+
+    def stats(self) -> dict:
+        # Token usage, cache hits and parse retries across all calls so far; latency over the recent calls
+        with self._lock:
+            totals = dict(self._totals)
+            latencies = sorted(c.latency for c in self.calls if not c.cached)
+        return {
+            "calls": totals.get("calls", 0),
+            "cache_hits": totals.get("cache_hits", 0),
+            "parse_retries": totals.get("parse_retries", 0),
+            "prompt_tokens": totals.get("prompt_tokens", 0),
+            "completion_tokens": totals.get("completion_tokens", 0),
+            "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "latency_max": latencies[-1] if latencies else 0.0,
+        }
+
+
+def get_llm_client(model_name: str = OPENAI_MODEL) -> LLMClient:
+    return get_model_registry().get(f"llm:{model_name}", lambda: LLMClient(model_name=model_name), evictable=False)
+
+
+def load_chat_model(model_name: str = OPENAI_MODEL):
+    # The shared client's chat model, built now rather than on the first call (used to preload it)
+    return get_llm_client(model_name).model
+
+
+def as_llm_client(llm=None) -> LLMClient:
+    # Accept an LLMClient, a bare chat model (e.g. a local fake), or None for the shared client
+    if llm is None:
+        return get_llm_client()
+    if isinstance(llm, LLMClient):
+        return llm
+    return LLMClient(model=llm, cache_size=0)
@@ -0,0 +1,248 @@
+# Free evicted models promptly
+import gc
+
+# Resolve preloadable components from "module:function" strings
+import importlib
+
+# Look up torch only if a model already imported it
+import sys
+
+# Guard the registry and serialise each component's one-time load
+import threading
+
+# Load durations and idle times
+import time
+
+# Memory limits and preload list from the environment
+import os
+
+# Release models and clients when the process exits
+import atexit
+
+# Per-component state
+from dataclasses import dataclass
+
+# Span per model load
+from src.telemetry.tracing import get_tracer
+
+MB = 1024 * 1024
+
+# Resident memory the evictable models may use together, in MB (0: unlimited)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+
+# Evict idle models before a load would leave less than this much system memory available, in MB (0: never)
+MODEL_MIN_AVAILABLE_MB = float(os.getenv("MODEL_MIN_AVAILABLE_MB", "0"))
+
+# Seconds an evictable model may go unused before it is dropped (0: never)
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "0"))
+
+# Components that can be preloaded by name, each as the "module:function" that loads it through the registry
+COMPONENTS = {
+    "llm": "src.llm.client:load_chat_model",
+    "neo4j": "src.graph.graph_writer:get_driver",
+    "vectorstore": "src.rag.vector_indexer:get_vectorstore",
+    "local_embeddings": "src.rag.local_embeddings:load_model",
+    "whisper": "src.ingestion.transcriber:load_backend",
+    "llava": "src.vision.llava_captioner:load_model",
+}
+
+
+def parse_components(value: str) -> list:
+    # Comma-separated component names, e.g. from WORKER_PRELOAD="llm,neo4j,whisper"
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def rss_bytes() -> int:
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.Process().memory_info().rss
+
+
+def available_bytes():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.virtual_memory().available
+
+
+@dataclass
+class LoadedComponent:
+    value: object
+    unload: object
+    evictable: bool
+    size_bytes: int
+    load_seconds: float
+    last_used: float
+    uses: int = 0
+
+
+class ModelRegistry:
+    """
+    Process-wide store of models and clients, each loaded on first use:
+    - get(key, load) returns the component under `key`, calling `load()` only the first time
+    - preload(names) loads components from COMPONENTS ahead of the first request
+    - A model's footprint is the growth of resident memory while it loaded
+    - Evictable models go least recently used first when their footprint exceeds `memory_budget`
+      or a load would leave less than `min_available` memory, and once idle for `idle_seconds`
+    - Clients (LLM, Neo4j, vector store) are registered as not evictable
+    An evicted model is loaded again by the next get(); callers that still hold it keep it alive until they finish.
+    """
+
+    def __init__(self, memory_budget: float = MODEL_MEMORY_BUDGET_MB * MB,
+                 min_available: float = MODEL_MIN_AVAILABLE_MB * MB, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.memory_budget = memory_budget
+        self.min_available = min_available
+        self.idle_seconds = idle_seconds
+        self.evictions = 0
+        self._components = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + idle_seconds
+
+    def get(self, key: str, load, unload=None, evictable: bool = True):
+        component = self._components.get(key)
+        if component is None:
+            with self._lock:
+                load_lock = self._load_locks.setdefault(key, threading.Lock())
+            with load_lock:
+                component = self._components.get(key)
+                if component is None:
+                    component = self._load(key, load, unload, evictable)
+        component.last_used = time.monotonic()
+        component.uses += 1
+        if self.idle_seconds and component.last_used >= self._next_sweep:
+            self.evict_idle()
+        return component.value
+
+    def put(self, key: str, value, unload=None, evictable: bool = False):
+        # Register an already built component, e.g. a stub in place of a real client
+        with self._lock:
+            self._components[key] = LoadedComponent(value, unload, evictable, 0, 0.0, time.monotonic())
+
+    def _load(self, key: str, load, unload, evictable: bool) -> LoadedComponent:
+        if evictable:
+            self._make_room()
+        before = rss_bytes()
+        start = time.perf_counter()
+        with get_tracer().start_as_current_span(f"models.load.{key}"):
+            value = load()
+        component = LoadedComponent(value, unload, evictable, max(rss_bytes() - before, 0),
+                                    time.perf_counter() - start, time.monotonic())
+        with self._lock:
+            self._components[key] = component
+        if evictable:
+            self._enforce_budget(keep=key)
+        return component
+
+    def _evictable(self, keep: str = None) -> list:
+        # Least recently used first
+        with self._lock:
+            return sorted(((key, c) for key, c in self._components.items() if c.evictable and key != keep),
+                          key=lambda item: item[1].last_used)
+
+    def _make_room(self):
+        # Drop idle models while a new load would leave too little memory for the rest of the process
+        if not self.min_available:
+            return
+        for key, _ in self._evictable():
+            available = available_bytes()
+            if available is None or available >= self.min_available:
+                return
+            self.evict(key)
+
+    def _enforce_budget(self, keep: str):
+        if not self.memory_budget:
+            return
+        candidates = self._evictable(keep)
+        used = sum(c.size_bytes for _, c in candidates) + self._components[keep].size_bytes
+        for key, component in candidates:
+            if used <= self.memory_budget:
+                return
+            self.evict(key)
+            used -= component.size_bytes
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            component = self._components.pop(key, None)
+        if component is None:
+            return False
+        if component.unload is not None:
+            component.unload(component.value)
+        self.evictions += 1
+        del component
+        gc.collect()
+        # Return freed CUDA blocks too, if a model put anything on the GPU
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return True
+
+    def evict_idle(self, idle_seconds: float = None) -> list:
+        """
+        Evict every evictable model unused for `idle_seconds` (default: the registry's setting).
+        Returns the evicted keys.
+        """
+        idle_seconds = self.idle_seconds if idle_seconds is None else idle_seconds
+        now = time.monotonic()
+        self._next_sweep = now + (idle_seconds or 0)
+        if not idle_seconds:
+            return []
+        idle = [key for key, c in self._evictable() if now - c.last_used >= idle_seconds]
+        return [key for key in idle if self.evict(key)]
+
+    def preload(self, names: list) -> dict:
+        """
+        Load the named components (keys of COMPONENTS) now, so the first request does not pay for them.
+        Returns the seconds each one took.
+        """
+        unknown = [name for name in names if name not in COMPONENTS]
+        if unknown:
+            raise ValueError(f"Unknown components {unknown}, expected some of {sorted(COMPONENTS)}")
+        seconds = {}
+        for name in names:
+            module, _, function = COMPONENTS[name].partition(":")
+            start = time.perf_counter()
+            getattr(importlib.import_module(module), function)()
+            seconds[name] = round(time.perf_counter() - start, 3)
+        return seconds
+
+    def loaded(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: {
+                    "evictable": c.evictable,
+                    "size_mb": round(c.size_bytes / MB, 1),
+                    "load_seconds": round(c.load_seconds, 3),
+                    "idle_seconds": round(now - c.last_used, 1),
+                    "uses": c.uses,
+                }
+                for key, c in self._components.items()
+            }
+
+    def close(self):
+        # Run every unload hook, e.g. closing the Neo4j driver's connection pool
+        with self._lock:
+            components = list(self._components.values())
+            self._components.clear()
+        for component in components:
+            if component.unload is not None:
+                component.unload(component.value)
+
+
+# Registry shared by everything in the process
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+                atexit.register(_registry.close)
+    return _registry
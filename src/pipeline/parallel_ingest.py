@@ -0,0 +1,376 @@
+# Asyncio queues and tasks that connect the pipeline stages
+import asyncio
+
+# Parse JSON manifests and the model's entity output
+import json
+
+# Process pools for CPU-bound extraction; spawn avoids forking a process that holds threads
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-item state and per-stage counters
+from dataclasses import dataclass, field
+
+# File discovery and paths
+import os
+
+# Wall-clock timing for throughput reporting
+import time
+
+# Stage implementations reused from the existing pipeline
+from src.cache.stage_cache import get_default_cache, file_sha256, pipeline_version
+from src.extraction.chunked_extractor import aextract_entities_chunked, extraction_complete
+from src.graph.batch_relation_inferencer import ainfer_relationships_batched
+from src.graph.candidate_pairs import candidate_pairs
+from src.graph.graph_writer import KnowledgeGraph
+
+# One trace per file: stages run under the file's root span, worker-process spans join it via trace context
+from src.telemetry.tracing import (call_in_context, finish_file_span, get_tracer, inject_context,
+                                   start_file_span, use_span)
+
+# Map file extensions to the modality that handles them
+MODALITIES = {
+    ".pdf": "pdf",
+    ".png": "image",
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".mp3": "audio",
+    ".wav": "audio",
+    ".m4a": "audio",
+    ".mp4": "video",
+}
+
+# Default process-pool size for each modality; Whisper and video decoding are heavy, OCR and PDF are light
+DEFAULT_WORKERS = {"pdf": 2, "image": 2, "audio": 1, "video": 1, "captions": 1}
+
+# Marks the end of a queue's input
+_DONE = object()
+
+
+def discover_files(inputs: list) -> list:
+    """
+    Expand directories, manifests and single files into (path, modality) pairs:
+    - Directories are walked recursively
+    - .txt manifests list one path per line; .json manifests hold a list of paths
+    - Files with unsupported extensions are skipped
+    """
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, _, names in os.walk(entry):
+                paths.extend(os.path.join(root, name) for name in sorted(names))
+        elif entry.endswith(".json"):
+            with open(entry) as f:
+                paths.extend(json.load(f))
+        elif entry.endswith(".txt"):
+            with open(entry) as f:
+                paths.extend(line.strip() for line in f if line.strip())
+        else:
+            paths.append(entry)
+
+    files = []
+    for path in paths:
+        modality = MODALITIES.get(os.path.splitext(path)[1].lower())
+        if modality:
+            files.append((path, modality))
+    return files
+
+
+def document_key(path: str) -> str:
+    # Name of a file's Document in the graph: its absolute path, so same-named files in different
+    # folders are separate documents and re-ingesting one never retracts the other's entities
+    return os.path.abspath(path)
+
+
+def extract_text(modality: str, path: str) -> str:
+    # Runs inside a worker process; loaders are imported here so each pool only loads its own models
+    if modality == "pdf":
+        from src.ingestion.pdf_loader import extract_text_from_pdf
+        return extract_text_from_pdf(path)
+    if modality == "image":
+        from src.ingestion.image_loader import extract_text_from_image
+        return extract_text_from_image(path)
+    if modality == "audio":
+        from src.ingestion.audio_loader import extract_text_from_audio
+        return extract_text_from_audio(path)
+    if modality == "video":
+        from src.ingestion.video_loader import extract_audio_text_from_video
+        return extract_audio_text_from_video(path)
+    raise ValueError(f"Unsupported modality: {modality}")
+
+
+def caption_video(path: str, frame_folder: str) -> list:
+    # Runs inside the captioning worker process: de-duplicated key frames to batched LLaVA captions
+    from src.ingestion.frame_extractor import sample_key_frames
+    from src.vision.llava_captioner import generate_captions
+
+    frames, _ = sample_key_frames(path, output_folder=frame_folder)
+    images = [frame.image for frame in frames if frame.image.any()]
+    return [{"name": caption, "type": "Concept"} for caption in generate_captions(images)]
+
+
+@dataclass
+class IngestItem:
+    path: str
+    modality: str
+    file_hash: str = ""
+    text: str = ""
+    entities: list = field(default_factory=list)
+    relationships: list = field(default_factory=list)
+    span: object = None
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    first_start: float = None
+    last_end: float = None
+
+    def record(self, start: float, end: float, ok: bool = True):
+        self.items += ok
+        self.errors += not ok
+        self.busy_seconds += end - start
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    @property
+    def throughput(self) -> float:
+        # Items per second over the stage's active window
+        if not self.items or self.last_end is None:
+            return 0.0
+        return self.items / max(self.last_end - self.first_start, 1e-9)
+
+
+class ParallelIngestor:
+    """
+    Multimodal ingestion pipeline built from the existing loaders and KnowledgeGraph:
+    - Each modality has its own process pool for CPU-bound OCR, decoding and Whisper work
+    - Entity extraction, relation inference and Neo4j writes run as asyncio workers
+    - Stages are connected by bounded queues, so slow stages apply backpressure
+    - Stage results go through the content-addressed stage cache
+    - Each file is traced; its summary (time per stage, LLM tokens, cache hits) ends up in `summaries`
+    `worker_initializer(*initargs)` runs in every worker process, e.g. to install benchmark fakes.
+    """
+
+    def __init__(self, workers: dict = None, llm_concurrency: int = 4, writer_concurrency: int = 2,
+                 queue_size: int = 16, captions: bool = False, use_cache: bool = True, graph=None,
+                 worker_initializer=None, initargs: tuple = ()):
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.llm_concurrency = llm_concurrency
+        self.writer_concurrency = writer_concurrency
+        self.queue_size = queue_size
+        self.captions = captions
+        self.cache = get_default_cache() if use_cache else None
+        self.graph = graph
+        self.worker_initializer = worker_initializer
+        self.initargs = initargs
+        self.stats = {}
+        self.failures = []
+        self.summaries = []
+        self.unchanged = 0
+
+    def _finish(self, item: IngestItem, error: str = None):
+        # The file left the pipeline (written, skipped or failed): close its trace and keep the summary
+        summary = finish_file_span(item.span, error)
+        if summary:
+            if item.modality == "captions":
+                summary["part"] = "captions"
+            self.summaries.append(summary)
+
+    def _stats(self, name: str) -> StageStats:
+        return self.stats.setdefault(name, StageStats(name))
+
+    def _cached(self, stage: str, key: str, compute):
+        return self.cache.cached(stage, key, compute) if self.cache else compute()
+
+    async def _acached(self, stage: str, key: str, compute, keep=None):
+        # Async variant: look up first, await the computation only on a miss;
+        # `keep(value)` returning False leaves an incomplete result out of the cache
+        if self.cache:
+            hit, value = self.cache.get(stage, key)
+            if hit:
+                return value
+        value = await compute()
+        if self.cache and (keep is None or keep(value)):
+            self.cache.put(stage, key, value)
+        return value
+
+    async def _run_workers(self, name: str, count: int, in_q, out_q, handle):
+        # Run `count` consumers of in_q; each handled item may be forwarded to out_q
+        async def worker():
+            while True:
+                item = await in_q.get()
+                if item is _DONE:
+                    # Let sibling workers see the end marker too
+                    await in_q.put(_DONE)
+                    return
+                start = time.perf_counter()
+                try:
+                    with use_span(item.span), get_tracer().start_as_current_span(f"pipeline.{name}"):
+                        result = await handle(item)
+                except Exception as e:
+                    self._stats(name).record(start, time.perf_counter(), ok=False)
+                    self.failures.append((item.path, name, repr(e)))
+                    self._finish(item, repr(e))
+                    print(f"[{name}] {item.path} failed: {e}")
+                    continue
+                self._stats(name).record(start, time.perf_counter())
+                if out_q is not None and result is not None:
+                    await out_q.put(result)
+                else:
+                    self._finish(item)
+
+        await asyncio.gather(*(worker() for _ in range(count)))
+        if out_q is not None:
+            await out_q.put(_DONE)
+
+    async def run(self, files: list) -> dict:
+        """
+        Ingest (path, modality) pairs and return a throughput report.
+        """
+        loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        graph = self.graph or KnowledgeGraph()
+
+        modalities = sorted({modality for _, modality in files})
+        if self.captions and "video" in modalities:
+            modalities.append("captions")
+        pools = {
+            m: ProcessPoolExecutor(max_workers=self.workers[m], mp_context=context,
+                                   initializer=self.worker_initializer, initargs=self.initargs)
+            for m in modalities
+        }
+        inputs = {m: asyncio.Queue(maxsize=self.queue_size) for m in modalities}
+        extracted = asyncio.Queue(maxsize=self.queue_size)
+        related = asyncio.Queue(maxsize=self.queue_size)
+        # One LLM call budget for every file in flight, so llm_concurrency bounds the calls, not the calls per file
+        llm_slots = asyncio.Semaphore(self.llm_concurrency)
+
+        async def extract(item):
+            item.file_hash = await loop.run_in_executor(None, file_sha256, item.path)
+
+            # The graph already holds this content from this pipeline version: skip every later stage
+            part = "captions" if item.modality == "captions" else ""
+            if await asyncio.to_thread(graph.is_current, document_key(item.path), item.file_hash,
+                                       pipeline_version(item.modality), part):
+                self.unchanged += 1
+                return None
+
+            if item.modality == "captions":
+                folder = os.path.join("data", "video_frames", item.file_hash[:16])
+                item.entities = await self._acached(
+                    "video_captions", item.file_hash,
+                    lambda: loop.run_in_executor(pools["captions"], call_in_context, inject_context(),
+                                                 caption_video, item.path, folder)
+                )
+            else:
+                text = await self._acached(
+                    f"{item.modality}_text", item.file_hash,
+                    lambda: loop.run_in_executor(pools[item.modality], call_in_context, inject_context(),
+                                                 extract_text, item.modality, item.path)
+                )
+                item.text = text
+            return item
+
+        async def infer(item):
+            if item.modality != "captions":
+                if not item.text:
+                    return None
+
+                async def extract_json():
+                    # Cached as a JSON string, the same form app.py stores for this stage
+                    return json.dumps(await aextract_entities_chunked(item.text, semaphore=llm_slots))
+
+                # Chunks whose extraction failed are retried on the next run rather than cached as empty
+                entities_json = await self._acached("entities", item.file_hash, extract_json, keep=extraction_complete)
+                item.entities = json.loads(entities_json)["entities"]
+
+            pairs, _ = candidate_pairs(item.entities, item.text or None)
+            key = item.file_hash if item.modality != "captions" else f"{item.file_hash}:captions"
+            item.relationships = await self._acached(
+                "relationships", key, lambda: ainfer_relationships_batched(item.entities, pairs=pairs, semaphore=llm_slots)
+            )
+            return item
+
+        async def write(item):
+            # Apply only the difference from what this document contributed before, in one transaction
+            part = "captions" if item.modality == "captions" else ""
+            await asyncio.to_thread(
+                graph.sync_document, document_key(item.path), item.entities, item.relationships,
+                item.file_hash, pipeline_version(item.modality), part,
+            )
+            return None
+
+        async def feed():
+            # Producer: route each file to its modality queue, blocking when that queue is full
+            for path, modality in files:
+                await inputs[modality].put(IngestItem(path, modality, span=start_file_span(path, modality)))
+                if modality == "video" and "captions" in inputs:
+                    await inputs["captions"].put(
+                        IngestItem(path, "captions", span=start_file_span(path, modality, **{"file.part": "captions"})))
+            for q in inputs.values():
+                await q.put(_DONE)
+
+        async def extract_all():
+            # Every modality has its own workers; the shared output queue closes once all are done
+            forward = asyncio.Queue(maxsize=self.queue_size)
+
+            async def drain():
+                pending = len(modalities)
+                while pending:
+                    item = await forward.get()
+                    if item is _DONE:
+                        pending -= 1
+                    else:
+                        await extracted.put(item)
+                await extracted.put(_DONE)
+
+            await asyncio.gather(
+                drain(),
+                *(self._run_workers(f"extract:{m}", self.workers[m], inputs[m], forward, extract) for m in modalities),
+            )
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(
+                feed(),
+                extract_all(),
+                self._run_workers("entities+relations", self.llm_concurrency, extracted, related, infer),
+                self._run_workers("graph_write", self.writer_concurrency, related, None, write),
+            )
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
+        wall = time.perf_counter() - start
+
+        return self.report(len(files), wall)
+
+    def report(self, num_files: int, wall: float) -> dict:
+        stages = {
+            name: {
+                "items": s.items,
+                "errors": s.errors,
+                "busy_seconds": round(s.busy_seconds, 3),
+                "items_per_second": round(s.throughput, 3),
+            }
+            for name, s in self.stats.items()
+        }
+        return {
+            "files": num_files,
+            "failed": len({path for path, _, _ in self.failures}),
+            "unchanged": self.unchanged,
+            "wall_seconds": round(wall, 3),
+            "files_per_minute": round(num_files / wall * 60, 2) if wall else 0.0,
+            "stages": stages,
+            "cache": self.cache.stats() if self.cache else None,
+            "file_summaries": self.summaries,
+        }
+
+
+def ingest_files(inputs: list, **kwargs) -> dict:
+    # Synchronous entry point: discover files and run the pipeline to completion
+    files = discover_files(inputs)
+    return asyncio.run(ParallelIngestor(**kwargs).run(files))
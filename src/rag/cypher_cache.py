@@ -0,0 +1,184 @@
+# Hash the graph schema into a fingerprint
+import hashlib
+
+# Normalise questions and pick out their literal values
+import re
+
+# Guard the cache across Streamlit script threads
+import threading
+
+# Throttle schema checks
+import time
+
+# Read cache settings from the environment
+import os
+
+# LRU ordering of cached entries
+from collections import OrderedDict
+
+# Cached entry container
+from dataclasses import dataclass
+
+# Cosine similarity between question embeddings
+import numpy as np
+
+# Entries kept, minimum cosine similarity for an embedding hit, and how often (seconds) the schema is re-checked
+CYPHER_CACHE_SIZE = int(os.getenv("CYPHER_CACHE_SIZE", "1024"))
+CYPHER_SIMILARITY_THRESHOLD = float(os.getenv("CYPHER_SIMILARITY_THRESHOLD", "0.95"))
+SCHEMA_CHECK_SECONDS = float(os.getenv("CYPHER_SCHEMA_CHECK_SECONDS", "30"))
+
+# Labels, relationship types and property keys: any change to these can make cached Cypher wrong
+SCHEMA_QUERY = """
+CALL db.labels() YIELD label
+WITH collect(label) AS labels
+CALL db.relationshipTypes() YIELD relationshipType
+WITH labels, collect(relationshipType) AS types
+CALL db.propertyKeys() YIELD propertyKey
+RETURN labels, types, collect(propertyKey) AS keys
+"""
+
+# Quoted strings and single words of a question
+LITERALS = re.compile(r"\"[^\"]+\"|'[^']+'|[\w.-]*\w")
+
+# Words that carry no value a query could depend on; every other word must match for an embedding hit,
+# so a name typed in lower case ("who manages alice") still tells two questions apart
+STOPWORDS = frozenset(
+    "a an the of in on at to for from by with and or is are was were be been do does did has have had "
+    "what which who whom whose where when how why list show tell me give find all any some there their its it "
+    "this that these those than then into about please".split()
+)
+
+
+def normalise_question(question: str) -> str:
+    # Case-, punctuation- and whitespace-insensitive key
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return re.sub(r"\s+", " ", question).strip()
+
+
+def question_literals(question: str) -> frozenset:
+    # Lower-cased quoted strings and non-stopword words, e.g. {"manages", "alice"}
+    literals = (literal.strip("\"'").lower() for literal in LITERALS.findall(question.strip()))
+    return frozenset(literal for literal in literals if literal and literal not in STOPWORDS)
+
+
+def schema_fingerprint(driver) -> str:
+    def read(tx):
+        return tx.run(SCHEMA_QUERY).single()
+
+    with driver.session() as session:
+        record = session.execute_read(read)
+    if record is None:
+        return ""
+    parts = [",".join(sorted(record[key] or [])) for key in ("labels", "types", "keys")]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+@dataclass
+class CachedCypher:
+    question: str
+    cypher: str
+    literals: frozenset
+    vector: np.ndarray = None
+
+
+class CypherCache:
+    """
+    Question-to-Cypher cache for graph QA:
+    - Exact hits on the normalised question (case, punctuation and spacing ignored)
+    - Optional embedding hits: cosine similarity above `threshold` and the same words apart from stopwords,
+      compared in lower case, so "who manages alice" never reuses the query for Bob; a question of
+      stopwords only gets no embedding hit at all
+    - Least recently used entries are evicted beyond `max_size`
+    - Everything is dropped when the graph schema fingerprint changes
+    """
+
+    def __init__(self, max_size: int = CYPHER_CACHE_SIZE, embed_fn=None,
+                 threshold: float = CYPHER_SIMILARITY_THRESHOLD, schema_check_seconds: float = SCHEMA_CHECK_SECONDS):
+        self.max_size = max_size
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.schema_check_seconds = schema_check_seconds
+        self.schema = None
+        self._checked_at = 0.0
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "similar": 0}
+        self.misses = 0
+
+    def check_schema(self, driver, force: bool = False):
+        # Invalidate every entry if labels, relationship types or property keys have changed
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.schema_check_seconds:
+            return
+        fingerprint = schema_fingerprint(driver)
+        with self._lock:
+            self._checked_at = now
+            if self.schema is not None and fingerprint != self.schema:
+                self._entries.clear()
+                self._matrix = None
+            self.schema = fingerprint
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def _embed(self, question: str):
+        if self.embed_fn is None:
+            return None
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, question: str):
+        """
+        Return (cypher, kind) with kind "exact" or "similar", or (None, None) on a miss.
+        """
+        key = normalise_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits["exact"] += 1
+                return entry.cypher, "exact"
+            if not self._entries or self.embed_fn is None:
+                self.misses += 1
+                return None, None
+
+        literals = question_literals(question)
+        if not literals:
+            with self._lock:
+                self.misses += 1
+            return None, None
+        vector = self._embed(question)
+        with self._lock:
+            # The matrix is rebuilt only after entries are added or removed, not on LRU reordering
+            if self._matrix is None:
+                self._matrix_keys = [k for k, e in self._entries.items() if e.vector is not None]
+                self._matrix = np.stack([self._entries[k].vector for k in self._matrix_keys]) if self._matrix_keys else None
+            if self._matrix is not None:
+                scores = self._matrix @ vector
+                for idx in np.argsort(-scores):
+                    if scores[idx] < self.threshold:
+                        break
+                    entry = self._entries[self._matrix_keys[idx]]
+                    if entry.literals == literals:
+                        self._entries.move_to_end(self._matrix_keys[idx])
+                        self.hits["similar"] += 1
+                        return entry.cypher, "similar"
+            self.misses += 1
+        return None, None
+
+    def put(self, question: str, cypher: str):
+        vector = self._embed(question)
+        key = normalise_question(question)
+        with self._lock:
+            self._entries[key] = CachedCypher(question, cypher, question_literals(question), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": dict(self.hits), "misses": self.misses}
@@ -0,0 +1,129 @@
+# Match question shapes and extract their parameters
+import re
+
+# Template container
+from dataclasses import dataclass
+
+# Entity lookup shared by the templates: the canonical IDs the alias index resolves the mention to
+# (${param}_ids, filled in by graph_qa), or the exact stored name. Each branch is an index seek
+# (entity_id, entity_name), so no template scans every Entity node
+ENTITY_MATCH = """CALL {{
+  MATCH ({var}:Entity) WHERE {var}.id IN ${param}_ids RETURN {var}
+  UNION
+  MATCH ({var}:Entity {{name: ${param}}}) RETURN {var}
+}}"""
+
+# Plural words used in questions, mapped to the entity types stored on :Entity nodes
+TYPE_WORDS = {
+    "people": "Person", "persons": "Person",
+    "organizations": "Organization", "organisations": "Organization", "companies": "Organization",
+    "locations": "Location", "places": "Location", "countries": "Location",
+    "dates": "Date",
+    "concepts": "Concept", "topics": "Concept",
+}
+
+
+@dataclass
+class QueryTemplate:
+    name: str
+    patterns: list
+    cypher: str
+    # Parameters holding entity mentions, each resolved to canonical IDs under "<param>_ids"
+    entities: tuple = ()
+
+
+# Read-only, parameterised Cypher for common question shapes; these skip the LLM entirely.
+# Every template takes $limit, and entity names are always bound as parameters, never inlined.
+# Order matters: the first template whose pattern matches is used.
+TEMPLATES = [
+    QueryTemplate(
+        name="relationship_between",
+        patterns=[
+            re.compile(r"^(?:what is |what's )?(?:the )?(?:relationship|relation|connection|link) between (?P<a>.+?) and (?P<b>.+?)\??$", re.I),
+            re.compile(r"^how (?:is|are|was|were) (?P<a>.+?) (?:related|connected|linked) to (?P<b>.+?)\??$", re.I),
+        ],
+        cypher=f"""
+{ENTITY_MATCH.format(var="a", param="a")}
+{ENTITY_MATCH.format(var="b", param="b")}
+MATCH p = shortestPath((a)-[*..4]-(b))
+RETURN [n IN nodes(p) | coalesce(n.name, n.filename)] AS path, [r IN relationships(p) | type(r)] AS relations
+LIMIT $limit
+""",
+        entities=("a", "b"),
+    ),
+    QueryTemplate(
+        name="documents_mentioning",
+        patterns=[
+            re.compile(r"^(?:which|what) (?:documents?|files?|sources?) (?:mentions?|talks? about|discuss(?:es)?|covers?) (?P<name>.+?)\??$", re.I),
+            re.compile(r"^where is (?P<name>.+?) mentioned\??$", re.I),
+        ],
+        cypher=f"""
+{ENTITY_MATCH.format(var="e", param="name")}
+MATCH (d:Document)-[:MENTIONS]->(e)
+RETURN DISTINCT d.filename AS document
+LIMIT $limit
+""",
+        entities=("name",),
+    ),
+    QueryTemplate(
+        name="entities_in_document",
+        patterns=[
+            re.compile(r"^(?:what|which) entities (?:are |appear )?(?:mentioned )?in (?P<filename>[\w.-]+\.\w+)\??$", re.I),
+        ],
+        cypher="""
+MATCH (d:Document {filename: $filename})-[:MENTIONS]->(e:Entity)
+RETURN e.name AS name, e.type AS type
+LIMIT $limit
+""",
+    ),
+    QueryTemplate(
+        name="entities_of_type",
+        patterns=[
+            re.compile(r"^(?:list|show|which|what)(?: all)?(?: the)? (?P<type>" + "|".join(TYPE_WORDS) + r")(?: are)?(?: mentioned| in the graph)?\??$", re.I),
+        ],
+        cypher="""
+MATCH (e:Entity {type: $type})
+RETURN e.name AS name
+ORDER BY name
+LIMIT $limit
+""",
+    ),
+    QueryTemplate(
+        name="about_entity",
+        patterns=[
+            re.compile(r"^(?:who|what) (?:is|are|was|were) (?P<name>.+?)\??$", re.I),
+            re.compile(r"^tell me about (?P<name>.+?)\??$", re.I),
+        ],
+        cypher=f"""
+{ENTITY_MATCH.format(var="e", param="name")}
+OPTIONAL MATCH (e)-[r]-(n:Entity)
+RETURN e.name AS name, e.type AS type, collect(DISTINCT {{relation: type(r), entity: n.name}})[..$limit] AS related
+LIMIT $limit
+""",
+        entities=("name",),
+    ),
+]
+
+
+def clean_name(name: str) -> str:
+    # Drop quotes and a leading article, which are never part of stored entity names
+    name = name.strip().strip("\"'“”‘’")
+    return re.sub(r"^(?:the|a|an)\s+", "", name, flags=re.I).strip()
+
+
+def match_template(question: str):
+    """
+    Return (template, params) for the first template matching the question, or None.
+    """
+    question = re.sub(r"\s+", " ", question).strip()
+    for template in TEMPLATES:
+        for pattern in template.patterns:
+            match = pattern.match(question)
+            if not match:
+                continue
+            params = {key: clean_name(value) for key, value in match.groupdict().items()}
+            if "type" in params:
+                params["type"] = TYPE_WORDS[params["type"].lower()]
+            if all(params.values()):
+                return template, params
+    return None
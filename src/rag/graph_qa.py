@@ -1,11 +1,21 @@
-# Import OpenAI's Chat LLM wrapper from LangChain
-from langchain_openai import ChatOpenAI
+# Shared, pooled LLM client with response caching
+from src.llm.client import as_llm_client, strip_fences
 
-# Tool to define prompt templates with placeholders
-from langchain.prompts import PromptTemplate
+# Pooled Neo4j driver shared with graph writes
+from src.graph.graph_writer import get_driver
 
-# Import the official Neo4j driver to execute Cypher queries
-from neo4j import GraphDatabase
+# Question-to-Cypher cache and LLM-free templates for common question shapes
+from src.rag.cypher_cache import CypherCache
+from src.rag.cypher_templates import match_template
+
+# Take the first rows of a result without reading the rest
+from itertools import islice
+
+# Answer container
+from dataclasses import dataclass, field
+
+# Cypher keywords scanning
+import re
 
 # OS interaction for environment variables
 import os
@@ -13,23 +23,28 @@ import os
 # Load .env file to access Neo4j credentials
 from dotenv import load_dotenv
 
+# Spans for Cypher generation and execution, and Cypher cache hits
+from src.telemetry.tracing import record_cache, traced
+
 # Load environment variables into runtime
 load_dotenv()
 
-# Initialize the GPT-4 language model with deterministic output
-llm = ChatOpenAI(model="gpt-4", temperature=0)
+# Maximum rows returned per question and seconds a graph QA query may run
+GRAPH_QA_ROW_LIMIT = int(os.getenv("GRAPH_QA_ROW_LIMIT", "100"))
+GRAPH_QA_TIMEOUT = float(os.getenv("GRAPH_QA_TIMEOUT", "10"))
 
-# Set up a Neo4j driver using credentials from environment variables
-driver = GraphDatabase.driver(
-    os.getenv("NEO4J_URI"),
-    auth=(os.getenv("NEO4J_USERNAME"), os.getenv("NEO4J_PASSWORD"))
-)
+# Embed questions for near-duplicate cache hits (one embedding call instead of one GPT-4 call)
+CYPHER_CACHE_EMBEDDINGS = os.getenv("CYPHER_CACHE_EMBEDDINGS", "1") == "1"
+
+# Clauses that modify the graph; generated Cypher containing any of them is never executed
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV)\b", re.I)
+PROCEDURE_CALL = re.compile(r"\bCALL\s+(?!\{|db\.)", re.I)
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+READ_START = {"MATCH", "OPTIONAL", "WITH", "RETURN", "UNWIND", "CALL"}
 
 # Define a prompt that instructs the LLM to generate a Cypher query
 # based on a user's natural language question about a known graph schema
-cypher_template = PromptTemplate(
-    input_variables=["question"],
-    template="""
+cypher_template = """
 You are a Cypher expert for a Neo4j graph with this schema:
 
 - All nodes are labeled :Entity
@@ -43,34 +58,119 @@ Respond with ONLY the Cypher query.
 
 Question: "{question}"
 """
-)
 
 # Convert a natural language question into a Cypher query using GPT
-def question_to_cypher(question: str) -> str:
-    return llm.invoke(cypher_template.format(question=question)).content.strip()
-
-# Execute the Cypher query and return all result records as a list of dictionaries
-def run_cypher_query(cypher: str) -> list:
-    with driver.session() as session:
-        result = session.run(cypher)
-        return [record.data() for record in result]
-
-# Full pipeline: convert a question, generate Cypher, validate and run it, print results
-def answer_question(question: str):
-    # Get Cypher query from GPT
-    cypher = question_to_cypher(question)
-    print(f"\nCypher:\n{cypher}")
-
-    # Basic validation to ensure the query starts with a Cypher keyword
-    first_word = cypher.strip().split(" ")[0].upper()
-    if first_word not in {"MATCH", "CALL", "CREATE", "MERGE", "WITH", "RETURN"}:
-        print("GPT did not return a valid Cypher query. Skipping execution.")
-        return
+# Markdown fences around the query are removed
+@traced()
+def question_to_cypher(question: str, llm=None) -> str:
+    return strip_fences(as_llm_client(llm).invoke(cypher_template.format(question=question)))
+
+# Check that a query only reads: it must start with a read clause, contain no write clause
+# outside string literals, and call no procedures other than db.* and subqueries
+def is_read_only(cypher: str) -> bool:
+    code = STRING_LITERAL.sub("''", cypher)
+    words = code.strip().split(None, 1)
+    if not words or words[0].upper() not in READ_START:
+        return False
+    return not WRITE_CLAUSES.search(code) and not PROCEDURE_CALL.search(code)
+
+# Execute a query in a read transaction and return at most `limit` records as dictionaries
+# The read access mode makes the database itself reject writes, and `timeout` bounds the server-side run time
+@traced(items=len)
+def run_cypher_query(cypher: str, params: dict = None, limit: int = GRAPH_QA_ROW_LIMIT,
+                     timeout: float = GRAPH_QA_TIMEOUT, driver=None) -> list:
+    # Read-only session mode and per-transaction timeouts
+    from neo4j import READ_ACCESS, unit_of_work
+
+    @unit_of_work(timeout=timeout)
+    def read(tx):
+        result = tx.run(cypher, **(params or {}))
+        rows = [record.data() for record in islice(result, limit)]
+        # Discard any remaining records instead of streaming them
+        result.consume()
+        return rows
+
+    with (driver or get_driver()).session(default_access_mode=READ_ACCESS) as session:
+        return session.execute_read(read)
+
+@dataclass
+class GraphAnswer:
+    question: str
+    cypher: str = None
+    params: dict = field(default_factory=dict)
+    source: str = None  # template, cache-exact, cache-similar or llm
+    rows: list = field(default_factory=list)
+    error: str = None
+
+# Cache shared by every question in the process
+_cypher_cache = None
+
+def get_cypher_cache() -> CypherCache:
+    global _cypher_cache
+    if _cypher_cache is None:
+        embed_fn = None
+        if CYPHER_CACHE_EMBEDDINGS:
+            from src.cache.embedding_cache import CachedEmbeddings
+            from src.rag.vector_indexer import get_embedding
+            embed_fn = CachedEmbeddings(get_embedding()).embed_query
+        _cypher_cache = CypherCache(embed_fn=embed_fn)
+    return _cypher_cache
+
+# Canonical IDs for the entity mentions a template matched, so "SDG1" finds the entity stored as "SDG 1"
+def resolve_mentions(template, params: dict, resolver=None) -> dict:
+    if not template.entities:
+        return {}
+    if resolver is None:
+        # Imported on first use; question answering without templates never needs the alias index
+        from src.graph.entity_resolver import get_resolver
+        resolver = get_resolver()
+    return {f"{key}_ids": resolver.candidates(params[key]) for key in template.entities}
+
+# Full pipeline: answer from a template, else from cached or newly generated Cypher, and return the rows
+# Templates that find nothing fall through to generated Cypher
+@traced(items=lambda answer: len(answer.rows))
+def answer_question(question: str, cache: CypherCache = None, driver=None, llm=None, resolver=None) -> GraphAnswer:
+    driver = driver or get_driver()
+    cache = cache or get_cypher_cache()
+    answer = GraphAnswer(question=question)
 
     try:
+        # Parameterised templates skip the LLM entirely
+        matched = match_template(question)
+        if matched:
+            template, params = matched
+            params = {**params, **resolve_mentions(template, params, resolver), "limit": GRAPH_QA_ROW_LIMIT}
+            rows = run_cypher_query(template.cypher, params, driver=driver)
+            if rows:
+                answer.cypher, answer.params, answer.source, answer.rows = template.cypher, params, "template", rows
+                print(f"\nCypher (template {template.name}):\n{template.cypher.strip()}\nParams: {params}")
+                print(f"\nResult:\n{rows}")
+                return answer
+
+        # Drop cached Cypher if the graph schema has changed since it was generated
+        cache.check_schema(driver)
+        cypher, kind = cache.get(question)
+        record_cache("cypher", cypher is not None)
+        answer.source = f"cache-{kind}" if cypher else "llm"
+        if cypher is None:
+            # Get Cypher query from GPT
+            cypher = question_to_cypher(question, llm)
+        answer.cypher = cypher
+        print(f"\nCypher ({answer.source}):\n{cypher}")
+
+        if not is_read_only(cypher):
+            answer.error = "GPT did not return a read-only Cypher query. Skipping execution."
+            print(answer.error)
+            return answer
+
         # Execute query and print the result
-        data = run_cypher_query(cypher)
-        print(f"\nResult:\n{data}")
+        answer.rows = run_cypher_query(cypher, driver=driver)
+        print(f"\nResult:\n{answer.rows}")
+        if answer.source == "llm":
+            cache.put(question, cypher)
     except Exception as e:
         # Catch and print any runtime errors during query execution
-        print(f"Failed to execute Cypher:\n{e}")
+        answer.error = f"Failed to execute Cypher:\n{e}"
+        print(answer.error)
+
+    return answer
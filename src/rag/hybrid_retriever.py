@@ -0,0 +1,341 @@
+# Run the three searches concurrently under one latency budget
+import asyncio
+
+# BM25 scoring and top-k selection
+import heapq
+import math
+
+# Tokenise chunks and extract candidate entity names from questions
+import re
+
+# Per-source latency measurement
+import time
+
+# One keyword index rebuild at a time, shared by the concurrent searches
+import threading
+
+# Inverted index postings and term frequencies
+from collections import Counter, defaultdict
+
+# Dedicated worker threads, so abandoned late searches never block the caller
+from concurrent.futures import ThreadPoolExecutor
+
+# Result and statistics containers
+from dataclasses import dataclass, field
+
+# Read retrieval settings from the environment
+import os
+
+# Chunks come back as the same Document objects the vector store returns
+from langchain_core.documents import Document
+
+# Vector search, the shared store and the chunk ID scheme used when indexing
+from src.rag import vector_indexer
+from src.rag.vector_indexer import chunk_id, retrieve_similar
+
+# Span per fused search; source searches join it from the executor threads
+from src.telemetry.tracing import in_current_context, traced
+
+# Total time the fused search may take; sources that have not answered by then are dropped
+HYBRID_BUDGET_SECONDS = float(os.getenv("HYBRID_BUDGET_SECONDS", "1.5"))
+
+# Candidates requested from each source, as a multiple of k
+CANDIDATE_FACTOR = 4
+
+# Reciprocal-rank fusion constant: larger values flatten the advantage of top ranks
+RRF_K = 60
+
+# Maximum graph neighbours expanded per matched entity
+GRAPH_FANOUT = 25
+
+SOURCES = ("bm25", "vector", "graph")
+
+TOKEN = re.compile(r"\w+")
+WORD = re.compile(r"[\w'&.-]+")
+
+# Words that never start or end an entity name on their own
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "does", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "the", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+}
+
+# Seed entities named in the question, their neighbours, and the documents that mention either
+NEIGHBOURHOOD_QUERY = """
+UNWIND $names AS name
+MATCH (e:Entity {name: name})
+OPTIONAL MATCH (e)-[r]-(n:Entity)
+WITH e, collect(DISTINCT n)[..$fanout] AS neighbours
+UNWIND [e] + neighbours AS x
+MATCH (d:Document)-[:MENTIONS]->(x)
+RETURN DISTINCT d.filename AS filename, x.name AS name, x = e AS seed
+"""
+
+
+def tokenize(text: str) -> list:
+    return TOKEN.findall(text.lower())
+
+
+def candidate_names(question: str, max_words: int = 4) -> list:
+    """
+    Word n-grams of the question that could name an entity, in the casings entities are usually stored with.
+    Exact-name lookups let Neo4j answer from the entity_name index instead of scanning every entity.
+    """
+    words = WORD.findall(question)
+    names = set()
+    for n in range(1, max_words + 1):
+        for i in range(len(words) - n + 1):
+            gram = words[i:i + n]
+            if gram[0].lower() in STOPWORDS or gram[-1].lower() in STOPWORDS or len(" ".join(gram)) < 3:
+                continue
+            phrase = " ".join(gram).strip(".'")
+            names.update({phrase, phrase.lower(), phrase.title(), phrase.upper()})
+    return sorted(names)
+
+
+class BM25Index:
+    """
+    In-memory inverted index over the indexed chunks, scored with Okapi BM25.
+    It also keeps the chunk table (IDs, texts, metadata) that the graph source ranks chunks from.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.lengths = []
+        self.postings = defaultdict(dict)
+        self.by_source = defaultdict(list)
+
+    @classmethod
+    def from_store(cls, vectorstore) -> "BM25Index":
+        # Build from every chunk in a Chroma or local vector store
+        stored = vectorstore.get(include=["documents", "metadatas"])
+        index = cls()
+        for cid, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+            index.add(cid, text, meta or {})
+        return index
+
+    def add(self, cid: str, text: str, metadata: dict):
+        position = len(self.ids)
+        self.ids.append(cid)
+        self.texts.append(text)
+        self.metadatas.append(metadata)
+        tokens = tokenize(text)
+        self.lengths.append(len(tokens))
+        for term, count in Counter(tokens).items():
+            self.postings[term][position] = count
+        self.by_source[metadata.get("source")].append(position)
+
+    def document(self, position: int) -> Document:
+        return Document(page_content=self.texts[position], metadata=self.metadatas[position])
+
+    def search(self, query: str, k: int) -> list:
+        # Return up to k (position, score) pairs, best first
+        if not self.ids:
+            return []
+        total = len(self.ids)
+        avg_length = sum(self.lengths) / total
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / avg_length)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+@dataclass
+class SourceStats:
+    latency: float = 0.0
+    hits: int = 0
+    status: str = "ok"  # ok, late (dropped at the budget), error or skipped
+    error: str = None
+
+
+@dataclass
+class HybridResult:
+    documents: list
+    scores: list
+    sources: dict = field(default_factory=dict)
+    latency: float = 0.0
+
+
+def reciprocal_rank_fusion(rankings: dict, weights: dict = None, rrf_k: int = RRF_K) -> list:
+    """
+    Fuse ranked ID lists from several sources: score(id) = sum of weight / (rrf_k + rank).
+    Returns (id, score) pairs, best first.
+    """
+    scores = defaultdict(float)
+    for source, ids in rankings.items():
+        weight = (weights or {}).get(source, 1.0)
+        for rank, cid in enumerate(ids, start=1):
+            scores[cid] += weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class HybridRetriever:
+    """
+    Hybrid retrieval over the indexed chunks:
+    - bm25: keyword search over an in-memory inverted index of the chunks
+    - vector: the existing semantic search (retrieve_similar)
+    - graph: entities named in the question, expanded through their Neo4j neighbourhood to the
+      documents that mention them; those documents' chunks are ranked by how many of the names they contain
+    The sources run concurrently and are fused with reciprocal-rank fusion. Sources that miss the
+    latency budget are dropped from the fusion instead of delaying the answer.
+    """
+
+    def __init__(self, vectorstore=None, driver=None, budget: float = HYBRID_BUDGET_SECONDS,
+                 sources: tuple = SOURCES, weights: dict = None, rrf_k: int = RRF_K,
+                 fanout: int = GRAPH_FANOUT):
+        self._vectorstore = vectorstore
+        self._driver = driver
+        self.budget = budget
+        self.sources = sources
+        self.weights = weights or {}
+        self.rrf_k = rrf_k
+        self.fanout = fanout
+        # (store generation, BM25Index), replaced as one value so readers never pair an index with the wrong generation
+        self._bm25 = None
+        self._bm25_lock = threading.Lock()
+        # asyncio.run waits for its default executor on exit, which would let a late source stall the
+        # caller; searches therefore run on a pool owned by the retriever
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(SOURCES), thread_name_prefix="hybrid")
+
+    @property
+    def vectorstore(self):
+        if self._vectorstore is None:
+            self._vectorstore = vector_indexer.get_vectorstore()
+        return self._vectorstore
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            from src.graph.graph_writer import get_driver
+            self._driver = get_driver()
+        return self._driver
+
+    def bm25(self) -> BM25Index:
+        # Rebuild the keyword index only after some process has changed the stored chunks
+        generation = vector_indexer.store_generation(self.vectorstore)
+        current = self._bm25
+        if current is not None and current[0] == generation:
+            return current[1]
+        # The BM25 and graph searches call this concurrently; only one of them rebuilds, the other waits for it
+        with self._bm25_lock:
+            current = self._bm25
+            if current is None or current[0] != generation:
+                current = (generation, BM25Index.from_store(self.vectorstore))
+                self._bm25 = current
+            return current[1]
+
+    # ---------- sources; each returns ranked (chunk ID, Document) pairs ----------
+
+    def search_bm25(self, query: str, depth: int) -> list:
+        index = self.bm25()
+        return [(index.ids[pos], index.document(pos)) for pos, _ in index.search(query, depth)]
+
+    def search_vector(self, query: str, depth: int) -> list:
+        docs = retrieve_similar(query, k=depth, vectorstore=self.vectorstore)
+        return [(chunk_id(doc.metadata.get("source"), doc.page_content), doc) for doc in docs]
+
+    def search_graph(self, query: str, depth: int) -> list:
+        names = candidate_names(query)
+        if not names:
+            return []
+
+        def read(tx):
+            return [record.data() for record in tx.run(NEIGHBOURHOOD_QUERY, names=names, fanout=self.fanout)]
+
+        with self.driver.session() as session:
+            rows = session.execute_read(read)
+
+        # Seed entities weigh twice as much as their neighbours
+        weights = defaultdict(dict)
+        for row in rows:
+            name = row["name"].lower()
+            weights[row["filename"]][name] = max(weights[row["filename"]].get(name, 0), 2 if row["seed"] else 1)
+
+        index = self.bm25()
+        scored = []
+        for filename, names_in_doc in weights.items():
+            doc_score = sum(names_in_doc.values())
+            for pos in index.by_source.get(filename, []):
+                text = index.texts[pos].lower()
+                chunk_score = sum(w for name, w in names_in_doc.items() if name in text)
+                if chunk_score:
+                    scored.append((chunk_score, doc_score, pos))
+        scored.sort(reverse=True)
+        return [(index.ids[pos], index.document(pos)) for _, _, pos in scored[:depth]]
+
+    # ---------- fusion ----------
+
+    @traced(items=lambda result: len(result.documents))
+    async def asearch(self, query: str, k: int = 5) -> HybridResult:
+        """
+        Run every enabled source concurrently and fuse whatever arrives within the budget.
+        """
+        start = time.perf_counter()
+        depth = max(k * CANDIDATE_FACTOR, 10)
+        stats = {name: SourceStats(status="skipped") for name in SOURCES if name not in self.sources}
+
+        async def run(name):
+            began = time.perf_counter()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    self._executor, in_current_context(getattr(self, f"search_{name}"), query, depth)
+                )
+            finally:
+                stats.setdefault(name, SourceStats()).latency = time.perf_counter() - began
+
+        tasks = {asyncio.create_task(run(name)): name for name in self.sources}
+        done, pending = await asyncio.wait(tasks, timeout=self.budget)
+
+        # Late sources are abandoned; their worker threads finish in the background and are ignored
+        for task in pending:
+            task.cancel()
+            stats[tasks[task]] = SourceStats(latency=self.budget, status="late")
+
+        rankings, documents = {}, {}
+        for task in done:
+            name = tasks[task]
+            if task.exception() is not None:
+                stats[name].status = "error"
+                stats[name].error = str(task.exception())
+                continue
+            hits = task.result()
+            stats[name].hits = len(hits)
+            rankings[name] = [cid for cid, _ in hits]
+            for cid, doc in hits:
+                documents.setdefault(cid, doc)
+
+        fused = reciprocal_rank_fusion(rankings, self.weights, self.rrf_k)[:k]
+        return HybridResult(
+            documents=[documents[cid] for cid, _ in fused],
+            scores=[score for _, score in fused],
+            sources=stats,
+            latency=time.perf_counter() - start,
+        )
+
+    def search(self, query: str, k: int = 5) -> HybridResult:
+        return asyncio.run(self.asearch(query, k))
+
+
+# Retriever shared by the app and CLI entry points
+_retriever = None
+
+
+def get_hybrid_retriever() -> HybridRetriever:
+    global _retriever
+    if _retriever is None:
+        _retriever = HybridRetriever()
+    return _retriever
+
+
+# Hybrid drop-in for retrieve_similar: returns the fused Documents and per-source statistics
+def hybrid_search(query: str, k: int = 5) -> HybridResult:
+    return get_hybrid_retriever().search(query, k)
@@ -0,0 +1,66 @@
+# Read model configuration from the environment
+import os
+
+# Base interface for embedding models, so the local model plugs into the same stores
+from langchain_core.embeddings import Embeddings
+
+# Span per embedded batch
+from src.telemetry.tracing import traced
+
+# The model is loaded once per process on first use, and evictable when idle
+from src.models.registry import get_model_registry
+
+# Sentence-embedding model run locally with transformers (no network once downloaded)
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Texts per forward pass and maximum tokens per text
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+LOCAL_EMBEDDING_MAX_TOKENS = 256
+
+
+def load_model(model_name: str = LOCAL_EMBEDDING_MODEL):
+    # Tokenizer and model, shared by every LocalEmbeddings using the same model name
+    return get_model_registry().get(f"local_embeddings:{model_name}", lambda: _load(model_name))
+
+
+def _load(model_name: str):
+    # Import the heavy dependencies only when an embedding is actually requested
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    return tokenizer, model.eval()
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Local transformer embeddings:
+    - The tokenizer and model are loaded through the model registry on first use
+    - Token embeddings are mean-pooled over the attention mask and L2-normalised,
+      so inner product equals cosine similarity
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE):
+        self.model = model_name
+        self.batch_size = batch_size
+
+    @traced(items=len)
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        import torch
+
+        tokenizer, model = load_model(self.model)
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            inputs = tokenizer(texts[i:i + self.batch_size], padding=True, truncation=True,
+                               max_length=LOCAL_EMBEDDING_MAX_TOKENS, return_tensors="pt")
+            with torch.inference_mode():
+                hidden = model(**inputs).last_hidden_state
+
+            # Mean over real tokens only; padding positions are masked out
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            vectors.extend(torch.nn.functional.normalize(pooled, dim=1).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,414 @@
+# Serialise chunk metadata and derive default chunk IDs
+import hashlib
+import json
+
+# Square root for the IVF list count
+import math
+
+# Chunk metadata, row liveness and the store generation
+import sqlite3
+
+# Guard the shared connection and the in-memory index across threads
+import threading
+
+# File system paths and environment variables
+import os
+
+# Vectors live in a memory-mapped file so processes share one copy through the page cache
+import numpy as np
+
+# Results are returned as the same Document objects Chroma returns
+from langchain_core.documents import Document
+
+# Spans for writes and searches
+from src.telemetry.tracing import traced
+
+# Supported index kinds:
+# - flat: exact inner-product search straight over the memory-mapped vectors (NumPy, no copy)
+# - ivf: FAISS inverted lists, probing only the closest clusters
+# - hnsw: FAISS navigable small-world graph
+INDEX_KINDS = ("flat", "ivf", "hnsw")
+
+# On-disk vector precisions; float16 halves the file and the page-cache footprint
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+# Approximate search parameters; larger values trade build time and queries/sec for recall
+HNSW_M = int(os.getenv("LOCAL_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("LOCAL_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("LOCAL_HNSW_EF_SEARCH", "256"))
+IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "16"))
+
+# Rows scored per block by the flat search, bounding the float32 working set
+SEARCH_BLOCK_ROWS = 65536
+
+# Rewrite the vector file once this share of its rows has been deleted
+COMPACT_RATIO = 0.2
+
+
+def ivf_lists(rows: int) -> int:
+    # About 4 * sqrt(n) lists, with at least 39 training points per list as FAISS recommends
+    return max(1, min(int(4 * math.sqrt(rows)), rows // 39))
+
+
+def normalise(vectors) -> np.ndarray:
+    # Unit vectors, so inner product equals cosine similarity
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> tuple:
+    # Best k (score, row) per query from matching (queries x candidates) score and row matrices
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.take_along_axis(part, np.argsort(-part_scores, axis=1), axis=1)
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+class LocalVectorStore:
+    """
+    Local vector store for large corpora, with the subset of the Chroma API the indexer uses
+    (get, add_texts, delete, similarity_search):
+    - Vectors are appended to a raw float32/float16 file and read through np.memmap
+    - Chunk IDs, texts and metadata live in SQLite next to the vectors
+    - Deleted rows are masked out of results and removed by periodic compaction
+    - Every change bumps a generation counter, so other processes pick it up on their next search
+    """
+
+    def __init__(self, directory: str, embedding_function, kind: str = "flat", dtype: str = "float32"):
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{kind}', expected one of {INDEX_KINDS}")
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype '{dtype}', expected one of {tuple(DTYPES)}")
+
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.kind = kind
+        self.dtype = dtype
+        self.vector_path = os.path.join(directory, f"vectors.{dtype}")
+        self.index_path = os.path.join(directory, f"index.{kind}.{dtype}.faiss")
+        self._lock = threading.RLock()
+
+        # Search state, reloaded whenever the generation changes
+        self._generation = None
+        self._vectors = None
+        self._live = None
+        self._index = None
+        self._index_mmapped = False
+        self._indexed_rows = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "chunks.sqlite"), check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL,
+                source TEXT,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                live INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS chunks_id ON chunks (id);
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        self._conn.commit()
+
+    # ---------- metadata ----------
+
+    def _meta(self, key: str, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _bump_generation(self):
+        self._set_meta("generation", int(self._meta("generation", 0)) + 1)
+
+    def generation(self) -> str:
+        # Shared by every process that opens the store, unlike the indexer's per-process counter
+        with self._lock:
+            return self._meta("generation", "0")
+
+    @property
+    def dim(self):
+        dim = self._meta("dim")
+        return int(dim) if dim else None
+
+    def _row_count(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+
+    # ---------- writes ----------
+
+    @traced(items=len)
+    def add_texts(self, texts: list[str], metadatas: list[dict] = None, ids: list[str] = None) -> list[str]:
+        """
+        Embed and append chunks. Adding an ID that already exists replaces the stored chunk.
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        if not texts:
+            return []
+
+        vectors = normalise(self.embedding_function.embed_documents(texts))
+        with self._lock:
+            if self.dim is None:
+                self._set_meta("dim", vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the store's {self.dim}")
+
+            self._mark_deleted(ids)
+            start = self._row_count()
+            with open(self.vector_path, "ab") as f:
+                f.write(vectors.astype(DTYPES[self.dtype]).tobytes())
+            self._conn.executemany(
+                "INSERT INTO chunks (row, id, source, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (start + i, cid, meta.get("source"), text, json.dumps(meta))
+                    for i, (cid, text, meta) in enumerate(zip(ids, texts, metadatas))
+                ],
+            )
+            self._bump_generation()
+            self._conn.commit()
+        return ids
+
+    def _mark_deleted(self, ids: list[str]) -> int:
+        deleted = 0
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            deleted += self._conn.execute(
+                f"UPDATE chunks SET live = 0 WHERE live = 1 AND id IN ({','.join('?' * len(batch))})", batch
+            ).rowcount
+        return deleted
+
+    def delete(self, ids: list[str] = None):
+        with self._lock:
+            if self._mark_deleted(list(ids or [])):
+                self._bump_generation()
+            self._conn.commit()
+            total, dead = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(1 - live), 0) FROM chunks").fetchone()
+            if total and dead / total >= COMPACT_RATIO:
+                self.compact()
+
+    def compact(self):
+        """
+        Rewrite the vector file with live rows only and renumber them; approximate indexes are rebuilt.
+        """
+        with self._lock:
+            live_rows = [row for (row,) in self._conn.execute("SELECT row FROM chunks WHERE live = 1 ORDER BY row")]
+            vectors = self._open_vectors()
+            tmp_path = self.vector_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for i in range(0, len(live_rows), SEARCH_BLOCK_ROWS):
+                    f.write(np.ascontiguousarray(vectors[live_rows[i:i + SEARCH_BLOCK_ROWS]]).tobytes())
+            self._vectors = vectors = None
+            os.replace(tmp_path, self.vector_path)
+
+            # Renumber rows to match the rewritten file; negative rows avoid primary key clashes
+            self._conn.execute("DELETE FROM chunks WHERE live = 0")
+            self._conn.executemany("UPDATE chunks SET row = ? WHERE row = ?",
+                                   [(-1 - new, old) for new, old in enumerate(live_rows)])
+            self._conn.execute("UPDATE chunks SET row = -1 - row")
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self._set_meta(f"index_rows:{self.kind}", 0)
+            self._bump_generation()
+            self._conn.commit()
+
+    # ---------- reads ----------
+
+    def get(self, ids: list[str] = None, where: dict = None, include: list = None, **kwargs) -> dict:
+        # Chroma-style lookup of live chunks by ID and/or source
+        include = ["documents", "metadatas"] if include is None else include
+        query, params = "SELECT id, text, metadata FROM chunks WHERE live = 1", []
+        if where:
+            unsupported = set(where) - {"source"}
+            if unsupported:
+                raise ValueError(f"Only 'source' filters are supported, got {sorted(unsupported)}")
+            query += " AND source = ?"
+            params.append(where["source"])
+        if ids is not None:
+            query += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        result = {"ids": [r[0] for r in rows]}
+        if "documents" in include:
+            result["documents"] = [r[1] for r in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(r[2]) for r in rows]
+        return result
+
+    def _open_vectors(self):
+        rows, dim = self._row_count(), self.dim
+        if not rows or not dim:
+            return np.zeros((0, dim or 0), dtype=DTYPES[self.dtype])
+        return np.memmap(self.vector_path, dtype=DTYPES[self.dtype], mode="r", shape=(rows, dim))
+
+    def _refresh(self):
+        # Reload the memmap, the live mask and the approximate index after any change
+        generation = self._meta("generation", "0")
+        if generation == self._generation:
+            return
+        self._vectors = self._open_vectors()
+        self._live = np.zeros(len(self._vectors), dtype=bool)
+        self._live[[row for (row,) in self._conn.execute("SELECT row FROM chunks WHERE live = 1")]] = True
+        if self.kind != "flat":
+            self._refresh_index()
+        self._generation = generation
+
+    def _build_index(self):
+        import faiss
+
+        dim = self.dim
+        if self.kind == "hnsw":
+            if self.dtype == "float16":
+                base = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            else:
+                base = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            return faiss.IndexIDMap(base)
+
+        nlist = ivf_lists(len(self._vectors))
+        quantizer = faiss.IndexFlatIP(dim)
+        if self.dtype == "float16":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, faiss.ScalarQuantizer.QT_fp16,
+                                                  faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        # Train the coarse quantizer on an evenly spaced sample of at most 256 points per list
+        sample = np.linspace(0, len(self._vectors) - 1, min(len(self._vectors), nlist * 256)).astype(int)
+        index.train(np.asarray(self._vectors[sample], dtype=np.float32))
+        return index
+
+    def _refresh_index(self):
+        import faiss
+
+        rows_key = f"index_rows:{self.kind}"
+        indexed = int(self._meta(rows_key, 0))
+        total = len(self._vectors)
+
+        # The saved index was rebuilt or extended by a compaction or another process: reload it.
+        # A memory-mapped index is read-only, so it is also reloaded writable before rows are added to it
+        if indexed != self._indexed_rows or (self._index_mmapped and total > indexed):
+            self._index, self._index_mmapped, self._indexed_rows = None, False, 0
+            if indexed and os.path.exists(self.index_path):
+                # Memory-map it when nothing has to be added, so processes share one copy
+                mmap = indexed == total
+                try:
+                    self._index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+                                                   if mmap else 0)
+                    self._index_mmapped = mmap
+                except RuntimeError:
+                    self._index = faiss.read_index(self.index_path)
+                self._indexed_rows = indexed
+
+        # IVF lists are trained on the rows present at build time; retrain once the corpus has grown 4x
+        if self._index is None or (self.kind == "ivf" and total > 4 * max(self._indexed_rows, 1)):
+            if not total:
+                return
+            self._index, self._index_mmapped, self._indexed_rows = self._build_index(), False, 0
+
+        # Rows appended since the last build are added incrementally
+        if total > self._indexed_rows:
+            for start in range(self._indexed_rows, total, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, total)
+                self._index.add_with_ids(np.asarray(self._vectors[start:end], dtype=np.float32),
+                                         np.arange(start, end, dtype=np.int64))
+            self._indexed_rows = total
+            # Other processes may have the current file memory-mapped: write a new file and swap it in
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            faiss.write_index(self._index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+            self._set_meta(rows_key, total)
+            self._conn.commit()
+
+    def _search_flat(self, queries: np.ndarray, k: int) -> tuple:
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self._vectors), SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, len(self._vectors))
+            scores = queries @ np.asarray(self._vectors[start:end], dtype=np.float32).T
+            scores[:, ~self._live[start:end]] = -np.inf
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, end), (len(queries), end - start))], axis=1)
+            best_scores, best_rows = top_k(scores, rows, k)
+        return best_scores, best_rows
+
+    def _search_index(self, queries: np.ndarray, k: int) -> tuple:
+        import faiss
+
+        base = faiss.downcast_index(self._index.index) if self.kind == "hnsw" else self._index
+        if self.kind == "hnsw":
+            base.hnsw.efSearch = max(HNSW_EF_SEARCH, k)
+        else:
+            base.nprobe = IVF_NPROBE
+        # Deleted rows stay in the index until compaction: over-fetch, drop them, and widen the
+        # search only for queries that are still short of k live results
+        dead = int(len(self._live) - self._live.sum())
+        fetch = k + min(dead, 4 * k)
+        while True:
+            scores, rows = self._index.search(queries, min(fetch, self._indexed_rows))
+            keep = (rows >= 0) & self._live[np.maximum(rows, 0)]
+            if fetch >= self._indexed_rows or (keep.sum(axis=1) >= min(k, self._live.sum())).all():
+                break
+            fetch *= 4
+        return top_k(np.where(keep, scores, -np.inf), rows, k)
+
+    def search_vectors(self, queries, k: int = 4) -> tuple:
+        """
+        Batched search for many query vectors at once.
+        Returns (scores, rows), each of shape (len(queries), k); missing results have row -1.
+        """
+        queries = normalise(queries)
+        with self._lock:
+            self._refresh()
+            if not self._live.any():
+                return np.full((len(queries), 0), -np.inf), np.zeros((len(queries), 0), dtype=np.int64)
+            if self.kind == "flat":
+                scores, rows = self._search_flat(queries, k)
+            else:
+                scores, rows = self._search_index(queries, k)
+        return scores, np.where(np.isfinite(scores), rows, -1)
+
+    def _documents(self, rows: np.ndarray) -> list:
+        wanted = [int(r) for r in rows if r >= 0]
+        if not wanted:
+            return []
+        with self._lock:
+            found = {
+                row: Document(page_content=text, metadata=json.loads(meta))
+                for row, text, meta in self._conn.execute(
+                    f"SELECT row, text, metadata FROM chunks WHERE row IN ({','.join('?' * len(wanted))})", wanted
+                )
+            }
+        return [found[r] for r in wanted if r in found]
+
+    @traced(items=len)
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        _, rows = self.search_vectors([self.embedding_function.embed_query(query)], k)
+        return self._documents(rows[0])
+
+    @traced(items=len)
+    def similarity_search_batch(self, queries: list[str], k: int = 4) -> list:
+        # One embedding request and one vectorised search for the whole batch of queries
+        _, rows = self.search_vectors(self.embedding_function.embed_documents(list(queries)), k)
+        return [self._documents(query_rows) for query_rows in rows]
+
+    def persist(self):
+        # Writes are committed as they happen; kept for Chroma API compatibility
+        pass
+
+    def close(self):
+        with self._lock:
+            self._vectors = self._index = None
+            self._index_mmapped = False
+            self._conn.close()
@@ -1,50 +1,229 @@
-# Import LangChain's character-based text splitter for chunking large texts
-from langchain.text_splitter import CharacterTextSplitter
+# Base interface for embedding models, so batching can wrap any of them
+from langchain_core.embeddings import Embeddings
 
-# Import the Chroma vector store implementation
-from langchain_community.vectorstores import Chroma
+# Run embedding batches concurrently
+from concurrent.futures import ThreadPoolExecutor
 
-# Import OpenAI's embedding model for vector generation
-from langchain_openai import OpenAIEmbeddings
-
-# Import the base Document class used by LangChain to wrap text chunks with metadata
-from langchain.docstore.document import Document
+# Stable chunk IDs from the source and chunk content
+import hashlib
 
 # Import os for file path or environment access
 import os
 
-# Initialize the embedding model once 
-embedding = OpenAIEmbeddings()
+# Generation tokens shared between processes
+import uuid
 
-# Function to index a list of raw document texts and their associated metadata into Chroma
-def index_documents(doc_texts: list[str], metadata_list: list[dict]):
-    docs = []  
+# Query LRU/TTL cache and on-disk embedding cache shared by indexing and retrieval
+from src.cache.embedding_cache import CachedEmbeddings
+
+# Spans for indexing and retrieval
+from src.telemetry.tracing import traced
+
+# The embedding client and vector store handle are created on first use and shared by the process
+from src.models.registry import get_model_registry
+
+# Where the Chroma collection is persisted
+PERSIST_DIRECTORY = "chroma_store"
+
+# Vector store backend: "chroma", or "local" for the memory-mapped FAISS/NumPy store used on large corpora
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+LOCAL_INDEX_DIRECTORY = os.getenv("LOCAL_INDEX_DIRECTORY", "vector_store")
+LOCAL_INDEX_KIND = os.getenv("LOCAL_INDEX_KIND", "flat")      # flat, ivf or hnsw
+LOCAL_INDEX_DTYPE = os.getenv("LOCAL_INDEX_DTYPE", "float32")  # float32 or float16
+
+# Embedding model: "openai", or "local" to embed with a transformers model and no network
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+
+# Texts per embedding request and embedding requests in flight
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# Chunks written to Chroma per add call, below its maximum batch size
+WRITE_BATCH_SIZE = 2000
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wrap an embedding model so document embeddings are requested in batches of
+    `batch_size`, with up to `concurrency` requests in flight.
+    """
+
+    def __init__(self, base: Embeddings, batch_size: int = EMBED_BATCH_SIZE, concurrency: int = EMBED_CONCURRENCY):
+        self.base = base
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            return self.base.embed_documents(texts)
+        # map() keeps batch order, so vectors line up with the input texts
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return [vector for batch in pool.map(self.base.embed_documents, batches) for vector in batch]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.base.embed_query(text)
+
+# The embedding model is built on first use, so importing this module needs no API key and no LangChain integrations
+def get_embedding():
+    return get_model_registry().get("embeddings", create_embedding, evictable=False)
+
+def create_embedding():
+    if EMBEDDING_BACKEND == "local":
+        from src.rag.local_embeddings import LocalEmbeddings
+        return LocalEmbeddings()
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
+
+# Bumped whenever index_documents adds or removes chunks, so derived indexes (e.g. BM25) know to rebuild
+index_generation = 0
+
+# Marker file in a persisted Chroma directory, rewritten whenever index_documents changes the chunks
+GENERATION_FILE = "generation"
+
+def store_generation(vectorstore) -> str:
+    """
+    Token that changes whenever any process adds or removes chunks, e.g. an ingestion worker
+    indexing for the API process:
+    - the local store keeps a counter in its own database
+    - Chroma gets a marker file in its persist directory
+    - other stores fall back to this process's index_generation
+    """
+    if hasattr(vectorstore, "generation"):
+        return f"store:{vectorstore.generation()}"
+    directory = getattr(vectorstore, "_persist_directory", None)
+    if directory:
+        try:
+            with open(os.path.join(directory, GENERATION_FILE)) as f:
+                return f"file:{f.read()}"
+        except FileNotFoundError:
+            return "file:"
+    return f"process:{index_generation}"
+
+def bump_store_generation(vectorstore):
+    global index_generation
+    index_generation += 1
+    directory = getattr(vectorstore, "_persist_directory", None)
+    if directory and not hasattr(vectorstore, "generation"):
+        # A fresh random token rather than a counter, so concurrent writers never publish the same value
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{GENERATION_FILE}.{uuid.uuid4().hex}")
+        with open(tmp_path, "w") as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp_path, os.path.join(directory, GENERATION_FILE))
+
+# One Chroma handle per process, reused by every index and search call
+def get_vectorstore():
+    """
+    Return the process-wide vector store (Chroma, or the local store when VECTOR_BACKEND=local).
+    Its embedding function:
+    - serves repeated queries from an in-memory LRU cache with a TTL
+    - serves documents and queries embedded before, in any run, from the on-disk embedding cache
+    - embeds the remaining texts in concurrent batches
+    """
+    return get_model_registry().get("vectorstore", create_vectorstore, evictable=False)
+
+def create_vectorstore():
+    embedding_function = CachedEmbeddings(BatchedEmbeddings(get_embedding()))
+    if VECTOR_BACKEND == "local":
+        from src.rag.local_index import LocalVectorStore
+        return LocalVectorStore(LOCAL_INDEX_DIRECTORY, embedding_function,
+                                kind=LOCAL_INDEX_KIND, dtype=LOCAL_INDEX_DTYPE)
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=embedding_function)
+
+# Stable ID for a chunk: identical content from the same source always maps to the same vector
+def chunk_id(source: str, content: str) -> str:
+    return hashlib.sha256(f"{source}\x00{content}".encode()).hexdigest()
+
+# Per-page texts and metadata for index_documents, so every chunk cites its page
+# extract_text_from_pdf separates pages with form feeds; empty pages produce nothing but keep the numbering
+def page_documents(text: str, source: str) -> tuple:
+    texts, metadata = [], []
+    for number, page in enumerate(text.split("\f"), start=1):
+        if page.strip():
+            texts.append(page)
+            metadata.append({"source": source, "page": number})
+    return texts, metadata
+
+# Split every document into overlapping chunks, grouped by source and keyed by chunk ID
+def split_by_source(doc_texts: list[str], metadata_list: list[dict]) -> dict:
+    # Imported on first use; the splitter pulls in the langchain package
+    from langchain.text_splitter import CharacterTextSplitter
+
+    splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    sources = {}
 
     # Loop through each document and its corresponding metadata
     for text, meta in zip(doc_texts, metadata_list):
-        # Split the document into overlapping text chunks
-        splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        chunks = splitter.create_documents([text], metadatas=[meta])  
+        if not text:
+            continue
+        chunks = sources.setdefault(meta["source"], {})
+        for doc in splitter.create_documents([text], metadatas=[meta]):
+            # Repeated chunks within a source collapse onto one ID
+            chunks[chunk_id(meta["source"], doc.page_content)] = doc
+    return sources
 
-        # Add all chunks to the main collection
-        docs.extend(chunks)
+# Function to index a list of raw document texts and their associated metadata into Chroma
+# Indexing is incremental:
+# - chunks already stored under the same ID are skipped, so unchanged sources cost no embeddings
+# - chunks stored for a source but no longer produced by it are deleted
+# Returns counts of added, unchanged and deleted chunks
+@traced()
+def index_documents(doc_texts: list[str], metadata_list: list[dict], vectorstore=None) -> dict:
+    # Use the shared Chroma store unless a specific one is given
+    if vectorstore is None:
+        vectorstore = get_vectorstore()
 
-    # Create or load a Chroma vector store and populate it with embeddings from the chunks
-    vectorstore = Chroma.from_documents(docs, embedding, persist_directory="chroma_store")
+    new_docs = {}
+    unchanged = 0
+    stale = []
+    for source, chunks in split_by_source(doc_texts, metadata_list).items():
+        # IDs currently stored for this source
+        existing = set(vectorstore.get(where={"source": source}, include=[])["ids"])
+        unchanged += len(existing & chunks.keys())
+        stale.extend(existing - chunks.keys())
+        new_docs.update({cid: doc for cid, doc in chunks.items() if cid not in existing})
 
-    # Save the vector store to disk so it can be reused later
-    vectorstore.persist()
+    # Remove chunks the current version of a source no longer contains
+    if stale:
+        vectorstore.delete(ids=stale)
+
+    # Embed and add only the chunks that are not stored yet
+    ids = list(new_docs)
+    for i in range(0, len(ids), WRITE_BATCH_SIZE):
+        batch = ids[i:i + WRITE_BATCH_SIZE]
+        vectorstore.add_texts(
+            [new_docs[cid].page_content for cid in batch],
+            metadatas=[new_docs[cid].metadata for cid in batch],
+            ids=batch,
+        )
+
+    if ids or stale:
+        bump_store_generation(vectorstore)
 
     # Log how many text chunks were indexed
-    print(f"Indexed {len(docs)} chunks.")
+    print(f"Indexed {len(ids)} new chunks ({unchanged} unchanged, {len(stale)} stale removed).")
+    return {"added": len(ids), "unchanged": unchanged, "deleted": len(stale)}
 
 # Function to retrieve the top-k most semantically similar documents for a query
-def retrieve_similar(query: str, k=3):
-    # Load the persisted Chroma vector store and specify the embedding function
-    vectorstore = Chroma(persist_directory="chroma_store", embedding_function=embedding)
+@traced(items=len)
+def retrieve_similar(query: str, k=3, vectorstore=None):
+    # Reuse the shared vector store; repeated queries skip the embedding request
+    if vectorstore is None:
+        vectorstore = get_vectorstore()
 
     # Perform a similarity search for the input query
     results = vectorstore.similarity_search(query, k=k)
 
     # Return the matched results as a list of Document objects
     return results
+
+# Retrieve the top-k chunks for many queries at once
+# The local backend embeds all queries in one request and searches them as one matrix product
+@traced(items=len)
+def retrieve_similar_batch(queries: list[str], k=3, vectorstore=None) -> list:
+    if vectorstore is None:
+        vectorstore = get_vectorstore()
+    if hasattr(vectorstore, "similarity_search_batch"):
+        return vectorstore.similarity_search_batch(queries, k=k)
+    return [vectorstore.similarity_search(query, k=k) for query in queries]
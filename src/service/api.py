@@ -0,0 +1,190 @@
+# Run blocking QA calls and worker shutdown off the event loop
+import asyncio
+
+# Hash uploads while they stream to disk
+import hashlib
+
+# Dedicated threads for blocking QA calls
+from concurrent.futures import ThreadPoolExecutor
+
+# Convert dataclass answers into JSON responses
+from dataclasses import asdict, is_dataclass
+
+# Manage the worker pool over the application's lifetime
+from contextlib import asynccontextmanager
+
+# Upload location and file names
+import os
+import uuid
+
+# Non-blocking file writes for streamed uploads
+import aiofiles
+
+# Async HTTP framework
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+# Persistent job queue and the ingestion worker pool
+from src.service.job_queue import JobQueue, JOB_DB_PATH
+from src.service.worker import WorkerPool, DEFAULT_HANDLER, SERVICE_WORKERS
+
+# Request spans, QA spans and the Prometheus endpoint
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from src.telemetry.metrics import get_registry, render_prometheus
+from src.telemetry.tracing import get_tracer, in_current_context
+
+# Components the API process loads before serving its first question
+from src.models.registry import get_model_registry, parse_components
+
+# Where uploaded files are stored, keyed by content hash
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join("data", "uploads"))
+
+# Extensions the ingestion pipeline accepts (see src.pipeline.parallel_ingest.MODALITIES)
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".mp3", ".wav", ".m4a", ".mp4"}
+
+# QA requests answered at once; each one mostly waits on Neo4j, the vector store or the LLM
+QA_THREADS = int(os.getenv("SERVICE_QA_THREADS", "16"))
+
+# QA components to load at start-up rather than on the first question, e.g. "llm,neo4j,vectorstore"
+SERVICE_PRELOAD = parse_components(os.getenv("SERVICE_PRELOAD", ""))
+
+
+class QuestionRequest(BaseModel):
+    question: str
+    k: int = 3
+    hybrid: bool = True
+
+
+def default_graph_qa(question: str):
+    # Imported on first use, so the service starts without loading the QA stack
+    from src.rag.graph_qa import answer_question
+    return answer_question(question)
+
+
+def citation(doc) -> dict:
+    # Retrieved chunk with its source, and its page for PDF chunks
+    return {"source": doc.metadata.get("source"), "page": doc.metadata.get("page"), "content": doc.page_content}
+
+
+def default_rag(question: str, k: int, hybrid: bool):
+    if hybrid:
+        from src.rag.hybrid_retriever import hybrid_search
+        result = hybrid_search(question, k=k)
+        return {
+            "documents": [citation(d) for d in result.documents],
+            "sources": {name: asdict(stats) for name, stats in result.sources.items()},
+        }
+    from src.rag.vector_indexer import retrieve_similar
+    docs = retrieve_similar(question, k=k)
+    return {"documents": [citation(d) for d in docs]}
+
+
+def document_name(filename: str) -> str:
+    # The client's relative path for the upload, e.g. "reports/2023/summary.pdf", without "..", "." or a root;
+    # it names the Document, so same-named files from different folders stay separate documents
+    parts = [part for part in filename.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return "/".join(parts)
+
+
+def to_json(value):
+    return jsonable_encoder(asdict(value) if is_dataclass(value) else value)
+
+
+def create_app(db_path: str = JOB_DB_PATH, workers: int = SERVICE_WORKERS, handler: str = DEFAULT_HANDLER,
+               graph_qa=default_graph_qa, rag=default_rag, upload_dir: str = UPLOAD_DIR,
+               qa_threads: int = QA_THREADS, preload: list = SERVICE_PRELOAD) -> FastAPI:
+    """
+    Build the HTTP service:
+    - POST /documents?filename=...: stream a file to disk and queue an ingestion job (202);
+      `filename` may be a relative path, which keeps same-named files from different folders apart
+    - GET /jobs/{id}: poll a job's status and result
+    - POST /qa/graph and /qa/rag: answer a question from the knowledge graph or the indexed chunks
+    - GET /metrics: Prometheus metrics of this process and every ingestion worker
+    Ingestion runs in `workers` background processes fed by the SQLite job queue.
+    `handler`, `graph_qa` and `rag` can be replaced with stubs for load tests.
+    `preload` names the components (see src.models.registry.COMPONENTS) loaded before the service takes requests.
+    """
+    queue = JobQueue(db_path)
+    pool = WorkerPool(workers, db_path, handler)
+    # Sized for I/O-bound QA rather than the CPU count, which bounds the event loop's default executor
+    executor = ThreadPoolExecutor(max_workers=qa_threads, thread_name_prefix="qa")
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if workers:
+            pool.start()
+        await asyncio.to_thread(get_model_registry().preload, list(preload))
+        yield
+        await asyncio.to_thread(pool.stop)
+        executor.shutdown(wait=False)
+        queue.close()
+
+    app = FastAPI(title="Multimodal Knowledge Graph & RAG service", lifespan=lifespan)
+    # Every request gets a server span; QA spans are its children
+    get_tracer()
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics,health")
+
+    # Job queue calls block on SQLite, which waits up to 30 s while a worker holds the write lock,
+    # so handlers run them on threads rather than the event loop
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "workers_alive": pool.alive(), "worker_restarts": pool.restarts,
+                "jobs": await asyncio.to_thread(queue.counts), "models": get_model_registry().loaded()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        # Workers publish their snapshots to the job database after each job
+        counts, worker_metrics = await asyncio.to_thread(lambda: (queue.counts(), queue.worker_metrics()))
+        service = {"gauges": [["service_jobs", {"status": status}, count] for status, count in counts.items()]
+                   + [["service_workers_alive", {}, pool.alive()], ["service_worker_restarts", {}, pool.restarts]]}
+        return render_prometheus([get_registry().snapshot(), *worker_metrics, service])
+
+    @app.post("/documents", status_code=202)
+    async def upload(request: Request, filename: str, captions: bool = False):
+        # The request body is the raw file; it is streamed to disk, never held in memory
+        document = document_name(filename)
+        filename = os.path.basename(document)
+        if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(415, f"Unsupported file type: {filename}")
+
+        os.makedirs(upload_dir, exist_ok=True)
+        tmp_path = os.path.join(upload_dir, f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        async with aiofiles.open(tmp_path, "wb") as f:
+            async for chunk in request.stream():
+                digest.update(chunk)
+                await f.write(chunk)
+
+        # Identical uploads share one stored file
+        folder = os.path.join(upload_dir, digest.hexdigest()[:16])
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, filename)
+        os.replace(tmp_path, path)
+
+        job_id = await asyncio.to_thread(queue.submit, "ingest", {"path": path, "filename": filename,
+                                                             "document": document, "captions": captions})
+        return {"job_id": job_id, "status": "queued", "sha256": digest.hexdigest()}
+
+    @app.get("/jobs/{job_id}")
+    async def job_status(job_id: str):
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            raise HTTPException(404, f"Unknown job {job_id}")
+        return job
+
+    @app.post("/qa/graph")
+    async def graph_question(body: QuestionRequest):
+        answer = await asyncio.get_running_loop().run_in_executor(executor, in_current_context(graph_qa, body.question))
+        return to_json(answer)
+
+    @app.post("/qa/rag")
+    async def rag_question(body: QuestionRequest):
+        result = await asyncio.get_running_loop().run_in_executor(
+            executor, in_current_context(rag, body.question, body.k, body.hybrid)
+        )
+        return to_json(result)
+
+    return app
@@ -0,0 +1,193 @@
+# Serialise job payloads and results
+import json
+
+# Persistent queue shared by the API process and the worker processes
+import sqlite3
+
+# Job identifiers
+import uuid
+
+# Timestamps for queueing, start and finish times
+import time
+
+# One connection per thread, e.g. the API's handler threads and a worker's lease heartbeat
+import threading
+
+# File system paths and environment variables
+import os
+
+# Default location of the job database
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(".cache", "jobs.sqlite"))
+
+# Seconds a claimed job stays leased to its worker; a live worker renews the lease while it runs the job,
+# so a job whose lease has run out belongs to a dead worker and is re-queued
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Attempts per job before it is marked failed for good
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+STATUSES = ("queued", "running", "done", "failed")
+
+
+class JobQueue:
+    """
+    Persistent job queue in a single SQLite file:
+    - Safe to share between processes and threads; every thread opens its own connection
+    - claim() atomically moves the oldest queued job to running, so each job goes to one worker
+    - A running job is leased to its worker, which renews the lease while it works on it
+    - Jobs whose lease has expired (their worker died, on this server or another) are re-queued by claim()
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        # WAL lets the API read job status while workers write
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL,
+                lease_until REAL,
+                result TEXT,
+                error TEXT
+            )
+            """
+        )
+        # Databases created before leases existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "lease_until" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created)")
+        # Latest metrics snapshot of each worker process, merged into the API's /metrics
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS worker_metrics (worker TEXT PRIMARY KEY, updated REAL NOT NULL, snapshot TEXT NOT NULL)"
+        )
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # close() may run on another thread
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                                      check_same_thread=False)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def submit(self, kind: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        self._conn.execute(
+            "INSERT INTO jobs (id, kind, payload, status, created) VALUES (?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(payload), time.time()),
+        )
+        return job_id
+
+    def claim(self, worker: str, lease: float = JOB_LEASE_SECONDS):
+        """
+        Take the oldest queued job for `worker` and lease it for `lease` seconds,
+        or return None when the queue is empty.
+        """
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same row
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._requeue_expired()
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker, time.time(), time.time() + lease, row[0]),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0])
+
+    def complete(self, job_id: str, result):
+        self._conn.execute(
+            "UPDATE jobs SET status = 'done', finished = ?, result = ?, error = NULL WHERE id = ?",
+            (time.time(), json.dumps(result), job_id),
+        )
+
+    def fail(self, job_id: str, error: str, retry: bool = True):
+        # Re-queue until the attempt budget is spent
+        attempts = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        status = "queued" if retry and attempts < JOB_MAX_ATTEMPTS else "failed"
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ?",
+            (status, time.time(), error, job_id),
+        )
+
+    def renew(self, job_id: str, worker: str, lease: float = JOB_LEASE_SECONDS) -> bool:
+        # Extend a running job's lease; False once the job is no longer leased to `worker`
+        return self._conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time() + lease, job_id, worker),
+        ).rowcount == 1
+
+    def _requeue_expired(self) -> int:
+        # Jobs whose worker stopped renewing the lease; one that has used up its attempts fails instead,
+        # so a file that crashes its worker every time cannot loop forever.
+        # Jobs claimed before leases existed expire JOB_LEASE_SECONDS after they started
+        now = time.time()
+        expired = "status = 'running' AND COALESCE(lease_until, started + ?) < ?"
+        self._conn.execute(
+            f"UPDATE jobs SET status = 'failed', finished = ?, error = 'worker lost' WHERE {expired} AND attempts >= ?",
+            (now, JOB_LEASE_SECONDS, now, JOB_MAX_ATTEMPTS),
+        )
+        return self._conn.execute(
+            f"UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL WHERE {expired}",
+            (JOB_LEASE_SECONDS, now),
+        ).rowcount
+
+    def get(self, job_id: str):
+        row = self._conn.execute(
+            "SELECT id, kind, payload, status, attempts, worker, created, started, finished, result, error "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "kind", "payload", "status", "attempts", "worker", "created", "started",
+                        "finished", "result", "error"), row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self) -> dict:
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+    def save_metrics(self, worker: str, snapshot: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO worker_metrics (worker, updated, snapshot) VALUES (?, ?, ?)",
+            (worker, time.time(), json.dumps(snapshot)),
+        )
+
+    def worker_metrics(self) -> list:
+        # Snapshots of every worker that has run, including previous pools, so counters never go back
+        return [json.loads(row[0]) for row in self._conn.execute("SELECT snapshot FROM worker_metrics")]
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,245 @@
+# Resolve job handlers from "module:function" strings, so worker processes can import them
+import importlib
+
+# Parse the cached entity extraction output
+import json
+
+# Worker processes; spawn avoids forking a server process that holds threads and sockets
+import multiprocessing
+
+# File paths and worker identifiers
+import os
+import uuid
+
+# Idle sleep for workers without a stop event
+import time
+
+# Lease heartbeats inside each worker and the pool's supervisor thread
+import threading
+
+# Persistent job queue shared with the API process
+from src.service.job_queue import JobQueue, JOB_DB_PATH, JOB_LEASE_SECONDS
+
+# Metrics of the jobs run by this process
+from src.telemetry.metrics import get_registry
+
+# Models and clients each worker keeps warm between jobs
+from src.models.registry import get_model_registry, parse_components
+
+# Default number of ingestion worker processes and seconds between polls of an empty queue
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+POLL_SECONDS = float(os.getenv("SERVICE_POLL_SECONDS", "0.5"))
+
+# Seconds between the pool's checks for dead worker processes, which are replaced
+SUPERVISE_SECONDS = float(os.getenv("SERVICE_SUPERVISE_SECONDS", "5"))
+
+# Components each worker loads before taking its first job, e.g. "llm,neo4j,whisper"
+WORKER_PRELOAD = parse_components(os.getenv("WORKER_PRELOAD", ""))
+
+DEFAULT_HANDLER = "src.service.worker:ingest_job"
+
+# One KnowledgeGraph per worker process, created on the first job
+_graph = None
+
+
+def get_graph():
+    global _graph
+    if _graph is None:
+        from src.graph.graph_writer import KnowledgeGraph
+        _graph = KnowledgeGraph()
+    return _graph
+
+
+def ingest_job(payload: dict) -> dict:
+    """
+    Ingest one uploaded file through every pipeline stage, using the stage cache throughout.
+    A file the graph already holds at this content hash and pipeline version is skipped entirely.
+    Runs inside a worker process: the loaders, Whisper, LLaVA, the LLM client and the Neo4j driver
+    are module-level singletons there, so each is loaded once per worker and reused by later jobs.
+    The result includes the job's trace summary under "trace".
+    """
+    # Imported here so the API process never loads the ingestion stack
+    from src.pipeline.parallel_ingest import MODALITIES, document_key
+    from src.telemetry.tracing import traced_file
+
+    path = payload["path"]
+    # The client's document name (e.g. "reports/2023/summary.pdf"); uploads are stored under their content
+    # hash, so a path-based key would turn every new version of a document into a new document
+    doc_name = payload.get("document") or payload.get("filename") or document_key(path)
+    modality = MODALITIES[os.path.splitext(path)[1].lower()]
+    # One trace per job; its summary (time per stage, LLM tokens, cache hits) is returned with the result
+    with traced_file(path, modality) as summary:
+        result = ingest_document(path, doc_name, modality, payload.get("captions"))
+    result["trace"] = summary
+    return result
+
+
+def ingest_document(path: str, doc_name: str, modality: str, captions: bool = False) -> dict:
+    # The pipeline stages for one file, run under the job's trace
+    from src.cache.stage_cache import get_default_cache, file_sha256, pipeline_version
+    from src.extraction.chunked_extractor import extract_entities_chunked, extraction_complete
+    from src.graph.batch_relation_inferencer import infer_relationships_batched
+    from src.graph.candidate_pairs import candidate_pairs
+    from src.pipeline.parallel_ingest import caption_video, extract_text
+    from src.rag.vector_indexer import index_documents, page_documents
+
+    cache = get_default_cache()
+    file_hash = file_sha256(path)
+    doc_key = f"{file_hash}:{doc_name}"
+    graph = get_graph()
+
+    want_captions = modality == "video" and captions
+    if graph.is_current(doc_name, file_hash, pipeline_version(modality)) and (
+            not want_captions or graph.is_current(doc_name, file_hash, pipeline_version("captions"), "captions")):
+        return {"document": doc_name, "modality": modality, "sha256": file_hash, "status": "unchanged"}
+
+    text = cache.cached(f"{modality}_text", file_hash, lambda: extract_text(modality, path))
+    entities, relationships = [], []
+    sync = {}
+    if text:
+        entities = json.loads(cache.cached("entities", file_hash, lambda: extract_entities_chunked(text),
+                                           keep=extraction_complete))["entities"]
+        pairs, _ = candidate_pairs(entities, text)
+        relationships = cache.cached("relationships", file_hash,
+                                     lambda: infer_relationships_batched(entities, pairs=pairs))
+
+        # Only the difference from the previous version of this document is written
+        sync = graph.sync_document(doc_name, entities, relationships, file_hash, pipeline_version(modality))
+        # PDF chunks carry their page number
+        texts, metadata = page_documents(text, doc_name) if modality == "pdf" else ([text], [{"source": doc_name}])
+        cache.cached("rag_index", doc_key, lambda: index_documents(texts, metadata))
+
+    caption_entities = []
+    if want_captions:
+        folder = os.path.join("data", "video_frames", file_hash[:16])
+        caption_entities = cache.cached("video_captions", file_hash, lambda: caption_video(path, folder))
+        graph.sync_document(doc_name, caption_entities, [], file_hash, pipeline_version("captions"), "captions")
+
+    return {
+        "document": doc_name,
+        "modality": modality,
+        "sha256": file_hash,
+        "status": sync.get("status", "empty"),
+        "characters": len(text or ""),
+        "entities": len(entities),
+        "relationships": len(relationships),
+        "captions": len(caption_entities),
+    }
+
+
+def resolve_handler(spec: str):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def renew_lease(queue: JobQueue, job_id: str, worker_id: str, done: threading.Event):
+    # Keep the running job leased to this worker; if the process dies, the lease runs out and the job is re-queued
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        if not queue.renew(job_id, worker_id):
+            return
+
+
+def run_worker(worker_id: str, db_path: str = JOB_DB_PATH, handler: str = DEFAULT_HANDLER,
+               poll_seconds: float = POLL_SECONDS, stop_event=None, preload: list = ()):
+    # Worker process loop: claim a job, run it, record the result; sleep only while the queue is empty
+    queue = JobQueue(db_path)
+    handle = resolve_handler(handler)
+    models = get_model_registry()
+    models.preload(list(preload))
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            # An idle worker is where idle models are released (MODEL_IDLE_SECONDS)
+            models.evict_idle()
+            if stop_event is not None:
+                stop_event.wait(poll_seconds)
+            else:
+                time.sleep(poll_seconds)
+            continue
+        done = threading.Event()
+        heartbeat = threading.Thread(target=renew_lease, args=(queue, job["id"], worker_id, done), daemon=True)
+        heartbeat.start()
+        try:
+            queue.complete(job["id"], handle(job["payload"]))
+        except Exception as e:
+            queue.fail(job["id"], repr(e))
+        finally:
+            done.set()
+            heartbeat.join()
+        # Publish this process's metrics for the API's /metrics endpoint
+        queue.save_metrics(worker_id, get_registry().snapshot())
+    queue.close()
+
+
+class WorkerPool:
+    """
+    Long-lived ingestion worker processes fed by the persistent job queue:
+    - Each process keeps its models and clients warm between jobs
+    - A supervisor thread replaces worker processes that have died
+    - Jobs of a dead worker, in this pool or any other sharing the database, are re-queued once their lease expires
+    - `preload` names the components each process loads before its first job
+    """
+
+    def __init__(self, workers: int = SERVICE_WORKERS, db_path: str = JOB_DB_PATH,
+                 handler: str = DEFAULT_HANDLER, poll_seconds: float = POLL_SECONDS, preload: list = WORKER_PRELOAD,
+                 supervise_seconds: float = SUPERVISE_SECONDS):
+        self.workers = workers
+        self.db_path = db_path
+        self.handler = handler
+        self.poll_seconds = poll_seconds
+        self.preload = list(preload)
+        self.supervise_seconds = supervise_seconds
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._processes = {}
+        self._lock = threading.Lock()
+        self._supervisor = None
+
+    def _spawn(self, slot: int):
+        worker_id = f"worker-{slot}-{uuid.uuid4().hex[:8]}"
+        process = self._context.Process(
+            target=run_worker, name=worker_id, daemon=True,
+            args=(worker_id, self.db_path, self.handler, self.poll_seconds, self._stop, self.preload),
+        )
+        process.start()
+        self._processes[slot] = process
+
+    def start(self):
+        with self._lock:
+            for slot in range(self.workers):
+                self._spawn(slot)
+        self._supervisor = threading.Thread(target=self._supervise, name="worker-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _supervise(self):
+        while not self._stop.wait(self.supervise_seconds):
+            self.restart_dead()
+
+    def restart_dead(self) -> int:
+        # Replace crashed worker processes; the jobs they held are re-queued by the queue when their leases expire
+        restarted = 0
+        with self._lock:
+            for slot, process in list(self._processes.items()):
+                if not process.is_alive() and not self._stop.is_set():
+                    process.join(0)
+                    self._spawn(slot)
+                    restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def alive(self) -> int:
+        return sum(process.is_alive() for process in self._processes.values())
+
+    def stop(self, timeout: float = 10.0):
+        # Let running jobs finish; processes still busy after `timeout` are terminated and their jobs re-queued
+        # once their leases expire
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+        with self._lock:
+            for process in self._processes.values():
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+            self._processes.clear()
@@ -0,0 +1,135 @@
+# Guard the registry against concurrent updates from pipeline threads
+import threading
+
+# Histogram bucket search
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the duration histogram buckets; +Inf is implicit
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Help text for every metric the pipeline exports
+METRIC_HELP = {
+    "pipeline_span_seconds": "Duration of traced pipeline calls, by span name.",
+    "pipeline_span_errors_total": "Traced pipeline calls that raised, by span name.",
+    "pipeline_items_total": "Items processed by traced pipeline calls (pages, entities, pairs, chunks...).",
+    "llm_tokens_total": "LLM tokens used, by kind (prompt or completion).",
+    "cache_requests_total": "Cache lookups by cache and result (hit or miss).",
+    "http_request_seconds": "Duration of HTTP requests, by route.",
+    "service_jobs": "Ingestion jobs by status.",
+    "service_workers_alive": "Live ingestion worker processes.",
+    "service_worker_restarts": "Ingestion worker processes replaced after dying.",
+}
+
+
+def label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Process-local counters, gauges and histograms:
+    - Updated by the span aggregator in src.telemetry.tracing, so instrumented code never touches it
+    - snapshot() is JSON-serialisable, so worker processes can hand their metrics to the API process
+    - render_prometheus() merges snapshots into the Prometheus text format
+    """
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, label_key(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, label_key(labels))
+        with self._lock:
+            # Per-bucket counts (the last one is +Inf), then the sum and count of observations
+            histogram = self._histograms.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                "gauges": [[name, dict(labels), value] for (name, labels), value in self._gauges.items()],
+                "histograms": [[name, dict(labels), list(h[0]), h[1], h[2]] for (name, labels), h in self._histograms.items()],
+            }
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def escape(value) -> str:
+    # Label values escape backslashes, quotes and newlines
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: tuple) -> str:
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}" if labels else ""
+
+
+def render_prometheus(snapshots: list, buckets: tuple = DURATION_BUCKETS) -> str:
+    """
+    Merge registry snapshots (from this and other processes) into Prometheus text exposition format.
+    Counters and histograms are summed across snapshots; for gauges the last snapshot wins.
+    """
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get("counters", []):
+            key = (name, label_key(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot.get("gauges", []):
+            gauges[(name, label_key(labels))] = value
+        for name, labels, counts, total, count in snapshot.get("histograms", []):
+            merged = histograms.setdefault((name, label_key(labels)), [[0] * len(counts), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+
+    lines = []
+    described = set()
+
+    def describe(name: str, kind: str):
+        if name not in described:
+            described.add(name)
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        describe(name, "counter")
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    for (name, labels), value in sorted(gauges.items()):
+        describe(name, "gauge")
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    for (name, labels), (counts, total, count) in sorted(histograms.items()):
+        describe(name, "histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {round(total, 6)}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+# Registry shared by everything in the process
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
@@ -0,0 +1,361 @@
+# Wrap sync, async and generator functions alike
+import functools
+import inspect
+
+# JSON-lines span export and per-file summaries
+import json
+
+# Exporter settings and output paths
+import os
+
+# Guard the tracer set-up and the per-trace summaries
+import threading
+
+# Bounded store of finished per-file summaries
+from collections import OrderedDict
+
+# Per-file tracing blocks
+from contextlib import contextmanager
+
+# Carry the active span into executor threads
+import contextvars
+
+# OpenTelemetry API, plus the SDK interfaces the local exporter and the aggregator implement
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.trace import Status, StatusCode
+
+# Aggregated span metrics for the Prometheus endpoint
+from src.telemetry.metrics import get_registry
+
+# Where finished spans go: none (metrics and summaries only), console, json (JSON lines) or otlp
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACING_JSON_PATH = os.getenv("TRACING_JSON_PATH", os.path.join(".cache", "traces.jsonl"))
+
+# Set to 0 to leave every function unwrapped
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+
+# Service name reported to the collector
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "multimodal-kg")
+
+# Instrumentation scope of every span started by traced()
+TRACER_NAME = "src"
+
+# Numeric span attributes that are summed into per-file summaries and metrics
+COUNTED_ATTRIBUTES = ("items", "llm.prompt_tokens", "llm.completion_tokens", "cache.hits", "cache.misses")
+
+# Span that starts the trace of one ingested file
+FILE_SPAN = "ingest.file"
+
+# Finished per-file summaries kept for lookup, and traces still being collected
+SUMMARY_LIMIT = 1024
+TRACE_LIMIT = 4096
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+class JsonLinesExporter(SpanExporter):
+    """
+    Offline span exporter: one JSON object per finished span, appended to `path`.
+    """
+
+    def __init__(self, path: str = TRACING_JSON_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def export(self, spans):
+        lines = []
+        for span in spans:
+            context = span.get_span_context()
+            lines.append(json.dumps({
+                "name": span.name,
+                "trace_id": format(context.trace_id, "032x"),
+                "span_id": format(context.span_id, "016x"),
+                "parent_id": format(span.parent.span_id, "016x") if span.parent else None,
+                "start": span.start_time / 1e9,
+                "seconds": (span.end_time - span.start_time) / 1e9,
+                "status": span.status.status_code.name,
+                "attributes": dict(span.attributes or {}),
+                "pid": os.getpid(),
+            }, default=str))
+        with self._lock, open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+
+class StageAggregator(SpanProcessor):
+    """
+    Span processor feeding the metrics registry and the per-file summaries:
+    - Every pipeline span adds to its duration histogram, error and item counters
+    - Spans are grouped by trace; when a file's root span ends, its trace becomes a summary
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+        self._traces = OrderedDict()
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_end(self, span):
+        seconds = (span.end_time - span.start_time) / 1e9
+        attributes = span.attributes or {}
+        failed = span.status.status_code is StatusCode.ERROR
+
+        if span.instrumentation_scope is None or span.instrumentation_scope.name != TRACER_NAME:
+            # Server spans from the FastAPI instrumentation become request metrics; their internals are skipped
+            if span.kind is trace.SpanKind.SERVER:
+                self.registry.observe("http_request_seconds", seconds, route=span.name)
+            return
+
+        self.registry.observe("pipeline_span_seconds", seconds, span=span.name)
+        if failed:
+            self.registry.inc("pipeline_span_errors_total", span=span.name)
+        if attributes.get("items"):
+            self.registry.inc("pipeline_items_total", attributes["items"], span=span.name)
+
+        trace_id = span.get_span_context().trace_id
+        with self._lock:
+            if trace_id not in self._traces:
+                self._traces[trace_id] = {"stages": {}, "totals": dict.fromkeys(COUNTED_ATTRIBUTES, 0)}
+                # Traces whose file span ends elsewhere (e.g. worker-process spans) are dropped oldest first
+                while len(self._traces) > TRACE_LIMIT:
+                    self._traces.popitem(last=False)
+            summary = self._traces[trace_id]
+            stage = summary["stages"].setdefault(span.name, {"calls": 0, "seconds": 0.0, "items": 0, "errors": 0})
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+            stage["items"] += attributes.get("items", 0)
+            stage["errors"] += failed
+            for name in COUNTED_ATTRIBUTES:
+                summary["totals"][name] += attributes.get(name, 0)
+
+            if span.name == FILE_SPAN:
+                del self._traces[trace_id]
+                summary = file_summary(span, seconds, summary)
+                self._summaries[trace_id] = summary
+                while len(self._summaries) > SUMMARY_LIMIT:
+                    self._summaries.popitem(last=False)
+
+    def summary(self, trace_id: int):
+        with self._lock:
+            return self._summaries.get(trace_id)
+
+
+def file_summary(span, seconds: float, summary: dict) -> dict:
+    # The root span's attributes identify the file; stages are ordered by where the time went
+    attributes = dict(span.attributes or {})
+    stages = {name: {**stage, "seconds": round(stage["seconds"], 4)}
+              for name, stage in sorted(summary["stages"].items(), key=lambda item: -item[1]["seconds"])
+              if name != FILE_SPAN}
+    totals = summary["totals"]
+    return {
+        "file": attributes.get("file.path"),
+        "modality": attributes.get("file.modality"),
+        "status": span.status.status_code.name.lower(),
+        "seconds": round(seconds, 4),
+        "stages": stages,
+        "llm_tokens": {"prompt": totals["llm.prompt_tokens"], "completion": totals["llm.completion_tokens"]},
+        "cache": {"hits": totals["cache.hits"], "misses": totals["cache.misses"]},
+    }
+
+
+_aggregator = StageAggregator()
+
+
+def get_tracer():
+    """
+    Configure the OpenTelemetry SDK once per process and return the pipeline tracer.
+    Spans always feed the metrics and summaries; TRACING_EXPORTER adds an exporter.
+    """
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+
+            provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+            provider.add_span_processor(_aggregator)
+            if TRACING_EXPORTER == "console":
+                provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+            elif TRACING_EXPORTER == "json":
+                provider.add_span_processor(BatchSpanProcessor(JsonLinesExporter()))
+            elif TRACING_EXPORTER == "otlp":
+                # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+                from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            elif TRACING_EXPORTER != "none":
+                raise ValueError(f"Unknown TRACING_EXPORTER '{TRACING_EXPORTER}', expected none, console, json or otlp")
+            trace.set_tracer_provider(provider)
+            _tracer = provider.get_tracer(TRACER_NAME)
+    return _tracer
+
+
+def set_attributes(attributes: dict):
+    # Add attributes (e.g. {"items": 12} or {"llm.prompt_tokens": 900}) to the active span
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes(attributes)
+
+
+def add_counts(attributes: dict):
+    # Add to numeric attributes of the active span, for counts that accumulate over a call
+    span = trace.get_current_span()
+    if span.is_recording():
+        current = span.attributes or {}
+        span.set_attributes({name: current.get(name, 0) + value for name, value in attributes.items()})
+
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    # Count cache lookups in the metrics and on the active span, and so in the file's summary
+    if not count:
+        return
+    get_registry().inc("cache_requests_total", count, cache=cache, result="hit" if hit else "miss")
+    add_counts({"cache.hits" if hit else "cache.misses": count})
+
+
+def record_llm_usage(prompt_tokens: int, completion_tokens: int):
+    registry = get_registry()
+    registry.inc("llm_tokens_total", prompt_tokens, kind="prompt")
+    registry.inc("llm_tokens_total", completion_tokens, kind="completion")
+    add_counts({"llm.prompt_tokens": prompt_tokens, "llm.completion_tokens": completion_tokens})
+
+
+def _span_name(fn) -> str:
+    module = fn.__module__.removeprefix("src.")
+    return f"{module}.{fn.__qualname__}"
+
+
+def _finish(span, result, items):
+    if items is not None:
+        span.set_attribute("items", items(result))
+
+
+def traced(name: str = None, items=None):
+    """
+    Decorator recording a span for every call of a pipeline function:
+    - `name` defaults to "<module>.<function>" without the "src." prefix
+    - `items(result)` gives the item count recorded on the span (pages, entities, pairs...)
+    - Exceptions are recorded on the span and re-raised
+    Plain, async and generator functions are supported; a generator's span covers its whole iteration
+    and counts the values it yields.
+    """
+    def decorate(fn):
+        if not TRACING_ENABLED:
+            return fn
+        span_name = name or _span_name(fn)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().start_as_current_span(span_name) as span:
+                    result = await fn(*args, **kwargs)
+                    _finish(span, result, items)
+                    return result
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                # The span is not made current: a generator's frames may resume in another context
+                span = get_tracer().start_span(span_name)
+                count = 0
+                try:
+                    for value in fn(*args, **kwargs):
+                        count += 1
+                        yield value
+                except BaseException as e:
+                    if not isinstance(e, GeneratorExit):
+                        span.record_exception(e)
+                        span.set_status(Status(StatusCode.ERROR, str(e)))
+                    raise
+                finally:
+                    span.set_attribute("items", count)
+                    span.end()
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().start_as_current_span(span_name) as span:
+                result = fn(*args, **kwargs)
+                _finish(span, result, items)
+                return result
+        return wrapper
+
+    return decorate
+
+
+def start_file_span(path: str, modality: str = None, **attributes):
+    """
+    Start the root span of one file's trace. Stages run under it with use_span(); end it with finish_file_span().
+    It is a new trace even when started inside another span, so each file gets its own summary.
+    """
+    if modality:
+        attributes["file.modality"] = modality
+    return get_tracer().start_span(FILE_SPAN, context=otel_context.Context(), attributes={"file.path": path, **attributes})
+
+
+def use_span(span):
+    # Make `span` the parent of spans started in this block, without ending it on exit
+    return trace.use_span(span, end_on_exit=False, record_exception=False, set_status_on_exception=False)
+
+
+def finish_file_span(span, error: str = None) -> dict:
+    """
+    End a file's root span and return its summary: total and per-stage seconds, items,
+    LLM tokens and cache hits/misses.
+    """
+    span.set_status(Status(StatusCode.ERROR, error) if error else Status(StatusCode.OK))
+    span.end()
+    return _aggregator.summary(span.get_span_context().trace_id)
+
+
+@contextmanager
+def traced_file(path: str, modality: str = None, **attributes):
+    """
+    Trace one file processed in a single call chain; yields a dict that holds the file's summary
+    once the block exits.
+    """
+    span = start_file_span(path, modality, **attributes)
+    summary = {}
+    try:
+        with use_span(span):
+            yield summary
+    except BaseException as e:
+        summary.update(finish_file_span(span, repr(e)) or {})
+        raise
+    summary.update(finish_file_span(span) or {})
+
+
+def inject_context() -> dict:
+    # The active span as W3C trace-context headers, to continue the trace in a worker process
+    carrier = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def call_in_context(carrier: dict, fn, *args):
+    """
+    Run `fn(*args)` under the trace context captured by inject_context(); used as a process-pool task,
+    so spans started in the worker belong to the submitting file's trace.
+    """
+    token = otel_context.attach(propagate.extract(carrier))
+    try:
+        return fn(*args)
+    finally:
+        otel_context.detach(token)
+
+
+def in_current_context(fn, *args, **kwargs):
+    """
+    Bind a call to the active span, for loop.run_in_executor (which, unlike asyncio.to_thread,
+    does not carry context variables into the executor thread).
+    """
+    return functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
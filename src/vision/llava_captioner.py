@@ -1,44 +1,103 @@
-# Import the AutoProcessor and Llava model from Hugging Face's Transformers library
-from transformers import AutoProcessor, LlavaForConditionalGeneration
-
 # Import PIL to handle image loading and processing
 from PIL import Image
 
-# Import PyTorch for tensor operations and model execution
-import torch
+# Import NumPy so frames can be passed in as arrays
+import numpy as np
+
+# Read model configuration from the environment
+import os
+
+# Span per captioning call
+from src.telemetry.tracing import traced
+
+# Loaded once per precision on first use, and evictable when idle
+from src.models.registry import get_model_registry
 
 # Define the model ID for LLaVA 1.5
 model_id = "llava-hf/llava-1.5-7b-hf"
 
-# Load the corresponding processor to handle both image and text input formatting
-processor = AutoProcessor.from_pretrained(model_id)
+# CPU inference precision: float32 (reference), bf16 (half the memory) or int8 (dynamic quantization of Linear layers)
+LLAVA_PRECISION = os.getenv("LLAVA_PRECISION", "float32")
+PRECISIONS = ("float32", "bf16", "int8")
+
+# Default number of frames captioned per forward pass
+LLAVA_BATCH_SIZE = int(os.getenv("LLAVA_BATCH_SIZE", "4"))
+
+# Define the input prompt that instructs the model to describe the image
+prompt = "<image>\nDescribe this image in detail."
+
+def load_model(precision: str = LLAVA_PRECISION):
+    """
+    Return the LLaVA processor and model, loading them through the model registry on first use.
+    - float32: reference weights
+    - bf16: bfloat16 weights, roughly half the resident memory
+    - int8: float32 weights with every Linear layer dynamically quantized to int8
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown LLaVA precision '{precision}', expected one of {PRECISIONS}")
+    return get_model_registry().get(f"llava:{precision}", lambda: _load(precision))
+
+
+def _load(precision: str):
+    # Import the heavy dependencies only when a caption is actually requested
+    import torch
+    from transformers import AutoProcessor, LlavaForConditionalGeneration
+
+    # Load the processor; left padding keeps generated tokens aligned across a batch
+    processor = AutoProcessor.from_pretrained(model_id)
+    processor.tokenizer.padding_side = "left"
+
+    # Load the LLaVA model with optional memory optimization for CPU use
+    model = LlavaForConditionalGeneration.from_pretrained(
+        model_id,
+        torch_dtype=torch.bfloat16 if precision == "bf16" else torch.float32,
+        low_cpu_mem_usage=True
+    )
+    if precision == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    # Set the model to evaluation mode
+    return processor, model.eval()
+
+
+def to_pil(image) -> Image.Image:
+    # Accept a file path, a PIL image, or an OpenCV-style BGR array
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image[:, :, ::-1] if image.ndim == 3 else image).convert("RGB")
+    return Image.open(image).convert("RGB")
+
+
+@traced(items=len)
+def generate_captions(images: list, batch_size: int = LLAVA_BATCH_SIZE, max_new_tokens: int = 100) -> list:
+    """
+    Caption many images, `batch_size` per forward pass.
+    Images may be file paths, PIL images or BGR arrays (as returned by OpenCV).
+    Returns one caption per image, in input order.
+    """
+    import torch
 
-# Load the LLaVA model with optional memory optimization for CPU use
-model = LlavaForConditionalGeneration.from_pretrained(
-    model_id,
-    torch_dtype=torch.float32,        
-    low_cpu_mem_usage=True 
-)
+    processor, model = load_model()
+    captions = []
 
-# Set the model to evaluation mode 
-model.eval()
+    for i in range(0, len(images), batch_size):
+        batch = [to_pil(image) for image in images[i:i + batch_size]]
 
-# Define a function that generates a detailed caption for a given image
-def generate_caption(image_path: str) -> str:
-    # Load the image and ensure it is in RGB format
-    image = Image.open(image_path).convert("RGB")
+        # Preprocess the prompts and images together, padding prompts to the same length
+        inputs = processor(images=batch, text=[prompt] * len(batch), return_tensors="pt", padding=True).to(model.device)
 
-    # Define the input prompt that instructs the model to describe the image
-    prompt = "<image>\nDescribe this image in detail."
+        # Generate a response for every image in the batch with a token limit
+        with torch.inference_mode():
+            output = model.generate(**inputs, max_new_tokens=max_new_tokens)
 
-    # Preprocess the prompt and image, and move the resulting tensors to the model's device 
-    inputs = processor(prompt, image, return_tensors="pt").to(model.device)
+        # Decode only the newly generated tokens, dropping the echoed prompt
+        generated = output[:, inputs["input_ids"].shape[1]:]
+        captions.extend(text.strip() for text in processor.batch_decode(generated, skip_special_tokens=True))
 
-    # Generate a response from the model with a token limit
-    output = model.generate(**inputs, max_new_tokens=100)
+    return captions
 
-    # Decode the output tokens to get the final caption string
-    caption = processor.decode(output[0], skip_special_tokens=True)
 
-    # Return the generated caption
-    return caption
+# Define a function that generates a detailed caption for a single image
+def generate_caption(image) -> str:
+    return generate_captions([image], batch_size=1)[0]